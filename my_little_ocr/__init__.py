@@ -1,4 +1,80 @@
-from .ocr_engines import get_all_engines, get_engine_instance, get_engine_class
-from .base_engine.engine_config import register_engine, EngineConfig
-from .base_engine.img_utils import ImageLike, convert_imagelike_to_type
-from .base_engine.base_ocr_engine import BaseOCREngine, OCRResult, OCRItem
+import importlib
+from typing import TYPE_CHECKING
+
+# Public names and the modules defining them. They are imported on first
+# access, so `import my_little_ocr` stays cheap and listing engines does not
+# load numpy, OpenCV, pydantic or any OCR backend.
+_LAZY_ATTRIBUTES = {
+    "get_all_engines": ".ocr_engines",
+    "get_engine_instance": ".ocr_engines",
+    "get_engine_class": ".ocr_engines",
+    "list_engines": ".ocr_engines",
+    "EngineInfo": ".ocr_engines",
+    "register_engine": ".base_engine.engine_config",
+    "EngineConfig": ".base_engine.engine_config",
+    "ImageLike": ".base_engine.img_utils",
+    "convert_imagelike_to_type": ".base_engine.img_utils",
+    "RawImage": ".base_engine.img_utils",
+    "BaseOCREngine": ".base_engine.base_ocr_engine",
+    "OCRResult": ".base_engine.base_ocr_engine",
+    "OCRItem": ".base_engine.base_ocr_engine",
+    "EnginePool": ".engine_pool",
+    "WorkerCrashedError": ".engine_pool",
+    "OCRCache": ".cache",
+    "CachedOCREngine": ".cache",
+    "TiledOCREngine": ".tiling",
+    "PreprocessingEngine": ".preprocess",
+    "CascadeEngine": ".cascade",
+    "OCRServer": ".server",
+    "MicroBatchingEngine": ".batching",
+    "IncrementalOCRSession": ".incremental",
+    "ModelStore": ".model_store",
+    "get_model_store": ".model_store",
+    "set_model_store": ".model_store",
+    "ocr_stream": ".stream",
+    "ocr_to_jsonl": ".stream",
+    "JSONLSink": ".stream",
+    "write_results": ".export",
+    "read_results": ".export",
+    "open_result_writer": ".export",
+    "ArrowResultWriter": ".export",
+    "MetricsRegistry": ".base_engine.metrics",
+    "get_metrics_registry": ".base_engine.metrics",
+    "ThreadBudget": ".base_engine.threads",
+    "get_thread_budget": ".base_engine.threads",
+    "set_thread_budget": ".base_engine.threads",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from .ocr_engines import get_all_engines, get_engine_instance, get_engine_class, list_engines, EngineInfo
+    from .base_engine.engine_config import register_engine, EngineConfig
+    from .base_engine.img_utils import ImageLike, convert_imagelike_to_type, RawImage
+    from .base_engine.base_ocr_engine import BaseOCREngine, OCRResult, OCRItem
+    from .engine_pool import EnginePool, WorkerCrashedError
+    from .cache import OCRCache, CachedOCREngine
+    from .tiling import TiledOCREngine
+    from .preprocess import PreprocessingEngine
+    from .cascade import CascadeEngine
+    from .server import OCRServer
+    from .batching import MicroBatchingEngine
+    from .incremental import IncrementalOCRSession
+    from .model_store import ModelStore, get_model_store, set_model_store
+    from .stream import ocr_stream, ocr_to_jsonl, JSONLSink
+    from .export import write_results, read_results, open_result_writer, ArrowResultWriter
+    from .base_engine.metrics import MetricsRegistry, get_metrics_registry
+    from .base_engine.threads import ThreadBudget, get_thread_budget, set_thread_budget
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
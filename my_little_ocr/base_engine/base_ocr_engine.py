@@ -1,9 +1,58 @@
 from abc import ABC, abstractmethod
-from typing import Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Iterable, Iterator, Optional, TypeVar
+from contextlib import contextmanager
+from types import SimpleNamespace
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
 import numpy as np
-from .img_utils import ImageLike, convert_imagelike_to_type
+from .img_utils import ImageLike, conversion_cache, convert_imagelike_to_type, synthetic_text_image
+from .metrics import current_timer, get_metrics_registry, stage, timed_call
+from .threads import apply_thread_budget
 import json
+import math
+import asyncio
+import functools
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+T = TypeVar("T")
+
+_async_state_lock = threading.Lock()
+
+
+def batched(items: Iterable[T], batch_size: int) -> Iterator[list[T]]:
+    """
+    Splits an iterable into consecutive lists of at most `batch_size` items.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    batch: list[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _confidences_to_list(confidences: np.ndarray) -> list[Optional[float]]:
+    # The shortest repr of each float32 score both prints as the engine
+    # reported it and converts back to the identical float32
+    return [
+        None if math.isnan(confidence) else float(str(confidence))
+        for confidence in confidences.astype(np.float32)
+    ]
+
 
 class OCRItem(BaseModel):
     """
@@ -19,6 +68,12 @@ class OCRItem(BaseModel):
     confidence: Optional[float] = Field(
         None, description="The confidence score of the OCR item"
     )
+    engine: Optional[str] = Field(
+        None, description="The engine that recognized the OCR item, if recorded"
+    )
+    region: Optional[int] = Field(
+        None, description="The index of the region the OCR item was found in, for OCR restricted to regions"
+    )
 
     @field_validator("box", mode="before")
     def convert_float_to_int(cls, v):
@@ -44,51 +99,312 @@ class OCRItem(BaseModel):
         return self.model_dump()
 
 
+def _empty_boxes() -> np.ndarray:
+    return np.zeros((0, 4, 2), dtype=np.int32)
+
+
+def _empty_confidences() -> np.ndarray:
+    return np.zeros(0, dtype=np.float32)
+
+
+# Optional per-item columns of `OCRResult`, by the `OCRItem` field they fill
+_ITEM_COLUMNS = {"engines": "engine", "regions": "region"}
+
+
 class OCRResult(BaseModel):
     """
     Represents the result of OCR.
+
+    Items are stored column-wise: `texts` is a list of strings, `boxes` an
+    (N, 4, 2) int32 array and `confidences` an (N,) float32 array, NaN where
+    the engine reported no confidence. `OCRItem` objects are only built when
+    `ocr_items` is accessed or a single item is indexed.
+
+    Items whose known confidence is below `default_confidence_threshold` are
+    dropped when the result is created.
+
+    Results merged from several engines, such as those of `CascadeEngine`,
+    record the engine that recognized each item in `engines`, and results of
+    OCR restricted to `regions` record the index of each item's region in
+    `regions`; both are None otherwise.
+
+    Results returned by an engine carry `timings`, the seconds spent in each
+    stage of the call (such as "decode", "detection", "recognition" and
+    "postprocess") plus "total". For `ocr_batch`, they cover the whole batch.
     """
 
-    ocr_items: list[OCRItem] = Field(..., description="The list of OCR items")
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    texts: list[str] = Field(
+        default_factory=list, description="The text of each OCR item"
+    )
+    boxes: np.ndarray = Field(
+        default_factory=_empty_boxes,
+        description="The 4 corner points of each OCR item as an (N, 4, 2) int32 array; "
+        "all zeros for items without a box",
+    )
+    confidences: np.ndarray = Field(
+        default_factory=_empty_confidences,
+        description="The confidence score of each OCR item as an (N,) float32 array",
+    )
     default_confidence_threshold: float = Field(
         0.3, description="The default confidence threshold for filtering OCR items"
     )
+    timings: Optional[dict[str, float]] = Field(
+        None, description="Seconds spent in each stage of the OCR call that produced the result"
+    )
+    engines: Optional[list[Optional[str]]] = Field(
+        None, description="The engine that recognized each OCR item, for results merged from several engines"
+    )
+    regions: Optional[list[Optional[int]]] = Field(
+        None, description="The region index of each OCR item, for OCR restricted to regions"
+    )
+    _ocr_items: Optional[list[OCRItem]] = PrivateAttr(None)
+
+    @model_validator(mode="before")
+    @classmethod
+    def convert_ocr_items_to_columns(cls, data):
+        if isinstance(data, dict) and "ocr_items" in data:
+            data = dict(data)
+            items = [
+                item if isinstance(item, OCRItem) else OCRItem.model_validate(item)
+                for item in data.pop("ocr_items")
+            ]
+            data["texts"] = [item.text for item in items]
+            data["boxes"] = [
+                item.box if item.box is not None else [[0, 0]] * 4 for item in items
+            ]
+            data["confidences"] = [item.confidence for item in items]
+            for column, field in _ITEM_COLUMNS.items():
+                if any(getattr(item, field) is not None for item in items):
+                    data[column] = [getattr(item, field) for item in items]
+        return data
 
-    def __post_init__(self):
-        self.ocr_items = [
-            item
-            for item in self.ocr_items
-            if item.confidence is not None
-            and item.confidence >= self.default_confidence_threshold
-        ]
+    @field_validator("boxes", mode="before")
+    @classmethod
+    def convert_boxes_to_array(cls, v):
+        boxes = np.asarray(v)
+        if boxes.size == 0:
+            return _empty_boxes()
+        if np.issubdtype(boxes.dtype, np.floating):
+            # Coordinates are rounded to the nearest integer
+            boxes = np.rint(boxes)
+        return boxes.astype(np.int32, copy=False).reshape(-1, 4, 2)
 
-    def filter_by_confidence(self, confidence_threshold: float) -> "OCRResult":
+    @field_validator("confidences", mode="before")
+    @classmethod
+    def convert_confidences_to_array(cls, v):
+        if isinstance(v, np.ndarray):
+            return v.astype(np.float32, copy=False).reshape(-1)
+        return np.array(
+            [np.nan if confidence is None else confidence for confidence in v],
+            dtype=np.float32,
+        ).reshape(-1)
+
+    @field_serializer("boxes")
+    def serialize_boxes(self, boxes: np.ndarray) -> list:
+        return boxes.tolist()
+
+    @field_serializer("confidences")
+    def serialize_confidences(self, confidences: np.ndarray) -> list:
+        return _confidences_to_list(confidences)
+
+    @model_validator(mode="after")
+    def check_lengths(self) -> "OCRResult":
+        if not len(self.texts) == len(self.boxes) == len(self.confidences):
+            raise ValueError("texts, boxes and confidences must have the same length")
+        for column, values in self._item_columns().items():
+            if len(values) != len(self.texts):
+                raise ValueError(f"{column} must have one entry per OCR item")
+        return self
+
+    def _item_columns(self) -> dict[str, list]:
+        """
+        Returns the optional per-item columns that are set, such as `engines`.
+        """
+        return {
+            column: getattr(self, column)
+            for column in _ITEM_COLUMNS
+            if getattr(self, column) is not None
+        }
+
+    def model_post_init(self, __context) -> None:
+        # Unknown (NaN) confidences compare False and are therefore kept
+        below = self.confidences < self.default_confidence_threshold
+        if below.any():
+            keep = ~below
+            self.texts = [text for text, k in zip(self.texts, keep) if k]
+            self.boxes = self.boxes[keep]
+            self.confidences = self.confidences[keep]
+            for column, values in self._item_columns().items():
+                setattr(self, column, [value for value, k in zip(values, keep) if k])
+
+    @classmethod
+    def from_columns(
+        cls,
+        texts: list[str],
+        boxes=None,
+        confidences=None,
+        **kwargs,
+    ) -> "OCRResult":
         """
-        Filters the OCR items by confidence score.
+        Builds a result directly from columns, without creating `OCRItem`
+        objects. Missing boxes are stored as zeros and missing confidences
+        as NaN, so `from_columns(texts)` is the cheapest way to return text only.
         """
-        return OCRResult(
-            ocr_items=[
-                item
-                for item in self.ocr_items
-                if item.confidence is not None
-                and item.confidence >= confidence_threshold
+        texts = list(texts)
+        if boxes is None:
+            boxes = np.zeros((len(texts), 4, 2), dtype=np.int32)
+        if confidences is None:
+            confidences = np.full(len(texts), np.nan, dtype=np.float32)
+        return cls(texts=texts, boxes=boxes, confidences=confidences, **kwargs)
+
+    @classmethod
+    def concatenate(cls, results: Iterable["OCRResult"]) -> "OCRResult":
+        """
+        Joins several results into one, keeping their order.
+        """
+        results = list(results)
+        if not results:
+            return cls()
+        columns = {}
+        for column in _ITEM_COLUMNS:
+            if any(getattr(result, column) is not None for result in results):
+                columns[column] = [
+                    value
+                    for result in results
+                    for value in (getattr(result, column) or [None] * len(result))
+                ]
+        return cls._construct(
+            texts=[text for result in results for text in result.texts],
+            boxes=np.concatenate([result.boxes for result in results]),
+            confidences=np.concatenate([result.confidences for result in results]),
+            default_confidence_threshold=results[0].default_confidence_threshold,
+            **columns,
+        )
+
+    @classmethod
+    def _construct(cls, **columns) -> "OCRResult":
+        # Columns coming from another result are already validated
+        return cls.model_construct(**columns)
+
+    @property
+    def ocr_items(self) -> list[OCRItem]:
+        """
+        The OCR items, created on first access.
+        """
+        if self._ocr_items is None:
+            columns = {_ITEM_COLUMNS[column]: values for column, values in self._item_columns().items()}
+            self._ocr_items = [
+                OCRItem.model_construct(
+                    text=text,
+                    box=box,
+                    confidence=confidence,
+                    **{field: values[index] for field, values in columns.items()},
+                )
+                for index, (text, box, confidence) in enumerate(
+                    zip(self.texts, self.boxes.tolist(), _confidences_to_list(self.confidences))
+                )
             ]
+        return self._ocr_items
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        """
+        Returns the `OCRItem` at an integer index, or a new result for a
+        slice, an index array or a boolean mask.
+        """
+        if isinstance(index, (int, np.integer)):
+            return self.ocr_items[index]
+        return self.take(index)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, OCRResult):
+            return NotImplemented
+        return (
+            self.texts == other.texts
+            and np.array_equal(self.boxes, other.boxes)
+            and np.array_equal(self.confidences, other.confidences, equal_nan=True)
+            and self.default_confidence_threshold == other.default_confidence_threshold
+            and self.engines == other.engines
+            and self.regions == other.regions
+        )
+
+    def take(self, index) -> "OCRResult":
+        """
+        Returns a new result with the items selected by a slice, an index
+        array or a boolean mask.
+        """
+        if isinstance(index, slice):
+            texts = self.texts[index]
+            columns = {column: values[index] for column, values in self._item_columns().items()}
+        else:
+            index = np.asarray(index)
+            if index.dtype == bool:
+                index = np.flatnonzero(index)
+            texts = [self.texts[i] for i in index.tolist()]
+            columns = {
+                column: [values[i] for i in index.tolist()]
+                for column, values in self._item_columns().items()
+            }
+        return self._construct(
+            texts=texts,
+            boxes=self.boxes[index],
+            confidences=self.confidences[index],
+            default_confidence_threshold=self.default_confidence_threshold,
+            **columns,
         )
 
+    def filter_by_confidence(self, confidence_threshold: float) -> "OCRResult":
+        """
+        Filters the OCR items by confidence score. Items without a confidence
+        score are dropped.
+        """
+        return self.take(self.confidences >= confidence_threshold)
+
+    def sort_by_position(self) -> "OCRResult":
+        """
+        Sorts the OCR items top to bottom, then left to right, by the top-left
+        corner of their bounding rectangle.
+        """
+        corners = self.boxes.min(axis=1)
+        return self.take(np.lexsort((corners[:, 0], corners[:, 1])))
+
+    def sort_by_confidence(self, descending: bool = True) -> "OCRResult":
+        """
+        Sorts the OCR items by confidence score; unknown scores come last.
+        """
+        confidences = np.nan_to_num(self.confidences, nan=-np.inf)
+        order = np.argsort(-confidences if descending else confidences, kind="stable")
+        return self.take(order)
+
     def to_list(self, text_only: bool = False) -> list:
         """
         Converts the OCR result to a list of strings.
         """
         if text_only:
-            return [item.text for item in self.ocr_items]
+            return list(self.texts)
         else:
-            return [item.dict() for item in self.ocr_items]
+            items = [
+                {"text": text, "box": box, "confidence": confidence}
+                for text, box, confidence in zip(
+                    self.texts,
+                    self.boxes.tolist(),
+                    _confidences_to_list(self.confidences),
+                )
+            ]
+            for column, values in self._item_columns().items():
+                for item, value in zip(items, values):
+                    item[_ITEM_COLUMNS[column]] = value
+            return items
 
     def to_string(self, separator: str = " ") -> str:
         """
         Converts the OCR result to a string.
         """
-        return separator.join(self.to_list(text_only=True))
+        return separator.join(self.texts)
 
     def to_json(self, text_only: bool = False, **kwargs) -> str:
         """
@@ -100,18 +416,158 @@ class OCRResult(BaseModel):
         )
 
 
+@contextmanager
+def record_ocr_call(engine: "BaseOCREngine", method: str) -> Iterator[SimpleNamespace]:
+    """
+    Times the block as one `method` call of `engine`, stage by stage, and
+    records it in the metrics registry, also when it raises. The block sets
+    `call.result`, to which the timings are attached. Nested calls, and
+    engines that do not record metrics, are not timed.
+
+    `_instrument_ocr_method` uses it for the synchronous methods; engines
+    with their own asynchronous path use it directly, so `aocr` is recorded
+    like `ocr`.
+    """
+    call = SimpleNamespace(result=None)
+    if not engine.record_metrics or current_timer() is not None:
+        # Nested call, e.g. through super() or the default ocr_batch
+        yield call
+        return
+    start = time.perf_counter()
+    with timed_call() as timer:
+        try:
+            yield call
+        except BaseException:
+            get_metrics_registry().record_call(
+                engine.ocr_engine_name, method, time.perf_counter() - start, error=True
+            )
+            raise
+    elapsed = time.perf_counter() - start
+    results = call.result if isinstance(call.result, list) else [call.result]
+    for item in results:
+        if isinstance(item, OCRResult):
+            item.timings = {**timer.timings, "total": elapsed}
+    get_metrics_registry().record_call(
+        engine.ocr_engine_name,
+        method,
+        elapsed,
+        timer.timings,
+        images=len(results),
+        items=sum(len(item) for item in results if isinstance(item, OCRResult)),
+    )
+
+
+def _instrument_ocr_method(func, method: str):
+    """
+    Wraps `ocr`, `ocr_batch`, `detect_batch` or `recognize_batch` so that the
+    outermost call per context is recorded through `record_ocr_call`. The
+    call runs in a `conversion_cache` block, so wrappers and engines decode
+    and convert each input once.
+    """
+    if getattr(func, "__instrumented__", False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with conversion_cache(), record_ocr_call(self, method) as call:
+            call.result = func(self, *args, **kwargs)
+        return call.result
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def _support_regions(func):
+    """
+    Wraps `ocr` so that it accepts `regions`, OCRing only those rectangles of
+    the image through `_ocr_regions`.
+    """
+    if getattr(func, "__supports_regions__", False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(self, img, *args, regions=None, **kwargs):
+        if regions is None:
+            return func(self, img, *args, **kwargs)
+        if args:
+            raise TypeError("Pass engine arguments by keyword when using regions")
+        return self._ocr_regions(img, regions, **kwargs)
+
+    wrapper.__supports_regions__ = True
+    return wrapper
+
+
+def _instrument_init(func):
+    """
+    Wraps `__init__` to record how long constructing the engine, including
+    loading its models, took, and to limit the process-wide thread pools the
+    engine uses to the thread budget.
+    """
+    if getattr(func, "__instrumented__", False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if "_init_start" in self.__dict__:
+            # Nested call through super().__init__
+            return func(self, *args, **kwargs)
+        start = self.__dict__["_init_start"] = time.perf_counter()
+        try:
+            func(self, *args, **kwargs)
+        finally:
+            del self.__dict__["_init_start"]
+        # After construction, since engines load torch while constructing
+        apply_thread_budget()
+        self.init_seconds = time.perf_counter() - start
+        if self.record_metrics:
+            get_metrics_registry().record_init(self.ocr_engine_name, self.init_seconds)
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
 class BaseOCREngine(ABC):
     """
     Abstract base class for OCR engines.
+
+    The `ocr`, `ocr_batch` and `__init__` methods of subclasses are
+    instrumented automatically: results get per-stage `timings` and calls
+    are recorded in the registry returned by `get_metrics_registry`.
     """
 
     ocr_engine_name: str = "Base OCR Engine"
+    # The number of OCR calls that may be in flight at once through `aocr`/`aocr_batch`
+    max_concurrency: int = 1
+    # Wrappers that delegate to another engine turn this off, so that each
+    # call is recorded once, by the engine doing the work
+    record_metrics: bool = True
+    # Seconds spent constructing the engine, set once it is created
+    init_seconds: Optional[float] = None
+    # The image size past which downscaling barely affects accuracy, used by
+    # `PreprocessingEngine`; None if the engine needs full resolution
+    preferred_max_side: Optional[int] = None
+    # Whether the engine works as well on single-channel images
+    accepts_grayscale: bool = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "ocr" in cls.__dict__:
+            cls.ocr = _support_regions(cls.__dict__["ocr"])
+        for method in ("ocr", "ocr_batch", "detect_batch", "recognize_batch"):
+            if method in cls.__dict__:
+                setattr(cls, method, _instrument_ocr_method(cls.__dict__[method], method))
+        if "__init__" in cls.__dict__:
+            cls.__init__ = _instrument_init(cls.__dict__["__init__"])
 
     @abstractmethod
     def ocr(self, img: ImageLike) -> OCRResult:
         """
         Performs OCR on the given image path synchronously.
 
+        Every engine also accepts `regions`, a list of (left, top, right,
+        bottom) rectangles in pixels; only those parts of the image are then
+        OCRed, see `_ocr_regions`.
+
         Args:
             img (ImageLike): The image to perform OCR on.
 
@@ -119,3 +575,208 @@ class BaseOCREngine(ABC):
             Any: The OCR result.
         """
         pass
+
+    def _ocr_regions(self, img: ImageLike, regions: Iterable, **kwargs) -> OCRResult:
+        """
+        OCRs the given rectangles of an image together, by default as one
+        `ocr_batch` call. The rectangles are NumPy views into the decoded
+        image, so nothing is copied, and the engine only processes their
+        pixels. Items are returned in full-image coordinates, in the order of
+        the regions, with the index of their region in `regions`.
+        """
+        with stage("decode"):
+            array = convert_imagelike_to_type(img, "numpy")
+        height, width = array.shape[:2]
+        views, offsets, indices = [], [], []
+        for index, (left, top, right, bottom) in enumerate(regions):
+            left, top = max(int(left), 0), max(int(top), 0)
+            right, bottom = min(int(right), width), min(int(bottom), height)
+            if right > left and bottom > top:
+                views.append(array[top:bottom, left:right])
+                offsets.append((left, top))
+                indices.append(index)
+        results = self._ocr_region_views(views, array.shape, **kwargs) if views else []
+        merged = OCRResult.concatenate(
+            OCRResult._construct(
+                texts=result.texts,
+                boxes=result.boxes + np.array(offset, dtype=np.int32),
+                confidences=result.confidences,
+                default_confidence_threshold=result.default_confidence_threshold,
+                **{**result._item_columns(), "regions": [index] * len(result)},
+            )
+            for result, offset, index in zip(results, offsets, indices)
+        )
+        if merged.regions is None:
+            merged.regions = []
+        # The results of a batch all carry the timings of the whole batch
+        merged.timings = results[0].timings if results else None
+        return merged
+
+    def _ocr_region_views(self, views: list[np.ndarray], image_shape: tuple, **kwargs) -> list[OCRResult]:
+        # Engines that rescale their input by its size override this to treat
+        # the regions at the scale of the whole image
+        return self.ocr_batch(views, len(views), **kwargs)
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        """
+        Performs OCR on several images.
+
+        The default implementation calls `ocr` once per image. Engines whose
+        backend accepts lists of images override it to run real batched
+        inference, at most `batch_size` images per model call.
+
+        Args:
+            images (Iterable[ImageLike]): The images to perform OCR on.
+            batch_size (int): The maximum number of images per model call.
+            **kwargs: Extra arguments forwarded to the engine.
+
+        Returns:
+            list[OCRResult]: One OCR result per image, in input order.
+        """
+        return [self.ocr(img, **kwargs) for img in images]
+
+    ocr_batch = _instrument_ocr_method(ocr_batch, "ocr_batch")
+
+    def detect(self, img: ImageLike) -> np.ndarray:
+        """
+        Finds the text lines of an image without recognizing them.
+
+        Returns:
+            np.ndarray: The boxes of the lines, as an (N, 4, 2) int32 array.
+        """
+        return self.detect_batch([img])[0]
+
+    def detect_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8
+    ) -> list[np.ndarray]:
+        """
+        Runs `detect` on several images, at most `batch_size` per model call.
+        Engines that cannot run detection on its own raise
+        `NotImplementedError`.
+        """
+        raise NotImplementedError(f"{self.ocr_engine_name} cannot run detection on its own")
+
+    def recognize(self, img: ImageLike, boxes=None, **kwargs) -> OCRResult:
+        """
+        Recognizes the text in known places of an image, skipping detection.
+
+        Args:
+            img (ImageLike): The image, or a crop of a single text line.
+            boxes: The places to read, as 4-point boxes, e.g. from `detect`,
+                a layout model or fixed form fields. If None, the whole image
+                is read as one line.
+            **kwargs: Extra arguments forwarded to the engine.
+
+        Returns:
+            OCRResult: One item per box, in the given order, even where no
+            text was recognized.
+        """
+        return self.recognize_batch([img], None if boxes is None else [boxes], **kwargs)[0]
+
+    def recognize_batch(
+        self,
+        images: Iterable[ImageLike],
+        boxes: Optional[Iterable] = None,
+        batch_size: int = 8,
+        **kwargs,
+    ) -> list[OCRResult]:
+        """
+        Runs `recognize` on several images, with one list of boxes per image,
+        or on line crops when `boxes` is None. The lines of up to `batch_size`
+        images are recognized together. Engines that cannot run recognition
+        on its own raise `NotImplementedError`.
+        """
+        raise NotImplementedError(f"{self.ocr_engine_name} cannot run recognition on its own")
+
+    def get_config_key(self) -> dict:
+        """
+        Returns the engine settings that affect its output, such as models and
+        languages. Result caches combine it with the image hash, so engines
+        configured differently never share cached results.
+        """
+        return {}
+
+    def warmup(self):
+        """
+        Runs OCR on a small synthetic image, so that lazy model loading and
+        first-call costs are paid before the first real image. Engines whose
+        cost depends on the input shape override it to cover typical shapes.
+        """
+        self.ocr(synthetic_text_image())
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the executor that runs this engine's blocking calls for
+        `aocr` and `aocr_batch`, creating it on first use.
+        """
+        with _async_state_lock:
+            executor = self.__dict__.get("_executor")
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix=type(self).__name__,
+                )
+                self._executor = executor
+        return executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to one event loop, so keep one per loop
+        loop = asyncio.get_running_loop()
+        with _async_state_lock:
+            semaphores = self.__dict__.get("_semaphores")
+            if semaphores is None:
+                semaphores = self._semaphores = weakref.WeakKeyDictionary()
+            semaphore = semaphores.get(loop)
+            if semaphore is None:
+                semaphore = semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.get_executor(), functools.partial(func, *args, **kwargs)
+        )
+
+    async def _aocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        return await self._run_in_executor(self.ocr, img, **kwargs)
+
+    async def aocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        """
+        Performs OCR on the given image without blocking the event loop.
+
+        At most `max_concurrency` calls run at once per engine; the rest wait
+        for a slot. Cancelling the awaiting task drops a call that has not
+        started yet, but cannot interrupt one that is already running.
+
+        Args:
+            img (ImageLike): The image to perform OCR on.
+            **kwargs: Extra arguments forwarded to `ocr`.
+
+        Returns:
+            OCRResult: The OCR result.
+        """
+        async with self._get_semaphore():
+            return await self._aocr(img, **kwargs)
+
+    async def aocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        """
+        Asynchronous counterpart of `ocr_batch`. A batch occupies a single
+        concurrency slot.
+        """
+        async with self._get_semaphore():
+            return await self._run_in_executor(
+                self.ocr_batch, list(images), batch_size, **kwargs
+            )
+
+    def close(self):
+        """
+        Shuts down the executor used by the asynchronous methods, if any.
+        """
+        with _async_state_lock:
+            executor = self.__dict__.pop("_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,60 +1,356 @@
 
-from typing import Literal, Union
+from typing import Any, Callable, Iterator, Literal, Optional, Union
 from os import PathLike
+from pathlib import Path
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
 from PIL import Image
 import numpy as np
-import cv2
+import atexit
+import mmap
+import os
 import tempfile
+import threading
+import warnings
 from io import BytesIO
 
-ImageLike = Union[str, bytes, np.ndarray, Image.Image, PathLike]
 
-def convert_imagelike_to_type(img: ImageLike, type: Literal["filepath", "numpy", "pil"]) -> Union[str, np.ndarray, Image.Image]:
+@dataclass(frozen=True)
+class RawImage:
+    """
+    Uncompressed 8-bit pixels in a buffer, such as a frame from a capture
+    pipeline or a shared-memory segment. It is turned into a NumPy view of
+    the buffer, without copying when the pixels are in BGR(A) or grayscale
+    order, as OpenCV expects.
+
+    Args:
+        buffer: Any object supporting the buffer protocol, e.g. bytes,
+            bytearray, memoryview, mmap or a NumPy array.
+        width (int): The width in pixels.
+        height (int): The height in pixels.
+        channels (int): 1 (grayscale), 3 or 4.
+        stride (int): The bytes from the start of one row to the next, for
+            rows padded for alignment. Defaults to `width * channels`.
+        offset (int): The byte offset of the first pixel in the buffer.
+        order (str): "bgr" or "rgb", the order of the color channels. RGB
+            pixels are converted to BGR, which copies them.
+    """
+
+    buffer: Any
+    width: int
+    height: int
+    channels: int = 3
+    stride: Optional[int] = None
+    offset: int = 0
+    order: Literal["bgr", "rgb"] = "bgr"
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        Returns the pixels as an OpenCV (BGR) array, a view of the buffer
+        unless the channels had to be reordered.
+        """
+        if self.channels not in (1, 3, 4):
+            raise ValueError("channels must be 1, 3 or 4")
+        stride = self.stride or self.width * self.channels
+        if stride < self.width * self.channels:
+            raise ValueError("stride is smaller than a row of pixels")
+        size = memoryview(self.buffer).nbytes
+        if self.height and self.offset + stride * (self.height - 1) + self.width * self.channels > size:
+            raise ValueError(f"A {self.width}x{self.height}x{self.channels} image does not fit in {size} bytes")
+        if self.channels == 1:
+            shape, strides = (self.height, self.width), (stride, 1)
+        else:
+            shape, strides = (self.height, self.width, self.channels), (stride, self.channels, 1)
+        array = np.ndarray(shape, np.uint8, buffer=self.buffer, offset=self.offset, strides=strides)
+        if self.order == "rgb" and self.channels > 1:
+            import cv2
+
+            return cv2.cvtColor(array, cv2.COLOR_RGB2BGR if self.channels == 3 else cv2.COLOR_RGBA2BGRA)
+        return array
+
+
+# Objects holding an encoded image, read through the buffer protocol
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+ImageLike = Union[str, bytes, bytearray, memoryview, mmap.mmap, np.ndarray, Image.Image, PathLike, RawImage]
+
+# The conversions done in the current `conversion_cache` block, by input
+_conversions: ContextVar[Optional[OrderedDict]] = ContextVar("_conversions", default=None)
+
+# Inputs whose conversions are kept at once; a batch only reuses the
+# conversions of the image at hand, so memory stays bounded
+_CONVERSION_CACHE_SIZE = 4
+
+# Leading bytes of the encoded formats that can be handed to engines as-is
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"\xff\xd8\xff": ".jpg",
+    b"BM": ".bmp",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+    b"II*\x00": ".tif",
+    b"MM\x00*": ".tif",
+}
+
+
+def guess_image_format(data: bytes) -> Optional[str]:
+    """
+    Returns the file extension matching the encoded image in `data`, or None
+    if the format is not recognized.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if data.startswith(signature):
+            return extension
+    return None
+
+
+def is_buffer(img: Any) -> bool:
+    """
+    Returns whether `img` is an encoded image held in a buffer (bytes,
+    bytearray, memoryview or mmap).
+    """
+    return isinstance(img, BUFFER_TYPES)
+
+
+def read_image_file(path: Union[str, PathLike], flags: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    Decodes an image file with OpenCV through a memory map of the file, so
+    that its bytes are not copied into a Python buffer first. Unlike
+    `cv2.imread`, this also handles non-ASCII paths on Windows.
+
+    Args:
+        path (str | PathLike): The image file.
+        flags (int): The `cv2.IMREAD_*` flags, by default `IMREAD_COLOR`.
+
+    Returns:
+        np.ndarray | None: The image, or None if it could not be decoded.
+    """
+    import cv2
+
+    flags = cv2.IMREAD_COLOR if flags is None else flags
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = np.frombuffer(mapped, np.uint8)
+            try:
+                return cv2.imdecode(data, flags)
+            finally:
+                # The map cannot be closed while an array refers to it
+                del data
+
+
+@contextmanager
+def conversion_cache() -> Iterator[None]:
+    """
+    Within the block, `convert_imagelike_to_type` decodes or converts each
+    input object to a NumPy array or PIL image at most once, and returns the
+    same result to later requests for that representation, e.g. when both a
+    wrapper and the engine it wraps convert the image. Nested blocks share
+    the outermost cache. Engines enter it for every OCR call, so the
+    converted images must be treated as read-only.
+    """
+    if _conversions.get() is not None:
+        yield
+        return
+    token = _conversions.set(OrderedDict())
+    try:
+        yield
+    finally:
+        _conversions.reset(token)
+
+
+def _cached_conversion(img: Any, type: str, convert: Callable[[Any], Any]) -> Any:
+    cache = _conversions.get()
+    if cache is None:
+        return convert(img)
+    key = id(img)
+    entry = cache.get(key)
+    # The input is kept in the entry, so its id cannot be reused while cached
+    if entry is None or entry[0] is not img:
+        entry = cache[key] = (img, {})
+        if len(cache) > _CONVERSION_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    if type not in entry[1]:
+        entry[1][type] = convert(img)
+    return entry[1][type]
+
+
+def get_temp_dir() -> str:
+    """
+    Returns the directory for temporary image files, preferring the
+    RAM-backed /dev/shm when it is available.
+    """
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return tempfile.gettempdir()
+
+
+def encode_image(img: ImageLike, format: str = ".bmp") -> tuple[Union[bytes, memoryview], str]:
+    """
+    Returns the image as encoded bytes together with their file extension.
+
+    Encoded buffers and files in a recognized format are passed through
+    without re-encoding, buffers other than bytes as a memoryview rather than
+    a copy; arrays and PIL images are encoded as `format`. The default, BMP,
+    is uncompressed and therefore the cheapest to produce.
+
+    Args:
+        img (ImageLike): The image-like object to encode.
+        format (str): The extension of the encoding used when one is needed.
+
+    Returns:
+        tuple[bytes | memoryview, str]: The encoded image and its extension.
+    """
+    if isinstance(img, (str, PathLike)):
+        data = Path(img).read_bytes()
+        return data, guess_image_format(data) or Path(img).suffix
+    elif is_buffer(img):
+        data = img if isinstance(img, bytes) else memoryview(img).cast("B")
+        extension = guess_image_format(data[:16].tobytes() if isinstance(data, memoryview) else data)
+        if extension is not None:
+            return data, extension
+        img = Image.open(BytesIO(data))
+    elif isinstance(img, RawImage):
+        img = img.to_numpy()
+    if isinstance(img, np.ndarray):
+        import cv2
+
+        params = [cv2.IMWRITE_PNG_COMPRESSION, 1] if format == ".png" else []
+        ok, buffer = cv2.imencode(format, img, params)
+        if not ok:
+            raise ValueError(f"Could not encode image as {format}")
+        return buffer.tobytes(), format
+    elif isinstance(img, Image.Image):
+        if img.mode not in ("1", "L", "P", "RGB", "RGBA"):
+            img = img.convert("RGB")
+        output = BytesIO()
+        save_kwargs = {"compress_level": 1} if format == ".png" else {}
+        img.save(output, format=Image.registered_extensions()[format], **save_kwargs)
+        return output.getvalue(), format
+    raise TypeError("Unsupported image type for encoding.")
+
+
+def synthetic_text_image(height: int = 64, width: int = 256) -> np.ndarray:
+    """
+    Returns a white BGR image of the given size with lines of black text,
+    used to warm engines up with realistic inputs.
+    """
+    import cv2
+
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    line_height = max(min(height // 2, 48), 16)
+    scale = line_height / 40
+    for row, y in enumerate(range(line_height, height, 2 * line_height)):
+        cv2.putText(img, f"Warm up line {row} 0123", (line_height // 2, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), 2)
+    return img
+
+
+def _write_temp_image(img: ImageLike, format: str) -> str:
+    data, extension = encode_image(img, format)
+    fd, filepath = tempfile.mkstemp(suffix=extension, dir=get_temp_dir())
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(data)
+    return filepath
+
+
+@contextmanager
+def imagelike_as_filepath(img: ImageLike, format: str = ".bmp") -> Iterator[str]:
+    """
+    Provides a file path for the image for the duration of the `with` block.
+
+    Paths are used directly. Other inputs are written to a temporary file in
+    a RAM-backed directory when possible, without re-encoding bytes that are
+    already an encoded image, and the file is removed on exit.
+
+    Args:
+        img (ImageLike): The image-like object.
+        format (str): The extension of the encoding used when one is needed.
+
+    Yields:
+        str: The path of the image file.
+    """
+    if isinstance(img, (str, PathLike)):
+        yield str(img)
+        return
+    filepath = _write_temp_image(img, format)
+    try:
+        yield filepath
+    finally:
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+
+
+# Temporary files handed out by the deprecated "filepath" conversion
+_temp_files = ExitStack()
+_temp_files_lock = threading.Lock()
+atexit.register(_temp_files.close)
+
+
+def convert_imagelike_to_type(img: ImageLike, type: Literal["filepath", "numpy", "pil", "bytes"]) -> Union[str, np.ndarray, Image.Image, bytes]:
     """
     Converts the input image-like object to the specified type.
 
+    "filepath" is deprecated: inputs that are not paths are written to a
+    temporary file that is only removed when the interpreter exits. Use the
+    `imagelike_as_filepath` context manager, which removes it after the
+    `with` block. "bytes" returns an encoded image.
+
     Args:
         img (ImageLike): The image-like object to convert.
-        type (Literal["filepath", "numpy", "pil"]): The type to convert to.
+        type (Literal["filepath", "numpy", "pil", "bytes"]): The type to convert to.
 
     Returns:
-        Union[str, np.ndarray, Image.Image]: The converted image.
+        Union[str, np.ndarray, Image.Image, bytes]: The converted image.
     """
+    # OpenCV is slow to import, so it is loaded on first use
+    import cv2
+
     # If the desired type is 'filepath'
     if type == "filepath":
         if isinstance(img, (str, PathLike)):
             # Already a filepath
             return str(img)
+        elif isinstance(img, (*BUFFER_TYPES, np.ndarray, Image.Image, RawImage)):
+            warnings.warn(
+                'convert_imagelike_to_type(img, "filepath") is deprecated, as the temporary file '
+                "outlives the call; use `with imagelike_as_filepath(img) as path:` instead",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            # The file is removed at exit at the latest
+            with _temp_files_lock:
+                return _temp_files.enter_context(imagelike_as_filepath(img, ".png"))
         else:
-            # Create a temporary file to save the image
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                filepath = tmp_file.name
-            if isinstance(img, Image.Image):
-                img.save(filepath)
-            elif isinstance(img, np.ndarray):
-                # Save NumPy array using OpenCV
-                cv2.imwrite(filepath, img)
-            elif isinstance(img, bytes):
-                # Convert bytes to PIL Image and save
-                pil_img = Image.open(BytesIO(img))
-                pil_img.save(filepath)
-            else:
-                raise TypeError("Unsupported image type for conversion to filepath.")
-            return filepath
+            raise TypeError("Unsupported image type for conversion to filepath.")
+
+    # If the desired type is 'bytes' (an encoded image)
+    elif type == "bytes":
+        if isinstance(img, (str, PathLike, *BUFFER_TYPES, np.ndarray, Image.Image, RawImage)):
+            data = encode_image(img)[0]
+            return data if isinstance(data, bytes) else bytes(data)
+        else:
+            raise TypeError("Unsupported image type for conversion to bytes.")
 
     # If the desired type is 'pil'
     elif type == "pil":
         if isinstance(img, Image.Image):
             return img  # Already a PIL image
-        elif isinstance(img, np.ndarray):
-            # Convert from OpenCV format (BGR) to PIL format (RGB)
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            pil_img = Image.fromarray(img_rgb)
-            return pil_img
-        elif isinstance(img, bytes):
-            return Image.open(BytesIO(img))
+        elif isinstance(img, (np.ndarray, RawImage)):
+            return _cached_conversion(img, type, _numpy_to_pil)
+        elif is_buffer(img):
+            return _cached_conversion(img, type, lambda data: Image.open(BytesIO(data)))
         elif isinstance(img, (str, PathLike)):
-            return Image.open(img)
+            return _cached_conversion(img, type, Image.open)
         else:
             raise TypeError("Unsupported image type for conversion to PIL image.")
 
@@ -62,22 +358,32 @@ def convert_imagelike_to_type(img: ImageLike, type: Literal["filepath", "numpy",
     elif type == "numpy":
         if isinstance(img, np.ndarray):
             return img  # Already a NumPy array in OpenCV format
+        elif isinstance(img, RawImage):
+            return _cached_conversion(img, type, RawImage.to_numpy)
         elif isinstance(img, Image.Image):
             # Convert PIL image to NumPy array in OpenCV format (BGR)
-            img_rgb = np.array(img)
-            img_bgr = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
-            return img_bgr
-        elif isinstance(img, bytes):
-            # Decode bytes to NumPy array using OpenCV
-            nparr = np.frombuffer(img, np.uint8)
-            img_cv = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            return img_cv
+            return _cached_conversion(img, type, lambda pil_img: cv2.cvtColor(np.asarray(pil_img), cv2.COLOR_RGB2BGR))
+        elif is_buffer(img):
+            # Decode the buffer with OpenCV, without copying it
+            return _cached_conversion(img, type, lambda data: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
         elif isinstance(img, (str, PathLike)):
-            # Read image from file using OpenCV
-            img_cv = cv2.imread(str(img))
-            return img_cv
+            return _cached_conversion(img, type, read_image_file)
         else:
             raise TypeError("Unsupported image type for conversion to NumPy array.")
 
     else:
-        raise ValueError(f"Unknown target type: {type}")
\ No newline at end of file
+        raise ValueError(f"Unknown target type: {type}")
+
+
+def _numpy_to_pil(img: Union[np.ndarray, RawImage]) -> Image.Image:
+    # Convert from OpenCV format (BGR) to PIL format (RGB)
+    import cv2
+
+    if isinstance(img, RawImage):
+        if img.order == "rgb":
+            # The pixels are already in PIL's order
+            return Image.fromarray(np.ascontiguousarray(replace(img, order="bgr").to_numpy()))
+        img = img.to_numpy()
+    if img.ndim == 2:
+        return Image.fromarray(img)
+    return Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB if img.shape[2] == 3 else cv2.COLOR_BGRA2RGBA))
@@ -0,0 +1,262 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = "my_little_ocr"
+
+METRIC_HELP = {
+    "calls_total": ("counter", "OCR calls, by engine and method"),
+    "errors_total": ("counter", "OCR calls that raised, by engine and method"),
+    "images_total": ("counter", "Images processed, by engine"),
+    "items_total": ("counter", "OCR items returned, by engine"),
+    "call_seconds": ("histogram", "Duration of OCR calls, by engine and method"),
+    "stage_seconds": ("histogram", "Duration of the stages of OCR calls, by engine and stage"),
+    "init_seconds": ("histogram", "Duration of engine construction, including model loading"),
+    "rejected_total": ("counter", "Images the server rejected because the engine was at capacity, by engine"),
+}
+
+
+class StageTimer:
+    """
+    Accumulates the time spent in named stages of one OCR call.
+    """
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        # Engines may time stages from several threads of one call
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("_current_timer", default=None)
+
+
+def current_timer() -> Optional[StageTimer]:
+    """
+    Returns the timer of the OCR call running in this context, if any.
+    """
+    return _current_timer.get()
+
+
+@contextmanager
+def timed_call() -> Iterator[StageTimer]:
+    """
+    Makes a new `StageTimer` the current one for the duration of the block,
+    so `stage` and `record_stage` calls inside it are collected there.
+    """
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Times a stage of the current OCR call. Outside of an instrumented call
+    this does nothing, so engine code can use it unconditionally.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def record_stage(name: str, seconds: Optional[float]):
+    """
+    Adds a duration measured elsewhere, such as one reported by the OCR
+    backend, to the current OCR call.
+    """
+    timer = _current_timer.get()
+    if timer is not None and seconds is not None:
+        timer.add(name, float(seconds))
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[int]:
+        counts, total = [], 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    # Exact, unlike "{:g}", which would round large counters to 6 digits
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and latency histograms, keyed by metric
+    name and labels. Engines record into the process-wide registry returned
+    by `get_metrics_registry`.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple[str, tuple]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def record_call(
+        self,
+        engine: str,
+        method: str,
+        seconds: float,
+        timings: Optional[dict[str, float]] = None,
+        images: int = 1,
+        items: int = 0,
+        error: bool = False,
+    ):
+        """
+        Records one OCR call and the duration of each of its stages.
+        """
+        self.inc("calls_total", engine=engine, method=method)
+        self.observe("call_seconds", seconds, engine=engine, method=method)
+        if error:
+            self.inc("errors_total", engine=engine, method=method)
+            return
+        self.inc("images_total", images, engine=engine)
+        self.inc("items_total", items, engine=engine)
+        for stage_name, stage_seconds in (timings or {}).items():
+            self.observe("stage_seconds", stage_seconds, engine=engine, stage=stage_name)
+
+    def record_init(self, engine: str, seconds: float):
+        self.observe("init_seconds", seconds, engine=engine)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current values as plain data: counters by name and
+        labels, and histograms as count, sum and per-bucket counts.
+        """
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._counters.items()
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": dict(zip([*map(str, histogram.buckets), "+Inf"], histogram.cumulative_counts())),
+                    }
+                    for (name, labels), histogram in self._histograms.items()
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, histogram.count, histogram.sum, histogram.cumulative_counts(), histogram.buckets)
+                for key, histogram in self._histograms.items()
+            )
+
+        lines = []
+        described = set()
+
+        def describe(name: str):
+            if name not in described:
+                described.add(name)
+                kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{METRIC_PREFIX}_{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), count, total, cumulative, buckets in histograms:
+            describe(name)
+            for bound, bucket_count in zip([*(f"{b:g}" for b in buckets), "+Inf"], cumulative):
+                bucket_labels = (*labels, ("le", bound))
+                lines.append(f"{METRIC_PREFIX}_{name}_bucket{_format_labels(bucket_labels)} {bucket_count}")
+            lines.append(f"{METRIC_PREFIX}_{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{METRIC_PREFIX}_{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Returns the process-wide registry all engines record into.
+    """
+    return _registry
@@ -0,0 +1,132 @@
+import os
+from dataclasses import dataclass, replace
+from typing import Optional
+
+THREADS_ENV = "MY_LITTLE_OCR_THREADS"
+ENGINES_ENV = "MY_LITTLE_OCR_ENGINES"
+PROCESSES_ENV = "MY_LITTLE_OCR_PROCESSES"
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may run on, which respects CPU
+    affinity (e.g. `taskset` or container CPU sets) where the platform
+    reports it.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """
+    The CPU threads OCR may use in this process, shared between the engines
+    loaded in it.
+
+    Torch (EasyOCR, Surya), onnxruntime (RapidOCR), Tesseract's OpenMP and
+    OpenCV each default to using every core, so several engines in one
+    process, or several processes on one machine, oversubscribe the CPU.
+    Engines read the budget when they are constructed and size their thread
+    pools to `engine_threads`.
+
+    Args:
+        threads (int): The threads for this process. Defaults to the
+            available CPUs divided between `processes`.
+        engines (int): The engines running at the same time in this process,
+            which split the threads evenly.
+        processes (int): The OCR processes sharing the machine, such as
+            several servers, used when `threads` is not given.
+    """
+
+    threads: Optional[int] = None
+    engines: int = 1
+    processes: int = 1
+
+    @property
+    def process_threads(self) -> int:
+        if self.threads:
+            return self.threads
+        return max(available_cpus() // max(self.processes, 1), 1)
+
+    @property
+    def engine_threads(self) -> int:
+        return max(self.process_threads // max(self.engines, 1), 1)
+
+    def split(self, parts: int) -> "ThreadBudget":
+        """
+        Returns the budget of each of `parts` worker processes sharing this
+        one, e.g. the workers of an `EnginePool`.
+        """
+        return replace(self, threads=max(self.process_threads // max(parts, 1), 1), processes=1)
+
+    @classmethod
+    def from_env(cls) -> Optional["ThreadBudget"]:
+        """
+        Returns the budget set by $MY_LITTLE_OCR_THREADS,
+        $MY_LITTLE_OCR_ENGINES and $MY_LITTLE_OCR_PROCESSES, or None if none
+        of them is set.
+        """
+        values = {
+            field: int(os.environ[name])
+            for field, name in (("threads", THREADS_ENV), ("engines", ENGINES_ENV), ("processes", PROCESSES_ENV))
+            if os.environ.get(name)
+        }
+        return cls(**values) if values else None
+
+
+_budget: Optional[ThreadBudget] = None
+_budget_loaded = False
+
+
+def get_thread_budget() -> Optional[ThreadBudget]:
+    """
+    Returns the thread budget of this process, read from the environment on
+    first use, or None if there is none, in which case every library keeps
+    its own default.
+    """
+    global _budget, _budget_loaded
+    if not _budget_loaded:
+        _budget, _budget_loaded = ThreadBudget.from_env(), True
+    return _budget
+
+
+def set_thread_budget(budget: Optional[ThreadBudget] = None, **kwargs):
+    """
+    Sets the thread budget for engines constructed from now on, either as a
+    `ThreadBudget` or as its arguments, e.g. `set_thread_budget(threads=8,
+    engines=2)`. `set_thread_budget(None)` removes it.
+    """
+    global _budget, _budget_loaded
+    if budget is not None and kwargs:
+        raise TypeError("Pass either a ThreadBudget or its arguments")
+    _budget, _budget_loaded = budget or (ThreadBudget(**kwargs) if kwargs else None), True
+
+
+def engine_threads() -> Optional[int]:
+    """
+    Returns the threads each engine may use under the current budget, or
+    None if there is no budget.
+    """
+    budget = get_thread_budget()
+    return budget.engine_threads if budget is not None else None
+
+
+def apply_thread_budget():
+    """
+    Limits the process-wide thread pools to the current budget: OpenCV's,
+    and torch's if torch is loaded. Engines call this when they are
+    constructed; it does nothing without a budget.
+    """
+    threads = engine_threads()
+    if threads is None:
+        return
+    import sys
+
+    import cv2
+
+    cv2.setNumThreads(threads)
+    # Only torch engines load torch, so it is not imported here otherwise
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
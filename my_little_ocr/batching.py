@@ -0,0 +1,208 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike
+
+
+class _Request:
+    __slots__ = ("img", "kwargs", "future", "enqueued")
+
+    def __init__(self, img: ImageLike, kwargs: dict):
+        self.img = img
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+def _kwargs_key(kwargs: dict) -> str:
+    # Only requests with the same arguments can share an `ocr_batch` call
+    return json.dumps(kwargs, sort_keys=True, default=repr)
+
+
+class MicroBatchingEngine(BaseOCREngine):
+    """
+    Wraps an engine so that concurrent single-image `ocr` calls are grouped
+    into `ocr_batch` calls, for engines that recognize lists of images much
+    faster than the same images one by one.
+
+    A background thread waits for a first request, collects more for up to
+    `max_latency_ms` or until `max_batch_size` images are waiting, then runs
+    them as one batch and hands each caller its own result. While a batch
+    runs, new requests queue up and form the next one.
+
+    Results carry the engine's timings for the batch, plus "queue", the
+    seconds the image waited before its batch started.
+
+    Args:
+        engine (BaseOCREngine): The engine to wrap.
+        max_batch_size (int): The largest batch dispatched at once.
+        max_latency_ms (float): How long the first request of a batch waits
+            for others to join it.
+    """
+
+    record_metrics = False
+
+    def __init__(
+        self,
+        engine: BaseOCREngine,
+        max_batch_size: int = 8,
+        max_latency_ms: float = 10.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self.ocr_engine_name = engine.ocr_engine_name
+        # Enough `aocr` calls in flight to fill one batch while another runs
+        self.max_concurrency = 2 * max_batch_size
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: dict[int, int] = {}
+        self._queue_seconds = 0.0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"{type(self).__name__}-{engine.ocr_engine_name}", daemon=True
+        )
+        self._thread.start()
+
+    def get_config_key(self) -> dict:
+        return self.engine.get_config_key()
+
+    def submit(self, img: ImageLike, **kwargs) -> "Future[OCRResult]":
+        """
+        Queues one image for the next batch.
+
+        Returns:
+            Future[OCRResult]: A future resolving to the OCR result.
+        """
+        request = _Request(img, kwargs)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatchingEngine is closed")
+            self._queue.put(request)
+        return request.future
+
+    def ocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        return self.submit(img, **kwargs).result()
+
+    async def _aocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        # Awaits the batch without holding an executor thread
+        return await asyncio.wrap_future(self.submit(img, **kwargs))
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        # Already a batch; it goes straight to the engine
+        return self.engine.ocr_batch(images, batch_size, **kwargs)
+
+    def _collect(self, first: _Request) -> list[_Request]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_latency_ms / 1000
+        while len(batch) < self.max_batch_size:
+            # Requests that queued up during the previous batch are taken
+            # without waiting
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [request for request in self._collect(first) if request.future.set_running_or_notify_cancel()]
+            groups: dict[str, list[_Request]] = {}
+            for request in batch:
+                groups.setdefault(_kwargs_key(request.kwargs), []).append(request)
+            for requests in groups.values():
+                self._dispatch(requests)
+
+    def _dispatch(self, requests: list[_Request]):
+        started = time.perf_counter()
+        with self._stats_lock:
+            self._batch_sizes[len(requests)] = self._batch_sizes.get(len(requests), 0) + 1
+            self._queue_seconds += sum(started - request.enqueued for request in requests)
+        try:
+            results = self.engine.ocr_batch(
+                [request.img for request in requests], len(requests), **requests[0].kwargs
+            )
+        except Exception as e:
+            if len(requests) == 1:
+                requests[0].future.set_exception(e)
+                return
+            # Retry the images one by one, so that only those at fault fail
+            for request in requests:
+                self._dispatch_one(request, started)
+            return
+        if len(results) != len(requests):
+            # Which image each result belongs to is unknown, so fail them all
+            error = RuntimeError(
+                f"{type(self.engine).__name__}.ocr_batch returned {len(results)} results for {len(requests)} images"
+            )
+            for request in requests:
+                request.future.set_exception(error)
+            return
+        for request, result in zip(requests, results):
+            request.future.set_result(self._with_queue_time(result, started - request.enqueued))
+
+    def _dispatch_one(self, request: _Request, started: float):
+        try:
+            result = self.engine.ocr(request.img, **request.kwargs)
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+        request.future.set_result(self._with_queue_time(result, started - request.enqueued))
+
+    @staticmethod
+    def _with_queue_time(result: OCRResult, seconds: float) -> OCRResult:
+        if result.timings is not None:
+            timings = {"queue": seconds, **result.timings}
+            timings["total"] = timings.get("total", 0.0) + seconds
+            result.timings = timings
+        return result
+
+    def stats(self) -> dict:
+        """
+        Returns the number of batches dispatched, the images they contained,
+        the mean batch size, the count of batches by size, and the mean
+        seconds images waited before their batch started.
+        """
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            images = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "batches": batches,
+                "images": images,
+                "mean_batch_size": images / batches if batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "mean_queue_seconds": self._queue_seconds / images if images else 0.0,
+            }
+
+    def close(self):
+        """
+        Stops the batching thread once the queued requests are done.
+        """
+        with self._lock:
+            closing = not self._closed
+            if closing:
+                self._closed = True
+                self._queue.put(None)
+        if closing:
+            self._thread.join()
+        super().close()
@@ -0,0 +1,681 @@
+"""
+Offline benchmark of the OCR engines on synthetic images.
+
+Images of printed text are generated locally with PIL, varying resolution,
+text density, script and font size, so runs need neither network access nor
+test data and are reproducible across machines and commits. Each engine is
+measured in a fresh process, which makes cold start and peak memory
+comparable between engines.
+
+Engines can be given with constructor arguments, as "name:key=value,...",
+to compare configurations of one engine; each such variant is also compared
+with the plain engine in the report's `deltas`.
+
+Usage:
+    python -m my_little_ocr.bench --output bench.json
+    python -m my_little_ocr.bench --engines rapidocr tesseract --quick
+    python -m my_little_ocr.bench --engines rapidocr rapidocr:precision=int8
+    python -m my_little_ocr.bench --compare baseline.json
+"""
+
+import argparse
+import difflib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Literal, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from pydantic import BaseModel, Field
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike, convert_imagelike_to_type
+
+Script = Literal["latin", "cyrillic", "cjk"]
+
+# Words the synthetic lines are drawn from, per script
+SCRIPT_WORDS: dict[str, list[str]] = {
+    "latin": (
+        "the quick brown fox jumps over a lazy dog invoice total amount due date "
+        "page table figure result model engine receipt order number customer "
+        "address street city 2024 15.99 42 No. Ref: ID-7731"
+    ).split(),
+    "cyrillic": (
+        "съешь же ещё этих мягких французских булок да выпей чаю счёт итого сумма "
+        "дата страница таблица рисунок результат заказ номер адрес улица город"
+    ).split(),
+    "cjk": (
+        "发票 总计 金额 日期 页面 表格 图片 结果 模型 引擎 收据 订单 编号 客户 地址 "
+        "街道 城市 识别 文字 测试 中文 简体 数据 系统 时间 价格 数量 名称 说明 备注"
+    ).split(),
+}
+
+# Font files tried in order; PIL also searches the system font directories
+FONT_CANDIDATES: dict[str, list[str]] = {
+    "latin": ["DejaVuSans.ttf", "arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"],
+    "cyrillic": ["DejaVuSans.ttf", "arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"],
+    "cjk": [
+        "NotoSansCJK-Regular.ttc",
+        "NotoSansSC-Regular.otf",
+        "wqy-microhei.ttc",
+        "wqy-zenhei.ttc",
+        "msyh.ttc",
+        "simhei.ttf",
+        "PingFang.ttc",
+    ],
+}
+
+
+class ImageSpec(BaseModel):
+    """
+    Parameters of one synthetic benchmark image.
+    """
+
+    width: int = Field(1280, description="Image width in pixels")
+    height: int = Field(720, description="Image height in pixels")
+    script: Script = Field("latin", description="The writing system of the text")
+    font_size: int = Field(24, description="Font size in pixels")
+    density: float = Field(0.5, description="Fraction of the line slots that hold text")
+    seed: int = Field(0, description="Seed of the random text and layout")
+
+    @property
+    def label(self) -> str:
+        return f"{self.script}-{self.width}x{self.height}-f{self.font_size}-d{self.density:g}"
+
+
+def load_font(script: str, size: int) -> Optional[ImageFont.FreeTypeFont]:
+    """
+    Returns a font able to render `script`, or None if none is installed.
+    Latin text falls back to the font bundled with PIL.
+    """
+    for name in FONT_CANDIDATES[script]:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    if script == "latin":
+        return ImageFont.load_default(size)
+    return None
+
+
+def available_scripts() -> list[str]:
+    return [script for script in SCRIPT_WORDS if load_font(script, 12) is not None]
+
+
+def generate_image(spec: ImageSpec) -> tuple[np.ndarray, str]:
+    """
+    Renders black text on a white background.
+
+    Args:
+        spec (ImageSpec): The parameters of the image.
+
+    Returns:
+        tuple[np.ndarray, str]: The image in OpenCV (BGR) format and the text
+        it contains, one line per rendered line.
+    """
+    font = load_font(spec.script, spec.font_size)
+    if font is None:
+        raise RuntimeError(f"No font available for the {spec.script} script")
+    rng = random.Random(f"{spec.label}-{spec.seed}")
+    words = SCRIPT_WORDS[spec.script]
+    separator = "" if spec.script == "cjk" else " "
+
+    img = Image.new("RGB", (spec.width, spec.height), "white")
+    draw = ImageDraw.Draw(img)
+    margin = spec.font_size
+    line_height = int(spec.font_size * 1.6)
+    slots = max((spec.height - 2 * margin) // line_height, 1)
+    filled = sorted(rng.sample(range(slots), max(round(slots * spec.density), 1)))
+
+    lines = []
+    for slot in filled:
+        # Lines end at a random point so the layout is not a uniform block
+        max_width = rng.uniform(0.3, 1.0) * (spec.width - 2 * margin)
+        line = rng.choice(words)
+        while True:
+            candidate = line + separator + rng.choice(words)
+            if draw.textlength(candidate, font=font) > max_width:
+                break
+            line = candidate
+        draw.text((margin, margin + slot * line_height), line, fill="black", font=font)
+        lines.append(line)
+    return convert_imagelike_to_type(img, "numpy"), "\n".join(lines)
+
+
+def default_specs(quick: bool = False) -> list[ImageSpec]:
+    """
+    Returns the grid of images to benchmark on, limited to the scripts for
+    which a font is installed. `quick` returns one image per script.
+    """
+    scripts = available_scripts()
+    if quick:
+        return [ImageSpec(width=960, height=540, script=script) for script in scripts]
+    resolutions = [(640, 480), (1280, 720), (1920, 1080)]
+    font_sizes = [16, 32]
+    densities = [0.2, 0.8]
+    return [
+        ImageSpec(width=width, height=height, script=script, font_size=font_size, density=density)
+        for script, (width, height), font_size, density in itertools.product(
+            scripts, resolutions, font_sizes, densities
+        )
+    ]
+
+
+def text_similarity(expected: str, result: OCRResult) -> float:
+    """
+    Returns the similarity (0 to 1) of the recognized and the expected text,
+    ignoring whitespace. Items are read in position order.
+    """
+    recognized = "".join(result.sort_by_position().texts)
+    expected = "".join(expected.split())
+    recognized = "".join(recognized.split())
+    if not expected and not recognized:
+        return 1.0
+    return difflib.SequenceMatcher(None, expected, recognized, autojunk=False).ratio()
+
+
+class FakeOCREngine(BaseOCREngine):
+    """
+    Stand-in engine used when no OCR backend is installed. It finds blocks of
+    dark pixels with OpenCV and returns their boxes without any text, which
+    exercises the benchmark and the result handling at a realistic cost.
+    """
+
+    ocr_engine_name = "fake"
+
+    def ocr(self, img: ImageLike) -> OCRResult:
+        import cv2
+
+        img = convert_imagelike_to_type(img, "numpy")
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        mask = cv2.dilate(mask, np.ones((3, 15), np.uint8))
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = [cv2.boxPoints(cv2.minAreaRect(contour)) for contour in contours]
+        return OCRResult.from_columns(
+            texts=[""] * len(boxes),
+            boxes=np.array(boxes).reshape(-1, 4, 2),
+        )
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Returns the peak resident memory of the current process in MiB, or None
+    if it cannot be determined on this platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KiB elsewhere
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _windows_peak_rss_mb() -> Optional[float]:
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / (1 << 20)
+    except Exception:
+        return None
+
+
+class LatencyStats(BaseModel):
+    """
+    Summary of per-image latencies, in milliseconds.
+    """
+
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+    min: float
+    max: float
+
+    @classmethod
+    def from_seconds(cls, latencies: list[float]) -> "LatencyStats":
+        ms = np.asarray(latencies, dtype=np.float64) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        return cls(
+            mean=float(ms.mean()),
+            p50=float(p50),
+            p95=float(p95),
+            p99=float(p99),
+            min=float(ms.min()),
+            max=float(ms.max()),
+        )
+
+
+class SpecResult(BaseModel):
+    """
+    Latency and accuracy of one engine on one image.
+    """
+
+    label: str
+    p50_ms: float
+    similarity: float = Field(..., description="Text similarity to the ground truth, 0 to 1")
+    items: int = Field(..., description="Number of items the engine returned")
+
+
+class EngineBenchmark(BaseModel):
+    """
+    Measurements of one engine.
+    """
+
+    engine_name: str
+    error: Optional[str] = Field(None, description="Why the benchmark failed, if it did")
+    import_s: Optional[float] = Field(None, description="Time to import the engine module")
+    init_s: Optional[float] = Field(None, description="Time to construct the engine")
+    first_ocr_s: Optional[float] = Field(None, description="Time of the first, cold OCR call")
+    cold_start_s: Optional[float] = Field(None, description="Import, construction and first call")
+    throughput_ips: Optional[float] = Field(None, description="Images per second, one at a time")
+    batch_throughput_ips: Optional[float] = Field(None, description="Images per second with ocr_batch")
+    latency_ms: Optional[LatencyStats] = None
+    stage_s: dict[str, float] = Field(default_factory=dict, description="Mean seconds per image of each stage")
+    mean_similarity: Optional[float] = None
+    peak_rss_mb: Optional[float] = Field(None, description="Peak memory of the benchmark process")
+    engine_rss_mb: Optional[float] = Field(None, description="Peak memory added by the engine")
+    specs: list[SpecResult] = Field(default_factory=list)
+
+
+class VariantDelta(BaseModel):
+    """
+    How an engine configured with arguments compares with the engine's
+    defaults in the same run.
+    """
+
+    engine_name: str
+    baseline: str = Field(..., description="The engine it is compared with")
+    throughput_change: Optional[float] = Field(None, description="Relative change of images per second")
+    p50_change: Optional[float] = Field(None, description="Relative change of the median latency")
+    similarity_change: Optional[float] = Field(None, description="Change of the mean text similarity")
+    stage_changes: dict[str, float] = Field(
+        default_factory=dict, description="Relative change of the mean seconds of each stage"
+    )
+
+
+class BenchmarkReport(BaseModel):
+    """
+    A complete benchmark run, serializable to JSON for comparison across
+    commits and machines.
+    """
+
+    created_at: str
+    git_commit: Optional[str] = None
+    python: str
+    platform: str
+    cpu_count: Optional[int] = None
+    repeats: int
+    batch_size: int
+    images: list[ImageSpec]
+    results: list[EngineBenchmark]
+    deltas: list[VariantDelta] = Field(default_factory=list)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return completed.stdout.strip() or None
+
+
+def parse_engine_spec(spec: str) -> tuple[str, dict]:
+    """
+    Splits "name:key=value,..." into the engine name and its constructor
+    arguments. Values are parsed as JSON where possible, and kept as strings
+    otherwise.
+    """
+    name, _, arguments = spec.partition(":")
+    kwargs = {}
+    for argument in filter(None, arguments.split(",")):
+        key, separator, value = argument.partition("=")
+        if not separator:
+            raise ValueError(f"Expected key=value in engine spec {spec!r}")
+        try:
+            kwargs[key.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            kwargs[key.strip()] = value
+    return name, kwargs
+
+
+def benchmark_engine(
+    engine_name: str,
+    specs: list[ImageSpec],
+    repeats: int = 3,
+    batch_size: int = 0,
+    engine_kwargs: Optional[dict] = None,
+) -> EngineBenchmark:
+    """
+    Benchmarks one engine in the current process. Use `run_benchmark` to
+    measure engines in fresh processes, which cold start and peak memory
+    figures assume.
+
+    Args:
+        engine_name (str): The engine to measure, or "fake" for `FakeOCREngine`,
+            optionally with arguments (see `parse_engine_spec`).
+        specs (list[ImageSpec]): The images to run on.
+        repeats (int): How many times each image is recognized.
+        batch_size (int): If positive, also measure `ocr_batch` with this batch size.
+        engine_kwargs (dict): Arguments for the engine constructor.
+
+    Returns:
+        EngineBenchmark: The measurements.
+    """
+    images, truths = zip(*(generate_image(spec) for spec in specs))
+    report = EngineBenchmark(engine_name=engine_name)
+    rss_before = peak_rss_mb()
+
+    name, spec_kwargs = parse_engine_spec(engine_name)
+    start = time.perf_counter()
+    if name == "fake":
+        engine_class = FakeOCREngine
+    else:
+        from my_little_ocr.ocr_engines import get_engine_class
+
+        engine_class = get_engine_class(name)
+    report.import_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = engine_class(**spec_kwargs, **(engine_kwargs or {}))
+    report.init_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.ocr(images[0])
+    report.first_ocr_s = time.perf_counter() - start
+    report.cold_start_s = report.import_s + report.init_s + report.first_ocr_s
+
+    latencies: list[list[float]] = [[] for _ in images]
+    results: list[OCRResult] = [None] * len(images)
+    stage_totals: dict[str, float] = {}
+    total_start = time.perf_counter()
+    for _ in range(repeats):
+        for index, img in enumerate(images):
+            start = time.perf_counter()
+            results[index] = engine.ocr(img)
+            latencies[index].append(time.perf_counter() - start)
+            for stage_name, seconds in (results[index].timings or {}).items():
+                if stage_name != "total":
+                    stage_totals[stage_name] = stage_totals.get(stage_name, 0.0) + seconds
+    total = time.perf_counter() - total_start
+    report.stage_s = {name: seconds / (len(images) * repeats) for name, seconds in stage_totals.items()}
+    report.throughput_ips = len(images) * repeats / total
+
+    if batch_size > 0:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            engine.ocr_batch(list(images), batch_size=batch_size)
+        report.batch_throughput_ips = len(images) * repeats / (time.perf_counter() - start)
+
+    report.latency_ms = LatencyStats.from_seconds(list(itertools.chain.from_iterable(latencies)))
+    for spec, truth, result, spec_latencies in zip(specs, truths, results, latencies):
+        report.specs.append(
+            SpecResult(
+                label=spec.label,
+                p50_ms=float(np.median(spec_latencies)) * 1000,
+                similarity=text_similarity(truth, result),
+                items=len(result),
+            )
+        )
+    report.mean_similarity = float(np.mean([spec.similarity for spec in report.specs]))
+
+    engine.close()
+    report.peak_rss_mb = peak_rss_mb()
+    if rss_before is not None and report.peak_rss_mb is not None:
+        report.engine_rss_mb = report.peak_rss_mb - rss_before
+    return report
+
+
+def _benchmark_engine_safely(engine_name: str, *args, **kwargs) -> EngineBenchmark:
+    try:
+        return benchmark_engine(engine_name, *args, **kwargs)
+    except Exception as e:
+        return EngineBenchmark(engine_name=engine_name, error=f"{type(e).__name__}: {e}")
+
+
+def run_benchmark(
+    engines: Optional[list[str]] = None,
+    specs: Optional[list[ImageSpec]] = None,
+    repeats: int = 3,
+    batch_size: int = 0,
+    isolate: bool = True,
+    engine_kwargs: Optional[dict[str, dict]] = None,
+) -> BenchmarkReport:
+    """
+    Benchmarks several engines and collects the results in a report.
+
+    Args:
+        engines (list[str]): The engines to measure. Defaults to every
+            available engine, or the fake engine if none is installed.
+        specs (list[ImageSpec]): The images to run on. Defaults to `default_specs()`.
+        repeats (int): How many times each image is recognized.
+        batch_size (int): If positive, also measure `ocr_batch` with this batch size.
+        isolate (bool): Measure each engine in a freshly spawned process.
+        engine_kwargs (dict[str, dict]): Constructor arguments, per engine name.
+
+    Returns:
+        BenchmarkReport: The report of the run.
+    """
+    if engines is None:
+        from my_little_ocr.ocr_engines import list_engines
+
+        engines = list(list_engines(available_only=True)) or ["fake"]
+    if specs is None:
+        specs = default_specs()
+    engine_kwargs = engine_kwargs or {}
+
+    results = []
+    for engine_name in engines:
+        print(f"Benchmarking {engine_name} on {len(specs)} images", file=sys.stderr)
+        args = (engine_name, specs, repeats, batch_size, engine_kwargs.get(engine_name))
+        if isolate:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                try:
+                    result = executor.submit(_benchmark_engine_safely, *args).result()
+                except Exception as e:
+                    # The worker process died, e.g. from a crash in native code
+                    result = EngineBenchmark(engine_name=engine_name, error=f"{type(e).__name__}: {e}")
+        else:
+            result = _benchmark_engine_safely(*args)
+        results.append(result)
+
+    return BenchmarkReport(
+        deltas=variant_deltas(results),
+        created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        git_commit=_git_commit(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        cpu_count=os.cpu_count(),
+        repeats=repeats,
+        batch_size=batch_size,
+        images=specs,
+        results=results,
+    )
+
+
+def variant_deltas(results: list[EngineBenchmark]) -> list[VariantDelta]:
+    """
+    Compares every engine measured with arguments, such as
+    "rapidocr:precision=int8", with the same engine measured without, if the
+    run includes it: the relative change of throughput, median latency and
+    stage times, and the change of text similarity.
+    """
+
+    def relative(value: Optional[float], baseline: Optional[float]) -> Optional[float]:
+        return value / baseline - 1 if value is not None and baseline else None
+
+    by_name = {result.engine_name: result for result in results if result.error is None}
+    deltas = []
+    for result in by_name.values():
+        baseline = by_name.get(parse_engine_spec(result.engine_name)[0])
+        if baseline is None or baseline is result:
+            continue
+        similarity_change = None
+        if result.mean_similarity is not None and baseline.mean_similarity is not None:
+            similarity_change = result.mean_similarity - baseline.mean_similarity
+        deltas.append(
+            VariantDelta(
+                engine_name=result.engine_name,
+                baseline=baseline.engine_name,
+                throughput_change=relative(result.throughput_ips, baseline.throughput_ips),
+                p50_change=relative(
+                    result.latency_ms.p50 if result.latency_ms else None,
+                    baseline.latency_ms.p50 if baseline.latency_ms else None,
+                ),
+                similarity_change=similarity_change,
+                stage_changes={
+                    name: relative(seconds, baseline.stage_s[name])
+                    for name, seconds in result.stage_s.items()
+                    if baseline.stage_s.get(name)
+                },
+            )
+        )
+    return deltas
+
+
+def compare_reports(
+    baseline: BenchmarkReport, current: BenchmarkReport, tolerance: float = 0.1
+) -> list[str]:
+    """
+    Lists the regressions of `current` relative to `baseline`: engines whose
+    throughput dropped, or whose p95 latency, cold start or peak memory grew,
+    by more than `tolerance` (a fraction), and engines that started failing.
+    """
+    baseline_results = {result.engine_name: result for result in baseline.results}
+    regressions = []
+    for result in current.results:
+        before = baseline_results.get(result.engine_name)
+        if before is None or before.error is not None:
+            continue
+        if result.error is not None:
+            regressions.append(f"{result.engine_name}: failed ({result.error})")
+            continue
+        higher_is_better = {"throughput_ips": result.throughput_ips}
+        lower_is_better = {
+            "p95 latency": result.latency_ms.p95 if result.latency_ms else None,
+            "cold_start_s": result.cold_start_s,
+            "peak_rss_mb": result.peak_rss_mb,
+        }
+        old_values = {
+            "throughput_ips": before.throughput_ips,
+            "p95 latency": before.latency_ms.p95 if before.latency_ms else None,
+            "cold_start_s": before.cold_start_s,
+            "peak_rss_mb": before.peak_rss_mb,
+        }
+        for name, value in higher_is_better.items():
+            old = old_values[name]
+            if value is not None and old and value < old * (1 - tolerance):
+                regressions.append(f"{result.engine_name}: {name} {old:.3g} -> {value:.3g}")
+        for name, value in lower_is_better.items():
+            old = old_values[name]
+            if value is not None and old and value > old * (1 + tolerance):
+                regressions.append(f"{result.engine_name}: {name} {old:.3g} -> {value:.3g}")
+    return regressions
+
+
+def _print_summary(report: BenchmarkReport):
+    width = max([12, *(len(result.engine_name) + 2 for result in report.results)])
+    header = f"{'engine':<{width}}{'img/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'cold s':>9}{'RSS MiB':>10}{'sim':>7}"
+    print(header, file=sys.stderr)
+    for result in report.results:
+        if result.error is not None:
+            print(f"{result.engine_name:<{width}}error: {result.error}", file=sys.stderr)
+            continue
+        rss = f"{result.peak_rss_mb:.0f}" if result.peak_rss_mb is not None else "n/a"
+        print(
+            f"{result.engine_name:<{width}}{result.throughput_ips:>9.2f}"
+            f"{result.latency_ms.p50:>10.1f}{result.latency_ms.p95:>10.1f}{result.latency_ms.p99:>10.1f}"
+            f"{result.cold_start_s:>9.2f}{rss:>10}{result.mean_similarity:>7.2f}",
+            file=sys.stderr,
+        )
+    for delta in report.deltas:
+        changes = [
+            f"{name} {value:+.1%}"
+            for name, value in (("throughput", delta.throughput_change), ("p50", delta.p50_change))
+            if value is not None
+        ]
+        changes += [f"{name} {value:+.1%}" for name, value in delta.stage_changes.items() if value is not None]
+        if delta.similarity_change is not None:
+            changes.append(f"similarity {delta.similarity_change:+.3f}")
+        print(f"{delta.engine_name} vs {delta.baseline}: {', '.join(changes)}", file=sys.stderr)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m my_little_ocr.bench",
+        description="Benchmark the OCR engines on synthetic images.",
+    )
+    parser.add_argument("--engines", nargs="+", help="Engines to measure; 'fake' needs no backend")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the images")
+    parser.add_argument("--batch-size", type=int, default=0, help="Also measure ocr_batch with this batch size")
+    parser.add_argument("--quick", action="store_true", help="One image per script")
+    parser.add_argument("--in-process", action="store_true", help="Do not spawn a process per engine")
+    parser.add_argument("--output", "-o", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="A previous JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        engines=args.engines,
+        specs=default_specs(quick=args.quick),
+        repeats=args.repeats,
+        batch_size=args.batch_size,
+        isolate=not args.in_process,
+    )
+    _print_summary(report)
+    report_json = report.model_dump_json(indent=2)
+    if args.output:
+        Path(args.output).write_text(report_json, encoding="utf-8")
+    else:
+        print(report_json)
+
+    if args.compare:
+        baseline = BenchmarkReport.model_validate_json(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare_reports(baseline, report, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from os import PathLike
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel, Field
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike, RawImage, is_buffer
+
+
+def hash_image(img: ImageLike) -> str:
+    """
+    Returns a content hash of an image-like object. Files and encoded buffers
+    are hashed as stored; arrays, raw pixels and PIL images are hashed by
+    their pixels.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(img, (str, PathLike)):
+        with open(img, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    elif is_buffer(img):
+        digest.update(img)
+    elif isinstance(img, (np.ndarray, RawImage)):
+        img = img.to_numpy() if isinstance(img, RawImage) else img
+        digest.update(f"{img.shape}{img.dtype}".encode())
+        digest.update(np.ascontiguousarray(img).data)
+    elif isinstance(img, Image.Image):
+        digest.update(f"{img.size}{img.mode}".encode())
+        digest.update(img.tobytes())
+    else:
+        raise TypeError("Unsupported image type for hashing.")
+    return digest.hexdigest()
+
+
+class CacheStats(BaseModel):
+    """
+    Hit and miss counters of an `OCRCache`.
+    """
+
+    memory_hits: int = Field(0, description="Lookups answered from memory")
+    disk_hits: int = Field(0, description="Lookups answered from the disk store")
+    misses: int = Field(0, description="Lookups that found nothing")
+    memory_evictions: int = Field(0, description="Entries dropped from memory")
+    disk_evictions: int = Field(0, description="Files deleted from the disk store")
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class OCRCache:
+    """
+    Content-addressed store of serialized OCR results: a bounded in-memory
+    LRU, optionally backed by a directory on disk that is trimmed to
+    `max_disk_bytes`, least recently used files first.
+
+    Args:
+        max_items (int): The number of results kept in memory.
+        directory (str | PathLike): Where to persist results. If None,
+            results are only kept in memory.
+        max_disk_bytes (int): The size limit of the disk store.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 1024,
+        directory: Optional[Union[str, PathLike]] = None,
+        max_disk_bytes: int = 1 << 30,
+    ):
+        self.max_items = max_items
+        self.directory = Path(directory) if directory is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._disk_index: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(engine: BaseOCREngine, img: ImageLike, **ocr_kwargs) -> str:
+        """
+        Builds the cache key of an OCR call from the image content, the
+        engine and its effective configuration, and the call arguments.
+        """
+        config = json.dumps(
+            [
+                type(engine).__qualname__,
+                engine.ocr_engine_name,
+                engine.get_config_key(),
+                ocr_kwargs,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.blake2b(config.encode(), digest_size=20)
+        digest.update(hash_image(img).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self):
+        files = []
+        for path in self.directory.glob("*/*.json"):
+            stat = path.stat()
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        self._trim_disk()
+
+    def _remember(self, key: str, data: bytes):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self.stats.memory_evictions += 1
+
+    def _trim_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self._path(key).unlink(missing_ok=True)
+            self.stats.disk_evictions += 1
+
+    def get(self, key: str) -> Optional[OCRResult]:
+        """
+        Returns the cached result for `key`, or None.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+            elif key in self._disk_index:
+                path = self._path(key)
+                try:
+                    data = path.read_bytes()
+                    os.utime(path)
+                except FileNotFoundError:
+                    self._disk_bytes -= self._disk_index.pop(key)
+                else:
+                    self._disk_index.move_to_end(key)
+                    self._remember(key, data)
+                    self.stats.disk_hits += 1
+            if data is None:
+                self.stats.misses += 1
+                return None
+        return OCRResult.model_validate_json(data)
+
+    def put(self, key: str, result: OCRResult):
+        """
+        Stores `result` under `key`.
+        """
+        # Timings describe the call that produced the result, not a cache hit
+        data = result.model_dump_json(exclude={"timings"}).encode()
+        with self._lock:
+            self._remember(key, data)
+            if self.directory is None:
+                return
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._disk_bytes += len(data) - self._disk_index.pop(key, 0)
+            self._disk_index[key] = len(data)
+            self._trim_disk()
+
+    def clear(self):
+        """
+        Removes every entry from memory and disk.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self.directory is not None:
+                for key in self._disk_index:
+                    self._path(key).unlink(missing_ok=True)
+            self._disk_index.clear()
+            self._disk_bytes = 0
+
+
+class CachedOCREngine(BaseOCREngine):
+    """
+    Wraps an engine so that images already seen with the same engine
+    configuration are answered from an `OCRCache` instead of re-running OCR.
+
+    Args:
+        engine (BaseOCREngine): The engine to wrap.
+        cache (OCRCache): The cache to use. If None, a new one is created from
+            `cache_kwargs`.
+        **cache_kwargs: Arguments for `OCRCache` when `cache` is None.
+    """
+
+    record_metrics = False
+
+    def __init__(
+        self, engine: BaseOCREngine, cache: Optional[OCRCache] = None, **cache_kwargs
+    ):
+        self.engine = engine
+        self.cache = cache if cache is not None else OCRCache(**cache_kwargs)
+        self.ocr_engine_name = engine.ocr_engine_name
+        self.max_concurrency = engine.max_concurrency
+
+    def get_config_key(self) -> dict:
+        return self.engine.get_config_key()
+
+    def ocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        key = self.cache.make_key(self.engine, img, **kwargs)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.engine.ocr(img, **kwargs)
+            self.cache.put(key, result)
+        return result
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        images = list(images)
+        keys = [self.cache.make_key(self.engine, img, **kwargs) for img in images]
+        results = [self.cache.get(key) for key in keys]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            computed = self.engine.ocr_batch(
+                [images[index] for index in missing], batch_size, **kwargs
+            )
+            for index, result in zip(missing, computed):
+                self.cache.put(keys[index], result)
+                results[index] = result
+        return results
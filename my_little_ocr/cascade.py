@@ -0,0 +1,176 @@
+import math
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike, convert_imagelike_to_type
+
+
+def crop_box(img: np.ndarray, box: np.ndarray, padding: float = 0.2) -> np.ndarray:
+    """
+    Returns the bounding rectangle of a 4-point box, grown on every side by
+    `padding` times the box height and clipped to the image. The crop is a
+    view into `img`.
+    """
+    height, width = img.shape[:2]
+    x0, y0 = box.min(axis=0)
+    x1, y1 = box.max(axis=0)
+    margin = int(round((y1 - y0) * padding))
+    x0, y0 = max(int(x0) - margin, 0), max(int(y0) - margin, 0)
+    x1, y1 = min(int(x1) + margin, width), min(int(y1) + margin, height)
+    return img[y0:y1, x0:x1]
+
+
+def _merge_timings(timings: Iterable[Optional[dict[str, float]]], total: float) -> dict[str, float]:
+    merged: dict[str, float] = {}
+    for stage_timings in timings:
+        for name, seconds in (stage_timings or {}).items():
+            if name != "total":
+                merged[name] = merged.get(name, 0.0) + seconds
+    merged["total"] = total
+    return merged
+
+
+class CascadeEngine(BaseOCREngine):
+    """
+    Runs a fast engine on whole images, then re-recognizes only the items it
+    is unsure about with a slower, more accurate engine, which reads just
+    those items: with `recognize_batch` on their boxes where the engine
+    supports it, and otherwise with OCR on padded crops around them.
+
+    The boxes come from the fast engine. An item is replaced when the
+    accurate engine finds text in it, and kept otherwise. The merged
+    result records which engine recognized each item in `engines`.
+
+    Items the fast engine drops itself (below its own score threshold or
+    `default_confidence_threshold`) are never seen by the cascade, so
+    `threshold` should be above those.
+
+    Args:
+        fast (BaseOCREngine): The engine run on every image.
+        accurate (BaseOCREngine): The engine run on low-confidence crops.
+        threshold (float): Items with a confidence below this are sent to the
+            accurate engine. Items without a confidence are kept as they are.
+        padding (float): The margin added around each crop, as a fraction of
+            the item's height, for engines that cannot recognize given boxes.
+    """
+
+    record_metrics = False
+
+    def __init__(
+        self,
+        fast: BaseOCREngine,
+        accurate: BaseOCREngine,
+        threshold: float = 0.9,
+        padding: float = 0.2,
+    ):
+        self.fast = fast
+        self.accurate = accurate
+        self.threshold = threshold
+        self.padding = padding
+        self.ocr_engine_name = f"{fast.ocr_engine_name}>{accurate.ocr_engine_name}"
+        self.max_concurrency = min(fast.max_concurrency, accurate.max_concurrency)
+
+    def get_config_key(self) -> dict:
+        return {
+            "fast": {"engine": self.fast.ocr_engine_name, **self.fast.get_config_key()},
+            "accurate": {"engine": self.accurate.ocr_engine_name, **self.accurate.get_config_key()},
+            "threshold": self.threshold,
+            "padding": self.padding,
+        }
+
+    def ocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        return self.ocr_batch([img], **kwargs)[0]
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        """
+        Runs the fast engine on all images, then sends the crops of every
+        image to the accurate engine together, so they share its batches.
+        Extra arguments are forwarded to the fast engine.
+        """
+        start = time.perf_counter()
+        arrays = [convert_imagelike_to_type(img, "numpy") for img in images]
+        first_pass = self.fast.ocr_batch(arrays, batch_size, **kwargs)
+        unsure = [np.flatnonzero(result.confidences < self.threshold) for result in first_pass]
+        owners = [
+            (image_index, item_index)
+            for image_index, item_indices in enumerate(unsure)
+            for item_index in item_indices.tolist()
+        ]
+        second_pass, crop_results = self._second_pass(arrays, first_pass, unsure, batch_size) if owners else ([], [])
+
+        replacements: dict[tuple[int, int], OCRResult] = {
+            owner: crop_result.sort_by_position()
+            for owner, crop_result in zip(owners, crop_results)
+            if any(crop_result.texts)
+        }
+        # Every result of a batch carries the timings of the whole batch
+        timings = _merge_timings(
+            [results[0].timings for results in (first_pass, second_pass) if results],
+            time.perf_counter() - start,
+        )
+        return [
+            self._merge(image_index, result, replacements, timings)
+            for image_index, result in enumerate(first_pass)
+        ]
+
+    def _second_pass(
+        self,
+        arrays: list[np.ndarray],
+        first_pass: list[OCRResult],
+        unsure: list[np.ndarray],
+        batch_size: int,
+    ) -> tuple[list[OCRResult], list[OCRResult]]:
+        """
+        Returns the accurate engine's results, and one result per unsure
+        item, in the order of the images and their items.
+        """
+        images = [image_index for image_index, item_indices in enumerate(unsure) if len(item_indices)]
+        try:
+            # Engines that recognize given boxes read just those, without
+            # detecting lines in the crops again
+            second_pass = self.accurate.recognize_batch(
+                [arrays[image_index] for image_index in images],
+                [first_pass[image_index].boxes[unsure[image_index]] for image_index in images],
+                batch_size,
+            )
+            return second_pass, [result.take([index]) for result in second_pass for index in range(len(result))]
+        except NotImplementedError:
+            crops = [
+                crop_box(arrays[image_index], first_pass[image_index].boxes[item_index], self.padding)
+                for image_index in images
+                for item_index in unsure[image_index].tolist()
+            ]
+            second_pass = self.accurate.ocr_batch(crops, batch_size)
+            return second_pass, second_pass
+
+    def _merge(
+        self,
+        image_index: int,
+        result: OCRResult,
+        replacements: dict[tuple[int, int], OCRResult],
+        timings: dict[str, float],
+    ) -> OCRResult:
+        texts = list(result.texts)
+        confidences = result.confidences.copy()
+        engines = [self.fast.ocr_engine_name] * len(result)
+        for item_index in range(len(result)):
+            crop_result = replacements.get((image_index, item_index))
+            if crop_result is None:
+                continue
+            texts[item_index] = " ".join(crop_result.texts)
+            known = crop_result.confidences[~np.isnan(crop_result.confidences)]
+            confidences[item_index] = known.mean() if len(known) else math.nan
+            engines[item_index] = self.accurate.ocr_engine_name
+        return OCRResult._construct(
+            texts=texts,
+            boxes=result.boxes,
+            confidences=confidences,
+            default_confidence_threshold=result.default_confidence_threshold,
+            timings=timings,
+            engines=engines,
+        )
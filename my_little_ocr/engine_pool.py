@@ -0,0 +1,355 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterable, Iterator, Optional, Type, Union
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike
+from my_little_ocr.base_engine.threads import ThreadBudget, get_thread_budget, set_thread_budget
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashedError(RuntimeError):
+    """
+    Raised for tasks that were running on a worker process when it died.
+    """
+
+
+def _picklable_exception(exc: BaseException) -> BaseException:
+    try:
+        pickle.dumps(exc)
+        return exc
+    except Exception:
+        return RuntimeError(f"{type(exc).__name__}: {exc}")
+
+
+def _settle(future: Future, value=None, exception: Optional[BaseException] = None):
+    """
+    Resolves a caller's future unless it is already done, e.g. because the
+    caller cancelled it.
+    """
+    if future.done() or not future.set_running_or_notify_cancel():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(value)
+
+
+def _worker_main(
+    worker_index: int,
+    engine: Union[str, Type[BaseOCREngine]],
+    engine_kwargs: dict,
+    task_queue,
+    result_queue,
+    thread_budget: Optional[ThreadBudget] = None,
+):
+    if thread_budget is not None:
+        # Also covers OpenMP and BLAS pools of libraries the engine imports
+        os.environ["OMP_NUM_THREADS"] = str(thread_budget.engine_threads)
+        set_thread_budget(thread_budget)
+    try:
+        if isinstance(engine, str):
+            from my_little_ocr.ocr_engines import get_engine_class
+
+            engine = get_engine_class(engine)
+        instance = engine(**engine_kwargs)
+    except BaseException as e:
+        result_queue.put((worker_index, None, "init_error", _picklable_exception(e)))
+        return
+    result_queue.put((worker_index, None, "ready", os.getpid()))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, method, args, kwargs = task
+        try:
+            if method == "ping":
+                value = os.getpid()
+            else:
+                value = getattr(instance, method)(*args, **kwargs)
+            result_queue.put((worker_index, task_id, "ok", value))
+        except BaseException as e:
+            result_queue.put((worker_index, task_id, "error", _picklable_exception(e)))
+
+
+class _Worker:
+    def __init__(self, process, task_queue):
+        self.process = process
+        self.task_queue = task_queue
+        self.in_flight: dict[int, Future] = {}
+
+
+class EnginePool:
+    """
+    Runs OCR on a pool of worker processes, each holding its own engine
+    instance, so inference and the Python-side pre/post-processing scale
+    across CPU cores.
+
+    Workers are started with the "spawn" method by default, so scripts using
+    the pool need the usual `if __name__ == "__main__":` guard. A worker that
+    dies is restarted automatically; the tasks it was running fail with
+    `WorkerCrashedError`.
+
+    Args:
+        engine_name (str | Type[BaseOCREngine]): The registered engine name,
+            or an importable engine class.
+        workers (int): The number of worker processes. Defaults to the number
+            of CPUs.
+        mp_context (str): The multiprocessing start method.
+        threads (int): The CPU threads the workers share, split evenly
+            between them, so that workers do not each use every core.
+            Defaults to an engine's share of the thread budget of this
+            process (see `set_thread_budget`), or all available CPUs. 0 leaves each
+            worker's libraries at their own defaults.
+        **engine_kwargs: Arguments passed to the engine constructor in every
+            worker.
+    """
+
+    def __init__(
+        self,
+        engine_name: Union[str, Type[BaseOCREngine]],
+        workers: Optional[int] = None,
+        mp_context: str = "spawn",
+        threads: Optional[int] = None,
+        **engine_kwargs,
+    ):
+        self.engine_name = engine_name
+        self.num_workers = workers or os.cpu_count() or 1
+        self.engine_kwargs = engine_kwargs
+        if threads is None:
+            # The pool counts as one engine of this process
+            threads = (get_thread_budget() or ThreadBudget()).engine_threads
+        # Each worker gets its share of the threads
+        self.thread_budget = ThreadBudget(threads=threads).split(self.num_workers) if threads else None
+        self.restarts = 0
+
+        self._context = multiprocessing.get_context(mp_context)
+        self._result_queue = self._context.Queue()
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._pings: dict[int, Future] = {}
+        self._init_error: Optional[BaseException] = None
+        self._closed = False
+        self._stopping = False
+
+        self._workers: list[_Worker] = [
+            self._start_worker(index) for index in range(self.num_workers)
+        ]
+        self._collector = threading.Thread(
+            target=self._collect_results, name="EnginePool-collector", daemon=True
+        )
+        self._collector.start()
+
+    def _start_worker(self, index: int) -> _Worker:
+        task_queue = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.engine_name, self.engine_kwargs, task_queue, self._result_queue, self.thread_budget),
+            name=f"EnginePool-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        return _Worker(process, task_queue)
+
+    def _collect_results(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                message = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                if message is not None:
+                    self._handle_message_safely(message)
+                if message is not None and time.monotonic() - last_check < 1.0:
+                    continue
+                # Drain the queue before looking for dead workers, so results
+                # a worker sent right before exiting are not lost
+                try:
+                    while True:
+                        self._handle_message_safely(self._result_queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if self._stopping:
+                    return
+                self._check_workers()
+                last_check = time.monotonic()
+
+    def _handle_message_safely(self, message: tuple):
+        # One bad message must not stop the collector, or every later task
+        # would wait forever
+        try:
+            self._handle_message(*message)
+        except Exception:
+            logger.exception("EnginePool failed to handle a worker message")
+
+    def _handle_message(self, worker_index: int, task_id, status: str, value):
+        if status == "ready":
+            return
+        if status == "init_error":
+            self._init_error = value
+            return
+        future = self._pings.pop(task_id, None) or self._workers[
+            worker_index
+        ].in_flight.pop(task_id, None)
+        if future is None:
+            return
+        if status == "ok":
+            _settle(future, value)
+        else:
+            _settle(future, exception=value)
+
+    def _check_workers(self):
+        for index, worker in enumerate(self._workers):
+            if worker.process.is_alive():
+                continue
+            crashed = WorkerCrashedError(
+                f"Worker {index} exited with code {worker.process.exitcode}"
+            )
+            for future in worker.in_flight.values():
+                _settle(future, exception=self._init_error or crashed)
+            worker.in_flight.clear()
+            if self._closed or self._init_error is not None:
+                # The engine cannot be constructed; restarting would only fail again
+                continue
+            self._workers[index] = self._start_worker(index)
+            self.restarts += 1
+
+    def _dispatch(self, method: str, args: tuple, kwargs: dict) -> Future:
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EnginePool is closed")
+            if self._init_error is not None:
+                raise RuntimeError("The engine failed to start") from self._init_error
+            task_id = next(self._task_ids)
+            worker = min(self._workers, key=lambda w: len(w.in_flight))
+            worker.in_flight[task_id] = future
+            worker.task_queue.put((task_id, method, args, kwargs))
+        return future
+
+    def submit(self, img: ImageLike, **kwargs) -> "Future[OCRResult]":
+        """
+        Schedules OCR of one image on the least busy worker.
+
+        Returns:
+            Future[OCRResult]: A future resolving to the OCR result.
+        """
+        return self._dispatch("ocr", (img,), kwargs)
+
+    def submit_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> "Future[list[OCRResult]]":
+        """
+        Schedules `ocr_batch` on a single worker.
+        """
+        return self._dispatch("ocr_batch", (list(images), batch_size), kwargs)
+
+    def map(
+        self,
+        images: Iterable[ImageLike],
+        ordered: bool = True,
+        max_in_flight: Optional[int] = None,
+        **kwargs,
+    ) -> Iterator:
+        """
+        OCRs every image on the pool, keeping at most `max_in_flight` tasks
+        queued (twice the number of workers by default).
+
+        Args:
+            images (Iterable[ImageLike]): The images to perform OCR on.
+            ordered (bool): If True, yield results in input order. If False,
+                yield `(index, OCRResult)` pairs as soon as each finishes.
+            max_in_flight (int): Bound on the number of submitted tasks.
+
+        Yields:
+            OCRResult, or `(index, OCRResult)` pairs when `ordered` is False.
+        """
+        max_in_flight = max_in_flight or 2 * self.num_workers
+        images = iter(enumerate(images))
+        pending: deque[tuple[int, Future]] = deque()
+        done_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+        def fill():
+            for index, img in itertools.islice(images, max_in_flight - len(pending)):
+                future = self.submit(img, **kwargs)
+                if not ordered:
+                    future.add_done_callback(lambda f, i=index: done_queue.put((i, f)))
+                pending.append((index, future))
+
+        fill()
+        while pending:
+            if ordered:
+                _, future = pending.popleft()
+                yield future.result()
+            else:
+                index, future = done_queue.get()
+                pending.remove((index, future))
+                yield index, future.result()
+            fill()
+
+    def health_check(self, timeout: float = 5.0) -> list[bool]:
+        """
+        Pings every worker and reports which ones answered within `timeout`
+        seconds. Workers found dead are restarted in the background.
+        """
+        pings = []
+        with self._lock:
+            for worker in self._workers:
+                task_id = next(self._task_ids)
+                future = Future()
+                self._pings[task_id] = future
+                worker.task_queue.put((task_id, "ping", (), {}))
+                pings.append((task_id, future))
+        healthy = []
+        for task_id, future in pings:
+            try:
+                future.result(timeout=timeout)
+                healthy.append(True)
+            except Exception:
+                healthy.append(False)
+            finally:
+                with self._lock:
+                    self._pings.pop(task_id, None)
+        return healthy
+
+    def close(self, timeout: float = 10.0):
+        """
+        Stops the workers, failing tasks that have not finished.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            worker.task_queue.put(None)
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+        with self._lock:
+            self._stopping = True
+        self._collector.join()
+        for worker in workers:
+            for future in worker.in_flight.values():
+                _settle(future, exception=RuntimeError("EnginePool was closed"))
+
+    def __enter__(self) -> "EnginePool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,456 @@
+"""
+Bulk export of OCR results to columnar files.
+
+Results are written column by column, straight from the arrays of
+`OCRResult`, without building `OCRItem` objects or going through pydantic
+per result. Three formats are supported:
+
+- Arrow and Parquet (with the optional `pyarrow` package): one row per
+  document, with list columns holding its items, written in row groups as
+  results arrive.
+- NDJSON: one JSON object per document.
+- msgpack (with the optional `msgpack` package): one map per document, with
+  boxes and confidences as raw little-endian arrays.
+
+Every document record has the same fields: `id`, `texts`, `boxes` (8
+coordinates per item, flattened), `confidences` (null where unknown),
+`default_confidence_threshold`, and `engines` and `regions` where the result
+has them. Timings are not written.
+"""
+
+from os import PathLike
+from pathlib import Path
+from typing import Iterable, Iterator, Literal, Optional, Union
+
+import numpy as np
+
+from my_little_ocr.base_engine.base_ocr_engine import OCRResult
+
+DocId = Union[str, int]
+
+FORMATS_BY_SUFFIX = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".msgpack": "msgpack",
+    ".mpk": "msgpack",
+}
+
+
+def _import_optional(module: str, extra: str):
+    try:
+        return __import__(module)
+    except ImportError as e:
+        raise ImportError(
+            f"This format needs the {module} package; install it with `pip install my_little_ocr[{extra}]`"
+        ) from e
+
+
+def _format_of(path: Union[str, PathLike], format: Optional[str]) -> str:
+    if format is not None:
+        return format
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMATS_BY_SUFFIX:
+        raise ValueError(f"Cannot tell the format of {path}; pass one of {sorted(set(FORMATS_BY_SUFFIX.values()))}")
+    return FORMATS_BY_SUFFIX[suffix]
+
+
+def _plain_id(doc_id: DocId) -> DocId:
+    # Paths, as yielded by `ocr_stream`, are stored as strings
+    return int(doc_id) if isinstance(doc_id, (int, np.integer)) else str(doc_id)
+
+
+def _record(doc_id: DocId, result: OCRResult) -> dict:
+    # float32 confidences are written as doubles, which read back exactly
+    confidences = result.confidences.tolist()
+    if np.isnan(result.confidences).any():
+        confidences = [None if confidence != confidence else confidence for confidence in confidences]
+    return {
+        "id": _plain_id(doc_id),
+        "texts": result.texts,
+        "boxes": result.boxes.ravel().tolist(),
+        "confidences": confidences,
+        "default_confidence_threshold": result.default_confidence_threshold,
+        **result._item_columns(),
+    }
+
+
+def _from_record(record: dict, boxes: np.ndarray, confidences: np.ndarray) -> tuple[DocId, OCRResult]:
+    return record["id"], OCRResult._construct(
+        texts=record["texts"],
+        boxes=boxes.reshape(-1, 4, 2),
+        confidences=confidences,
+        default_confidence_threshold=record["default_confidence_threshold"],
+        engines=record.get("engines"),
+        regions=record.get("regions"),
+    )
+
+
+def encode_ndjson(doc_id: DocId, result: OCRResult) -> bytes:
+    """
+    Encodes a result as one NDJSON line, including the newline.
+    """
+    import pydantic_core
+
+    return pydantic_core.to_json(_record(doc_id, result)) + b"\n"
+
+
+def decode_ndjson(line: Union[str, bytes]) -> tuple[DocId, OCRResult]:
+    """
+    Decodes a line written by `encode_ndjson`.
+    """
+    import pydantic_core
+
+    record = pydantic_core.from_json(line)
+    confidences = np.array(
+        [np.nan if confidence is None else confidence for confidence in record["confidences"]],
+        dtype=np.float32,
+    )
+    return _from_record(record, np.array(record["boxes"], dtype=np.int32), confidences)
+
+
+def encode_msgpack(doc_id: DocId, result: OCRResult) -> bytes:
+    """
+    Encodes a result as one msgpack map, with boxes and confidences as raw
+    little-endian int32 and float32 bytes.
+    """
+    msgpack = _import_optional("msgpack", "msgpack")
+    record = {
+        "id": _plain_id(doc_id),
+        "texts": result.texts,
+        "boxes": result.boxes.astype("<i4", copy=False).tobytes(),
+        "confidences": result.confidences.astype("<f4", copy=False).tobytes(),
+        "default_confidence_threshold": result.default_confidence_threshold,
+        **result._item_columns(),
+    }
+    return msgpack.packb(record, use_bin_type=True)
+
+
+def _decode_msgpack_record(record: dict) -> tuple[DocId, OCRResult]:
+    boxes = np.frombuffer(record["boxes"], dtype="<i4").astype(np.int32)
+    confidences = np.frombuffer(record["confidences"], dtype="<f4").astype(np.float32)
+    return _from_record(record, boxes, confidences)
+
+
+def decode_msgpack(data: bytes) -> tuple[DocId, OCRResult]:
+    """
+    Decodes a map written by `encode_msgpack`.
+    """
+    msgpack = _import_optional("msgpack", "msgpack")
+    return _decode_msgpack_record(msgpack.unpackb(data, raw=False))
+
+
+class _FileWriter:
+    """
+    Writes encoded records to a file, one after another.
+    """
+
+    def __init__(self, path: Union[str, PathLike]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "wb")
+        self.count = 0
+
+    def _encode(self, doc_id: DocId, result: OCRResult) -> bytes:
+        raise NotImplementedError
+
+    def write(self, doc_id: DocId, result: OCRResult):
+        self._file.write(self._encode(doc_id, result))
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class NDJSONResultWriter(_FileWriter):
+    """
+    Writes results to an NDJSON file, one line per document.
+    """
+
+    def _encode(self, doc_id: DocId, result: OCRResult) -> bytes:
+        return encode_ndjson(doc_id, result)
+
+
+class MsgpackResultWriter(_FileWriter):
+    """
+    Writes results to a file of concatenated msgpack maps, one per document.
+    """
+
+    def __init__(self, path: Union[str, PathLike]):
+        _import_optional("msgpack", "msgpack")
+        super().__init__(path)
+
+    def _encode(self, doc_id: DocId, result: OCRResult) -> bytes:
+        return encode_msgpack(doc_id, result)
+
+
+def _arrow_schema(id_type):
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            pa.field("id", id_type, nullable=False),
+            pa.field("texts", pa.list_(pa.string())),
+            pa.field("boxes", pa.list_(pa.list_(pa.int32(), 8))),
+            pa.field("confidences", pa.list_(pa.float32())),
+            pa.field("default_confidence_threshold", pa.float64()),
+            pa.field("engines", pa.list_(pa.string())),
+            pa.field("regions", pa.list_(pa.int32())),
+        ]
+    )
+
+
+def _list_array(offsets: list, values, mask: Optional[list] = None):
+    import pyarrow as pa
+
+    if mask is not None:
+        # A null offset makes the list at that position null
+        offsets = [None if masked else offset for offset, masked in zip(offsets, mask + [False])]
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), values)
+
+
+class ArrowResultWriter:
+    """
+    Writes results to a Parquet or Arrow IPC file with one row per document,
+    whose items are in list columns (`texts`, `boxes` as lists of 8
+    coordinates, `confidences`, and `engines` and `regions` where recorded).
+    Results are buffered and written as a row group once they hold
+    `row_group_items` items, so memory stays bounded on long jobs.
+
+    The `id` column holds either integers or strings. By default the first
+    id decides; pass `id_type="str"` when ids may be both, to store every id
+    as a string.
+
+    Args:
+        path (str | PathLike): The output file.
+        format (str): "parquet" or "arrow" (the Arrow IPC file format).
+        row_group_items (int): The number of items buffered per row group.
+        compression (str): The Parquet compression codec.
+        id_type (str): "int" or "str", the type of the `id` column, or None
+            to take the type of the first id.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, PathLike],
+        format: str = "parquet",
+        row_group_items: int = 100_000,
+        compression: str = "zstd",
+        id_type: Optional[Literal["int", "str"]] = None,
+    ):
+        if format not in ("parquet", "arrow"):
+            raise ValueError("format must be 'parquet' or 'arrow'")
+        if id_type not in (None, "int", "str"):
+            raise ValueError("id_type must be 'int', 'str' or None")
+        _import_optional("pyarrow", "parquet")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.format = format
+        self.row_group_items = row_group_items
+        self.compression = compression
+        self.count = 0
+        self.id_type = id_type
+        self._writer = None
+        self._buffer: list[tuple[DocId, OCRResult]] = []
+        self._buffered_items = 0
+
+    def write(self, doc_id: DocId, result: OCRResult):
+        doc_id = _plain_id(doc_id)
+        if self.id_type is None:
+            self.id_type = "int" if isinstance(doc_id, int) else "str"
+        if self.id_type == "str":
+            doc_id = str(doc_id)
+        elif not isinstance(doc_id, int):
+            # Checked here, as the row group would only fail when flushed
+            raise ValueError(
+                f"{self.path}: id {doc_id!r} is not an integer like the ids before it; "
+                "pass id_type='str' to store all ids as strings"
+            )
+        self._buffer.append((doc_id, result))
+        # Documents without items still take a row
+        self._buffered_items += max(len(result), 1)
+        self.count += 1
+        if self._buffered_items >= self.row_group_items:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered results as a row group.
+        """
+        if not self._buffer:
+            return
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._open()
+        batch = self._record_batch(self._buffer)
+        if self.format == "parquet":
+            self._writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch.num_rows)
+        else:
+            self._writer.write_batch(batch)
+        self._buffer, self._buffered_items = [], 0
+
+    def _open(self):
+        import pyarrow as pa
+
+        schema = _arrow_schema(self._arrow_id_type())
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.path, schema, compression=self.compression)
+        else:
+            self._writer = pa.ipc.new_file(str(self.path), schema)
+
+    def _arrow_id_type(self):
+        import pyarrow as pa
+
+        return pa.int64() if self.id_type == "int" else pa.string()
+
+    def _record_batch(self, buffer: list[tuple[DocId, OCRResult]]):
+        import pyarrow as pa
+
+        results = [result for _, result in buffer]
+        offsets = np.zeros(len(results) + 1, dtype=np.int64)
+        np.cumsum([len(result) for result in results], out=offsets[1:])
+        offsets = offsets.tolist()
+        boxes = np.concatenate([result.boxes for result in results]).astype(np.int32, copy=False)
+        confidences = np.concatenate([result.confidences for result in results]).astype(np.float32, copy=False)
+
+        columns = {}
+        for column, value_type in (("engines", pa.string()), ("regions", pa.int32())):
+            mask = [getattr(result, column) is None for result in results]
+            column_offsets = np.zeros(len(results) + 1, dtype=np.int64)
+            np.cumsum([0 if masked else len(result) for result, masked in zip(results, mask)], out=column_offsets[1:])
+            values = [value for result in results for value in (getattr(result, column) or [])]
+            columns[column] = _list_array(column_offsets.tolist(), pa.array(values, type=value_type), mask)
+
+        return pa.RecordBatch.from_arrays(
+            [
+                pa.array([doc_id for doc_id, _ in buffer], type=self._arrow_id_type()),
+                _list_array(offsets, pa.array([text for result in results for text in result.texts], type=pa.string())),
+                _list_array(
+                    offsets,
+                    pa.FixedSizeListArray.from_arrays(pa.array(boxes.reshape(-1), type=pa.int32()), 8),
+                ),
+                _list_array(offsets, pa.array(confidences, type=pa.float32(), mask=np.isnan(confidences))),
+                pa.array([result.default_confidence_threshold for result in results], type=pa.float64()),
+                columns["engines"],
+                columns["regions"],
+            ],
+            schema=_arrow_schema(self._arrow_id_type()),
+        )
+
+    def close(self):
+        self.flush()
+        if self._writer is None:
+            # No results: still leave a valid, empty file
+            self._open()
+        self._writer.close()
+
+    def __enter__(self) -> "ArrowResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_result_writer(path: Union[str, PathLike], format: Optional[str] = None, **kwargs):
+    """
+    Opens a writer for `path`, in the format given or told by its suffix:
+    ".parquet", ".arrow"/".feather", ".ndjson"/".jsonl" or ".msgpack".
+    Writers have `write(doc_id, result)` and `close()`, and are context
+    managers.
+    """
+    format = _format_of(path, format)
+    if format in ("parquet", "arrow"):
+        return ArrowResultWriter(path, format=format, **kwargs)
+    if format == "ndjson":
+        return NDJSONResultWriter(path, **kwargs)
+    if format == "msgpack":
+        return MsgpackResultWriter(path, **kwargs)
+    raise ValueError(f"Unknown format {format!r}")
+
+
+def write_results(
+    results: Iterable[tuple[DocId, OCRResult]],
+    path: Union[str, PathLike],
+    format: Optional[str] = None,
+    **kwargs,
+) -> int:
+    """
+    Writes `(doc_id, result)` pairs, e.g. from `ocr_stream`, to a file.
+
+    Returns:
+        int: The number of results written.
+    """
+    with open_result_writer(path, format, **kwargs) as writer:
+        for doc_id, result in results:
+            writer.write(doc_id, result)
+    return writer.count
+
+
+def _read_arrow_batch(batch) -> Iterator[tuple[DocId, OCRResult]]:
+    # Offsets index into the arrays' values, so slices of them are views
+    texts_column = batch.column("texts")
+    offsets = texts_column.offsets.to_numpy()
+    texts = texts_column.values.to_pylist()
+    boxes_column = batch.column("boxes")
+    box_offsets = boxes_column.offsets.to_numpy()
+    boxes = boxes_column.values.values.to_numpy().reshape(-1, 4, 2)
+    confidences_column = batch.column("confidences")
+    confidence_offsets = confidences_column.offsets.to_numpy()
+    confidences = confidences_column.values.to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+    engines = batch.column("engines").to_pylist()
+    regions = batch.column("regions").to_pylist()
+    for index, (doc_id, threshold) in enumerate(
+        zip(batch.column("id").to_pylist(), batch.column("default_confidence_threshold").to_pylist())
+    ):
+        yield doc_id, OCRResult._construct(
+            texts=texts[offsets[index] : offsets[index + 1]],
+            boxes=boxes[box_offsets[index] : box_offsets[index + 1]],
+            confidences=confidences[confidence_offsets[index] : confidence_offsets[index + 1]],
+            default_confidence_threshold=threshold,
+            engines=engines[index],
+            regions=regions[index],
+        )
+
+
+def read_results(path: Union[str, PathLike], format: Optional[str] = None) -> Iterator[tuple[DocId, OCRResult]]:
+    """
+    Reads back the `(doc_id, result)` pairs of a file written by one of the
+    writers, batch by batch. Results are built from the columns directly,
+    without creating `OCRItem` objects.
+    """
+    format = _format_of(path, format)
+    if format == "parquet":
+        _import_optional("pyarrow", "parquet")
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from _read_arrow_batch(batch)
+    elif format == "arrow":
+        pa = _import_optional("pyarrow", "parquet")
+        with pa.ipc.open_file(str(path)) as reader:
+            for index in range(reader.num_record_batches):
+                yield from _read_arrow_batch(reader.get_batch(index))
+    elif format == "ndjson":
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield decode_ndjson(line)
+    elif format == "msgpack":
+        msgpack = _import_optional("msgpack", "msgpack")
+        with open(path, "rb") as f:
+            for record in msgpack.Unpacker(f, raw=False):
+                yield _decode_msgpack_record(record)
+    else:
+        raise ValueError(f"Unknown format {format!r}")
@@ -0,0 +1,254 @@
+import time
+from typing import Optional
+
+import numpy as np
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike, RawImage, convert_imagelike_to_type
+
+
+def changed_blocks(
+    previous: np.ndarray, current: np.ndarray, block_size: int = 32, tolerance: int = 0
+) -> np.ndarray:
+    """
+    Compares two frames of the same shape block by block.
+
+    Args:
+        previous (np.ndarray): The earlier frame.
+        current (np.ndarray): The new frame.
+        block_size (int): The side of the square blocks, in pixels.
+        tolerance (int): The largest per-channel difference still counted as
+            unchanged, e.g. for noise from lossy video compression.
+
+    Returns:
+        np.ndarray: A boolean grid with one entry per block, True where any
+        pixel of the block changed.
+    """
+    if tolerance:
+        import cv2
+
+        changed = cv2.absdiff(previous, current) > tolerance
+    else:
+        changed = previous != current
+    if changed.ndim == 3:
+        changed = changed.any(axis=2)
+    height, width = changed.shape
+    rows, columns = -(-height // block_size), -(-width // block_size)
+    padded = np.zeros((rows * block_size, columns * block_size), dtype=bool)
+    padded[:height, :width] = changed
+    return padded.reshape(rows, block_size, columns, block_size).any(axis=(1, 3))
+
+
+def _block_rects(blocks: np.ndarray, block_size: int, height: int, width: int) -> np.ndarray:
+    # The bounding rectangles, as (x0, y0, x1, y1) pixels, of connected
+    # groups of changed blocks
+    import cv2
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(blocks.astype(np.uint8), connectivity=8)
+    x, y, w, h = (stats[1:count, :4] * block_size).T
+    return np.stack(
+        [x, y, np.minimum(x + w, width), np.minimum(y + h, height)], axis=1
+    ).astype(np.int64)
+
+
+def _touching(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Which rectangles of `a` overlap which rectangles of `b`
+    return (
+        (a[:, None, 0] < b[None, :, 2])
+        & (a[:, None, 2] > b[None, :, 0])
+        & (a[:, None, 1] < b[None, :, 3])
+        & (a[:, None, 3] > b[None, :, 1])
+    )
+
+
+def _merge_overlapping(rects: np.ndarray) -> np.ndarray:
+    merged = [rect for rect in rects]
+    changed = True
+    while changed:
+        changed = False
+        result: list[np.ndarray] = []
+        for rect in merged:
+            for index, other in enumerate(result):
+                if rect[0] < other[2] and rect[2] > other[0] and rect[1] < other[3] and rect[3] > other[1]:
+                    result[index] = np.concatenate([np.minimum(rect[:2], other[:2]), np.maximum(rect[2:], other[2:])])
+                    changed = True
+                    break
+            else:
+                result.append(rect)
+        merged = result
+    return np.array(merged, dtype=np.int64).reshape(-1, 4)
+
+
+class IncrementalOCRSession:
+    """
+    OCRs a sequence of similar frames, such as successive screenshots or the
+    frames of a screen recording, re-OCRing only the parts that changed.
+
+    Each frame is compared with the previous one block by block. Changed
+    blocks are grouped into rectangles, which grow to cover every item of
+    the previous result they touch, so that partly changed lines are read
+    whole, and are then OCRed as `regions` of the frame. Items outside them
+    are carried over from the previous result. A frame of another size, or
+    one that changed more than `max_changed_fraction`, is OCRed in full.
+
+    A session is meant for one stream of frames and is not thread-safe.
+
+    Args:
+        engine (BaseOCREngine): The engine to OCR with.
+        block_size (int): The side of the blocks frames are compared by.
+        tolerance (int): The largest per-channel difference still counted as
+            unchanged, e.g. for noise from lossy video compression.
+        padding (int): Pixels added around each changed rectangle, so that
+            the engine sees the text's surroundings.
+        max_changed_fraction (float): The share of the frame past which it is
+            OCRed in full instead.
+    """
+
+    def __init__(
+        self,
+        engine: BaseOCREngine,
+        block_size: int = 32,
+        tolerance: int = 0,
+        padding: int = 8,
+        max_changed_fraction: float = 0.5,
+    ):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.engine = engine
+        self.block_size = block_size
+        self.tolerance = tolerance
+        self.padding = padding
+        self.max_changed_fraction = max_changed_fraction
+        # The rectangles, as (x0, y0, x1, y1), re-OCRed for the last frame
+        self.changed_regions = np.zeros((0, 4), dtype=np.int64)
+        self._previous: Optional[np.ndarray] = None
+        self._result: Optional[OCRResult] = None
+        self._frames = {"full": 0, "incremental": 0, "unchanged": 0}
+        self._ocr_fraction = 0.0
+
+    @property
+    def result(self) -> Optional[OCRResult]:
+        """
+        The result of the last frame.
+        """
+        return self._result
+
+    def reset(self):
+        """
+        Forgets the previous frame, so that the next one is OCRed in full.
+        """
+        self._previous = None
+        self._result = None
+        self.changed_regions = np.zeros((0, 4), dtype=np.int64)
+
+    def ocr(self, frame: ImageLike, **kwargs) -> OCRResult:
+        """
+        OCRs the next frame.
+
+        Args:
+            frame (ImageLike): The frame.
+            **kwargs: Extra arguments forwarded to the engine. They should be
+                the same for every frame of a session, since items are
+                carried over from earlier frames.
+
+        Returns:
+            OCRResult: The items of the whole frame, sorted by position. Its
+            timings add "diff", the seconds spent comparing frames.
+        """
+        start = time.perf_counter()
+        array = convert_imagelike_to_type(frame, "numpy")
+        # The caller may reuse the frame's buffer for the next capture
+        current = array.copy() if array is frame or isinstance(frame, RawImage) else array
+        previous, self._previous = self._previous, current
+        height, width = current.shape[:2]
+
+        if previous is None or previous.shape != current.shape or self._result is None:
+            return self._full(current, start, 0.0, **kwargs)
+
+        blocks = changed_blocks(previous, current, self.block_size, self.tolerance)
+        if not blocks.any():
+            self._frames["unchanged"] += 1
+            self.changed_regions = np.zeros((0, 4), dtype=np.int64)
+            diff = time.perf_counter() - start
+            self._result = self._result.take(slice(None))
+            self._result.timings = {"diff": diff, "total": diff}
+            return self._result
+
+        rects, carried = self._regions(blocks, height, width)
+        diff = time.perf_counter() - start
+        area = float(((rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])).sum())
+        if area > self.max_changed_fraction * height * width:
+            return self._full(current, start, diff, **kwargs)
+
+        new = self.engine.ocr(current, regions=rects.tolist(), **kwargs)
+        timings = new.timings
+        # The region of each new item only refers to this frame's regions
+        new.regions = None
+        self._frames["incremental"] += 1
+        self._ocr_fraction += area / (height * width)
+        self.changed_regions = rects
+        self._result = OCRResult.concatenate([self._result.take(carried), new]).sort_by_position()
+        self._result.timings = self._timings(timings, diff, start)
+        return self._result
+
+    def _regions(self, blocks: np.ndarray, height: int, width: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the rectangles to re-OCR and a mask of the previous items to
+        carry over.
+        """
+        rects = _block_rects(blocks, self.block_size, height, width)
+        rects[:, :2] = np.maximum(rects[:, :2] - self.padding, 0)
+        rects[:, 2] = np.minimum(rects[:, 2] + self.padding, width)
+        rects[:, 3] = np.minimum(rects[:, 3] + self.padding, height)
+        rects = _merge_overlapping(rects)
+
+        boxes = self._result.boxes
+        items = np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1).astype(np.int64)
+        items[:, :2] = np.maximum(items[:, :2], 0)
+        items[:, 2] = np.minimum(items[:, 2], width)
+        items[:, 3] = np.minimum(items[:, 3], height)
+        # Rectangles grow to cover the items they touch, which may make them
+        # touch more items or each other
+        while True:
+            touching = _touching(items, rects)
+            grown = rects.copy()
+            for index in np.flatnonzero(touching.any(axis=0)):
+                covered = items[touching[:, index]]
+                grown[index, :2] = np.minimum(grown[index, :2], covered[:, :2].min(axis=0))
+                grown[index, 2:] = np.maximum(grown[index, 2:], covered[:, 2:].max(axis=0))
+            grown = _merge_overlapping(grown)
+            if np.array_equal(grown, rects):
+                return rects, ~touching.any(axis=1)
+            rects = grown
+
+    def _full(self, current: np.ndarray, start: float, diff: float, **kwargs) -> OCRResult:
+        result = self.engine.ocr(current, **kwargs)
+        timings = result.timings
+        height, width = current.shape[:2]
+        self._frames["full"] += 1
+        self._ocr_fraction += 1.0
+        self.changed_regions = np.array([[0, 0, width, height]], dtype=np.int64)
+        self._result = result.sort_by_position()
+        self._result.timings = self._timings(timings, diff, start)
+        return self._result
+
+    @staticmethod
+    def _timings(engine_timings: Optional[dict[str, float]], diff: float, start: float) -> dict[str, float]:
+        timings = {"diff": diff, **(engine_timings or {})}
+        timings["total"] = time.perf_counter() - start
+        return timings
+
+    def stats(self) -> dict:
+        """
+        Returns the number of frames OCRed in full, re-OCRed in part, and
+        found unchanged, and the mean share of each frame's area that was
+        OCRed.
+        """
+        frames = sum(self._frames.values())
+        return {
+            "frames": frames,
+            "full_frames": self._frames["full"],
+            "incremental_frames": self._frames["incremental"],
+            "unchanged_frames": self._frames["unchanged"],
+            "mean_ocr_fraction": self._ocr_fraction / frames if frames else 0.0,
+        }
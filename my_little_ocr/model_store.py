@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from os import PathLike
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CACHE_DIR_ENV = "MY_LITTLE_OCR_MODELS_DIR"
+MIRROR_ENV = "MY_LITTLE_OCR_MODEL_MIRROR"
+OFFLINE_ENV = "MY_LITTLE_OCR_OFFLINE"
+
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class ModelFile:
+    """
+    A model file to download: its path relative to `base_url`, which is also
+    where it is stored under the cache directory, and its expected SHA-256.
+    """
+
+    relative_path: str
+    base_url: str
+    sha256: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}/{self.relative_path}"
+
+
+class ChecksumError(ValueError):
+    """
+    Raised when a downloaded file does not match its expected SHA-256.
+    """
+
+
+class IncompleteDownloadError(OSError):
+    """
+    Raised when a connection ends before the whole file was received.
+    """
+
+
+def default_cache_dir() -> Path:
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "my_little_ocr" / "models"
+
+
+def file_sha256(path: Union[str, PathLike]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _sha256_from_etag(etag: Optional[str]) -> Optional[str]:
+    # Hugging Face reports the SHA-256 of large files as their ETag
+    etag = (etag or "").removeprefix("W/").strip('"').lower()
+    if len(etag) == 64 and all(c in "0123456789abcdef" for c in etag):
+        return etag
+    return None
+
+
+_thread_locks: dict[str, threading.Lock] = {}
+_thread_locks_lock = threading.Lock()
+
+
+@contextmanager
+def _download_lock(path: Path) -> Iterator[None]:
+    """
+    Serializes downloads of one file across threads and, where `fcntl` is
+    available, across processes, such as the workers of an `EnginePool`
+    starting together.
+    """
+    with _thread_locks_lock:
+        thread_lock = _thread_locks.setdefault(str(path), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path.with_name(path.name + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ModelStore:
+    """
+    Local store of downloaded model files.
+
+    Files are downloaded into `cache_dir` under a ".part" name, resumed with
+    HTTP range requests after an interruption, checked against their SHA-256
+    and only then renamed to their final name, so a file in the store is
+    always complete. Several files are downloaded concurrently by `fetch`.
+
+    Args:
+        cache_dir (str | PathLike): Where models are stored. Defaults to
+            $MY_LITTLE_OCR_MODELS_DIR, or ~/.cache/my_little_ocr/models.
+        mirror (str): A base URL or a local directory used instead of each
+            file's `base_url`, laid out by relative path. Defaults to
+            $MY_LITTLE_OCR_MODEL_MIRROR.
+        offline (bool): Never download; missing models raise
+            `FileNotFoundError`. Defaults to whether $MY_LITTLE_OCR_OFFLINE
+            is set to 1.
+        search_dirs (list): Other directories, laid out like the store, where
+            models may already be, such as older download locations.
+        timeout (float): Seconds to wait for the server on each read.
+        retries (int): Attempts after a failed or interrupted download.
+        max_workers (int): Concurrent downloads in `fetch`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, PathLike]] = None,
+        mirror: Optional[str] = None,
+        offline: Optional[bool] = None,
+        search_dirs: Iterable[Union[str, PathLike]] = (),
+        timeout: float = 30.0,
+        retries: int = 3,
+        max_workers: int = 4,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        self.mirror = mirror if mirror is not None else os.environ.get(MIRROR_ENV) or None
+        self.offline = offline if offline is not None else os.environ.get(OFFLINE_ENV) == "1"
+        self.search_dirs = [Path(directory) for directory in search_dirs]
+        self.timeout = timeout
+        self.retries = retries
+        self.max_workers = max_workers
+
+    def find(self, model: ModelFile) -> Optional[Path]:
+        """
+        Returns the local path of a model if it is already in the store or in
+        one of the search directories.
+        """
+        for directory in (self.cache_dir, *self.search_dirs):
+            path = directory / model.relative_path
+            if path.is_file():
+                return path
+        return None
+
+    def get(self, model: ModelFile) -> Path:
+        """
+        Returns the local path of a model, downloading it first if needed.
+        """
+        path = self.find(model)
+        if path is not None:
+            return path
+        if self.offline:
+            raise FileNotFoundError(
+                f"Model {model.relative_path} is not in {self.cache_dir} and downloads are disabled; "
+                "prefetch it with `python -m my_little_ocr.model_store`"
+            )
+        path = self.cache_dir / model.relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _download_lock(path):
+            # Another thread or process may have finished it meanwhile
+            if not path.is_file():
+                self._download(model, path)
+        return path
+
+    def fetch(self, models: Iterable[ModelFile]) -> list[Path]:
+        """
+        Returns the local paths of several models, downloading the missing
+        ones concurrently.
+        """
+        models = list(models)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(models)))) as executor:
+            return list(executor.map(self.get, models))
+
+    def _source(self, model: ModelFile) -> str:
+        if self.mirror is None:
+            return model.url
+        if "://" in self.mirror:
+            return ModelFile(model.relative_path, self.mirror).url
+        return str(Path(self.mirror) / model.relative_path)
+
+    def _download(self, model: ModelFile, path: Path):
+        partial = path.with_name(path.name + ".part")
+        source = self._source(model)
+        for attempt in range(self.retries + 1):
+            try:
+                if "://" in source:
+                    reported = self._download_url(source, partial)
+                else:
+                    shutil.copyfile(source, partial)
+                    reported = None
+                # A checksum given for the model takes precedence over the server's
+                expected = model.sha256 or reported
+                if expected is not None and file_sha256(partial) != expected:
+                    partial.unlink(missing_ok=True)
+                    raise ChecksumError(f"{source} does not match its SHA-256 {expected}")
+                os.replace(partial, path)
+                return
+            except urllib.error.HTTPError as e:
+                # Client errors such as 404 do not go away by retrying
+                if e.code < 500 or attempt == self.retries:
+                    raise
+            except (ChecksumError, IncompleteDownloadError, urllib.error.URLError, TimeoutError, ConnectionError):
+                if attempt == self.retries:
+                    raise
+            time.sleep(min(2**attempt, 10))
+
+    def _download_url(self, url: str, partial: Path) -> Optional[str]:
+        """
+        Downloads `url` into `partial`, resuming from its current size, and
+        returns the SHA-256 the server reports for the file, if any.
+        """
+        offset = partial.stat().st_size if partial.exists() else 0
+        headers = {"User-Agent": "my_little_ocr"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        try:
+            response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # The previous attempt already received the whole file
+                return None
+            raise
+        with response:
+            if offset and response.status != 206:
+                # The server ignored the range; start over
+                offset = 0
+            length = response.headers.get("Content-Length")
+            total = offset + int(length) if length is not None else None
+            expected = _sha256_from_etag(response.headers.get("X-Linked-Etag") or response.headers.get("ETag"))
+            with open(partial, "ab" if offset else "wb") as f:
+                for block in iter(lambda: response.read(CHUNK_SIZE), b""):
+                    f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+        if total is not None and partial.stat().st_size != total:
+            raise IncompleteDownloadError(f"Received {partial.stat().st_size} of {total} bytes of {url}")
+        return expected
+
+
+_default_store: Optional[ModelStore] = None
+
+
+def get_model_store() -> ModelStore:
+    """
+    Returns the store engines download their models into, configured from
+    the environment on first use.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = ModelStore()
+    return _default_store
+
+
+def set_model_store(store: ModelStore):
+    """
+    Replaces the store engines use by default.
+    """
+    global _default_store
+    _default_store = store
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from my_little_ocr.ocr_engines.rapidocr_engine.rapidocr_engine import (
+        DEFAULT_DET_MODEL,
+        DEFAULT_REC_MODEL,
+        quantized_models,
+        rapidocr_model_file,
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="python -m my_little_ocr.model_store",
+        description="Download RapidOCR models into the model store ahead of time, e.g. when building an image.",
+    )
+    parser.add_argument(
+        "models", nargs="*", default=[DEFAULT_DET_MODEL, DEFAULT_REC_MODEL], help="Model names; defaults to the engine's"
+    )
+    parser.add_argument("--cache-dir", help=f"The store directory (default: ${CACHE_DIR_ENV} or ~/.cache)")
+    parser.add_argument("--mirror", help="A base URL or directory to download from instead")
+    parser.add_argument(
+        "--int8",
+        action="store_true",
+        help="Also make the INT8 copies used by precision='int8', from a detection and a recognition model",
+    )
+    args = parser.parse_args(argv)
+    if args.int8 and len(args.models) != 2:
+        parser.error("--int8 needs one detection and one recognition model, in that order")
+
+    store = ModelStore(cache_dir=args.cache_dir, mirror=args.mirror, offline=False)
+    paths = store.fetch(rapidocr_model_file(name) for name in args.models)
+    for path in paths:
+        print(path)
+    if args.int8:
+        for path in quantized_models(*paths, model_store=store):
+            print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
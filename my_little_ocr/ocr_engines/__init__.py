@@ -1,10 +1,102 @@
-from my_little_ocr.base_engine.engine_config import get_engine as get_engine_after_register
-from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine
 import importlib
-from typing import Type
+import importlib.util
+import platform
+import shutil
+import sys
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Type
 
-engine_instances :dict[str, BaseOCREngine] = {}
+if TYPE_CHECKING:
+    from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine
+
+
+@dataclass(frozen=True)
+class EngineInfo:
+    """
+    Static description of an OCR engine, available without importing it.
+    """
+
+    engine_name: str
+    # Module and attribute holding the engine class
+    module: str
+    class_name: str
+    project_url: Optional[str] = None
+    # The pip extra that installs the engine's dependencies
+    extra: Optional[str] = None
+    # Top-level modules that must be importable
+    requires: tuple[str, ...] = ()
+    # Executables of which at least one must exist, if any are listed
+    executables: tuple[str, ...] = ()
+    # Operating systems (as reported by platform.system()) the engine runs on
+    platforms: tuple[str, ...] = field(default=())
+
+    @property
+    def available(self) -> bool:
+        """
+        Whether the engine's dependencies are installed, checked without
+        importing them.
+        """
+        if self.platforms and platform.system() not in self.platforms:
+            return False
+        if any(importlib.util.find_spec(name) is None for name in self.requires):
+            return False
+        if self.executables and not any(
+            shutil.which(executable) or Path(executable).is_file()
+            for executable in self.executables
+        ):
+            return False
+        return True
+
+
+ENGINE_REGISTRY: dict[str, EngineInfo] = {
+    info.engine_name: info
+    for info in [
+        EngineInfo(
+            engine_name="tesseract",
+            module="my_little_ocr.ocr_engines.tesseract_engine",
+            class_name="TesseractEngine",
+            project_url="https://github.com/tesseract-ocr/tesseract",
+            extra="tesseract",
+            executables=("tesseract", r"C:\Program Files\Tesseract-OCR\tesseract.exe"),
+        ),
+        EngineInfo(
+            engine_name="easyocr",
+            module="my_little_ocr.ocr_engines.easyocr_engine",
+            class_name="EasyOCREngine",
+            project_url="https://github.com/JaidedAI/EasyOCR",
+            extra="easyocr",
+            requires=("easyocr",),
+        ),
+        EngineInfo(
+            engine_name="wechat_ocr",
+            module="my_little_ocr.ocr_engines.wechat_ocr_engine",
+            class_name="WechatOCREngine",
+            project_url="https://github.com/kanadeblisst00/wechat_ocr",
+            extra="wechat_ocr",
+            requires=("wechat_ocr", "git"),
+            platforms=("Windows",),
+        ),
+        EngineInfo(
+            engine_name="surya",
+            module="my_little_ocr.ocr_engines.surya_engine",
+            class_name="SuryaEngine",
+            project_url="https://github.com/VikParuchuri/surya",
+            extra="surya",
+            requires=("surya",),
+        ),
+        EngineInfo(
+            engine_name="rapidocr",
+            module="my_little_ocr.ocr_engines.rapidocr_engine",
+            class_name="RapidOCREngine",
+            project_url="https://github.com/RapidAI/RapidOCR",
+            extra="rapidocr",
+            requires=("rapidocr_onnxruntime",),
+        ),
+    ]
+}
+
+engine_instances: "dict[str, BaseOCREngine]" = {}
 
 def deal_with_engine_name(engine_name: str) -> str:
     engine_name_with_engine = engine_name if engine_name.endswith("_engine") else engine_name + "_engine"
@@ -12,12 +104,48 @@ def deal_with_engine_name(engine_name: str) -> str:
     return engine_name, engine_name_with_engine
 
 
-def get_engine_class(engine_name: str) -> Type[BaseOCREngine]:
+def _registered_engines() -> dict:
+    # Engines added through register_engine; if engine_config was never
+    # imported, nothing can have been registered
+    engine_config = sys.modules.get("my_little_ocr.base_engine.engine_config")
+    return engine_config.engines if engine_config is not None else {}
+
+
+def list_engines(available_only: bool = False) -> dict[str, EngineInfo]:
+    """
+    Lists the known OCR engines without importing any of them.
+
+    Args:
+        available_only (bool): Only list engines whose dependencies are installed.
+
+    Returns:
+        dict[str, EngineInfo]: The engine descriptions, keyed by engine name.
+    """
+    result = dict(ENGINE_REGISTRY)
+    for engine_name, engine_config in _registered_engines().items():
+        if engine_name not in result:
+            result[engine_name] = EngineInfo(
+                engine_name=engine_name,
+                module=engine_config.engine_class.__module__,
+                class_name=engine_config.engine_class.__qualname__,
+                project_url=engine_config.project_url,
+            )
+    if available_only:
+        result = {name: info for name, info in result.items() if info.available}
+    return result
+
+
+def get_engine_class(engine_name: str) -> "Type[BaseOCREngine]":
     engine_name, engine_name_with_engine = deal_with_engine_name(engine_name)
-    importlib.import_module(f"my_little_ocr.ocr_engines.{engine_name_with_engine}")
-    return get_engine_after_register(engine_name).engine_class
+    registered = _registered_engines()
+    if engine_name in registered:
+        return registered[engine_name].engine_class
+    if engine_name not in ENGINE_REGISTRY:
+        raise KeyError(f"Unknown OCR engine: {engine_name}")
+    info = ENGINE_REGISTRY[engine_name]
+    return getattr(importlib.import_module(info.module), info.class_name)
 
-def get_engine_instance(engine_name: str) -> BaseOCREngine:
+def get_engine_instance(engine_name: str) -> "BaseOCREngine":
     engine_name, engine_name_with_engine = deal_with_engine_name(engine_name)
     engine_class = get_engine_class(engine_name)
     if engine_name_with_engine in engine_instances:
@@ -25,17 +153,18 @@ def get_engine_instance(engine_name: str) -> BaseOCREngine:
     engine_instances[engine_name_with_engine] = engine_class()
     return engine_instances[engine_name_with_engine]
 
-def get_all_engines():
+def get_all_engines() -> "dict[str, Type[BaseOCREngine]]":
+    """
+    Returns the classes of all engines whose dependencies are installed.
+    Importing an engine module is cheap; its heavy dependencies are only
+    loaded when the engine is instantiated.
+    """
     result: dict[str, Type[BaseOCREngine]] = {}
-    for file_or_folder in Path(__file__).parent.iterdir():
+    for engine_name in list_engines(available_only=True):
         try:
-            stem = file_or_folder.stem
-            if stem.endswith("_engine"):
-                engine_name = stem[:-7]
-                engine_class = get_engine_class(engine_name)
-                result[engine_name] = engine_class
+            result[engine_name] = get_engine_class(engine_name)
         except Exception as e:
             print(f"Error: {e}")
     return result
 
-__all__ = ["get_engine_instance", "get_all_engines",  "get_engine_class"]
+__all__ = ["get_engine_instance", "get_all_engines", "get_engine_class", "list_engines", "EngineInfo"]
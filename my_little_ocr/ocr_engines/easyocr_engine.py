@@ -1,12 +1,14 @@
 from my_little_ocr.base_engine.base_ocr_engine import (
     BaseOCREngine,
-    OCRItem,
     OCRResult,
     ImageLike,
+    batched,
     convert_imagelike_to_type,
 )
-from typing import Literal, Optional, List
-import easyocr
+from my_little_ocr.base_engine.metrics import stage
+from typing import Iterable, Literal, Optional, List
+import json
+import numpy as np
 
 # fmt: off
 EASYOCR_LANGS = [
@@ -48,20 +50,167 @@ def convert_langs_to_easyocr_langs(langs: list[str]) -> list[str]:
 
 class EasyOCREngine(BaseOCREngine):
     ocr_engine_name = "easyocr"
+    # Detection runs on at most `canvas_size` (2560) pixels, and recognition
+    # on a grayscale copy of the image
+    preferred_max_side = 2560
+    accepts_grayscale = True
     default_langs: list[str] = ["en"]
 
     def __init__(self, default_langs: list[str] = ["ch_sim", "en"], **kwargs):
         self.default_langs = convert_langs_to_easyocr_langs(default_langs)
+        # easyocr pulls in torch, so it is only imported once an engine is created
+        import easyocr
+
+        self.reader_kwargs = kwargs
         self.reader = easyocr.Reader(lang_list=self.default_langs, **kwargs)
 
+    def get_config_key(self) -> dict:
+        return {"langs": sorted(self.default_langs), **self.reader_kwargs}
+
     def ocr(self, img: ImageLike, **kwargs) -> OCRResult:
-        img = convert_imagelike_to_type(img, "numpy")
-        result = self.reader.readtext(img, **kwargs)
-        return OCRResult(ocr_items=[
-            OCRItem(text=item[1], confidence=item[2], box=item[0])
-            for item in result
-        ])
+        with stage("decode"):
+            img = convert_imagelike_to_type(img, "numpy")
+        # readtext runs detection and recognition in one call
+        with stage("inference"):
+            result = self.reader.readtext(img, **kwargs)
+        with stage("postprocess"):
+            return self._to_ocr_result(result)
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        results: list[OCRResult] = []
+        for chunk in batched(images, batch_size):
+            with stage("decode"):
+                arrays = [convert_imagelike_to_type(img, "numpy") for img in chunk]
+            # readtext_batched stacks its inputs, so only same-sized images can share a call
+            same_shape: dict[tuple, list[int]] = {}
+            for index, array in enumerate(arrays):
+                same_shape.setdefault(array.shape, []).append(index)
+            chunk_results: list[Optional[OCRResult]] = [None] * len(arrays)
+            for indices in same_shape.values():
+                with stage("inference"):
+                    batch_result = self.reader.readtext_batched(
+                        [arrays[index] for index in indices], **kwargs
+                    )
+                with stage("postprocess"):
+                    for index, items in zip(indices, batch_result):
+                        chunk_results[index] = self._to_ocr_result(items)
+            results.extend(chunk_results)
+        return results
+
+    def detect_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[np.ndarray]:
+        results = []
+        for img in images:
+            with stage("decode"):
+                img = convert_imagelike_to_type(img, "numpy")
+            with stage("detection"):
+                horizontal_list, free_list = self.reader.detect(img, **kwargs)
+            with stage("postprocess"):
+                # Axis-aligned boxes come as [x_min, x_max, y_min, y_max]
+                boxes = [
+                    [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+                    for x_min, x_max, y_min, y_max in horizontal_list[0]
+                ]
+                boxes.extend(free_list[0])
+                results.append(np.rint(np.asarray(boxes, dtype=np.float64)).astype(np.int32).reshape(-1, 4, 2))
+        return results
+
+    def recognize_batch(
+        self,
+        images: Iterable[ImageLike],
+        boxes: Optional[Iterable] = None,
+        batch_size: int = 8,
+        **kwargs,
+    ) -> list[OCRResult]:
+        """
+        Recognizes the given boxes image by image, `batch_size` lines per
+        model call. Line crops (`boxes` None) are stacked into one image, so
+        that they share model calls as well.
+        """
+        images = list(images)
+        if boxes is None:
+            return self._recognize_crops(images, batch_size, **kwargs)
+        boxes = list(boxes)
+        if len(boxes) != len(images):
+            raise ValueError("boxes must hold one list of boxes per image")
+        results = []
+        for img, image_boxes in zip(images, boxes):
+            with stage("decode"):
+                img = convert_imagelike_to_type(img, "numpy")
+            image_boxes = np.asarray(image_boxes, dtype=np.float64).reshape(-1, 4, 2)
+            free_list = np.rint(image_boxes).astype(int).tolist()
+            with stage("recognition"):
+                items = self.reader.recognize(
+                    img, horizontal_list=[], free_list=free_list, batch_size=batch_size, **kwargs
+                ) if free_list else []
+            with stage("postprocess"):
+                results.append(self._match_boxes(items, free_list, image_boxes))
+        return results
+
+    def _recognize_crops(self, crops: list[ImageLike], batch_size: int, **kwargs) -> list[OCRResult]:
+        with stage("decode"):
+            crops = [convert_imagelike_to_type(crop, "numpy") for crop in crops]
+        if not crops:
+            return []
+        import cv2
+
+        grays = [crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) for crop in crops]
+        width = max(gray.shape[1] for gray in grays)
+        canvas = np.full((sum(gray.shape[0] for gray in grays), width), 255, dtype=np.uint8)
+        horizontal_list, top = [], 0
+        for gray in grays:
+            height, crop_width = gray.shape
+            canvas[top : top + height, :crop_width] = gray
+            horizontal_list.append([0, crop_width, top, top + height])
+            top += height
+        with stage("recognition"):
+            items = self.reader.recognize(
+                canvas, horizontal_list=horizontal_list, free_list=[], batch_size=batch_size, **kwargs
+            )
+        with stage("postprocess"):
+            boxes = [
+                [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+                for x_min, x_max, y_min, y_max in horizontal_list
+            ]
+            merged = self._match_boxes(items, boxes, np.asarray(boxes))
+            # Each crop gets its own result, with its own size as the box
+            return [
+                OCRResult.from_columns(
+                    texts=[merged.texts[index]],
+                    boxes=[[[0, 0], [gray.shape[1], 0], [gray.shape[1], gray.shape[0]], [0, gray.shape[0]]]],
+                    confidences=merged.confidences[index : index + 1],
+                    default_confidence_threshold=0.0,
+                )
+                for index, gray in enumerate(grays)
+            ]
+
+    @staticmethod
+    def _match_boxes(items: list, requested: list, boxes: np.ndarray) -> OCRResult:
+        # easyocr returns each line with the box it was given, but may reorder
+        # the lines by position
+        index_by_box: dict[str, list[int]] = {}
+        for index, box in enumerate(requested):
+            index_by_box.setdefault(json.dumps(box), []).append(index)
+        texts, confidences = [""] * len(requested), [float("nan")] * len(requested)
+        for box, text, confidence in items:
+            indices = index_by_box.get(json.dumps(np.asarray(box).astype(int).tolist()))
+            if indices:
+                index = indices.pop(0)
+                texts[index], confidences[index] = text, confidence
+        return OCRResult.from_columns(
+            texts=texts, boxes=boxes, confidences=confidences, default_confidence_threshold=0.0
+        )
 
+    @staticmethod
+    def _to_ocr_result(items: list) -> OCRResult:
+        return OCRResult.from_columns(
+            texts=[item[1] for item in items],
+            boxes=[item[0] for item in items],
+            confidences=[item[2] for item in items],
+        )
 
 from my_little_ocr.base_engine.engine_config import EngineConfig, register_engine
 
@@ -1,13 +1,26 @@
-from typing import Literal
-from rapidocr_onnxruntime import RapidOCR
+from typing import Iterable, Literal, Optional, Union
+from os import PathLike
 from pathlib import Path
+import hashlib
+import logging
+import os
+import platform
+import tempfile
+import time
+import numpy as np
 from my_little_ocr.base_engine.base_ocr_engine import (
     BaseOCREngine,
-    OCRItem,
     OCRResult,
     ImageLike,
+    batched,
     convert_imagelike_to_type,
 )
+from my_little_ocr.base_engine.img_utils import synthetic_text_image
+from my_little_ocr.base_engine.metrics import record_stage, stage
+from my_little_ocr.base_engine.threads import engine_threads
+from my_little_ocr.model_store import ModelFile, ModelStore, file_sha256, get_model_store
+
+logger = logging.getLogger(__name__)
 
 RECOGNITION_MODELS = Literal[
     "ch_PP-OCRv4_rec_infer.onnx",
@@ -40,59 +53,722 @@ def get_model_version_by_name(model_name: str):
     return "PP-OCRv1"
 
 
-import requests
-from tqdm import tqdm
+DEFAULT_DET_MODEL = "ch_PP-OCRv4_det_infer.onnx"
+DEFAULT_REC_MODEL = "ch_PP-OCRv4_rec_infer.onnx"
 
+# e.g. https://huggingface.co/SWHL/RapidOCR/resolve/main/PP-OCRv4/ch_PP-OCRv4_det_infer.onnx
+MODEL_BASE_URL = "https://huggingface.co/SWHL/RapidOCR/resolve/main"
 
-def try_download_model(model_name: str) -> Path:
-    if Path(model_name).exists():
-        return Path(model_name)
+# Checksums of the default models; for the others, the one Hugging Face
+# reports while downloading is used
+MODEL_SHA256 = {
+    "PP-OCRv4/ch_PP-OCRv4_det_infer.onnx": "d2a7720d45a54257208b1e13e36a8479894cb74155a5efe29462512d42f49da9",
+    "PP-OCRv4/ch_PP-OCRv4_rec_infer.onnx": "48fc40f24f6d2a207a2b1091d3437eb3cc3eb6b676dc3ef9c37384005483683b",
+}
+
+# Where models were downloaded by earlier versions, still used if present
+LEGACY_MODEL_DIR = Path(__file__).parent / "models"
 
-    # https://huggingface.co/SWHL/RapidOCR/resolve/main/PP-OCRv1/ch_ppocr_mobile_v2.0_det_infer.onnx?download=true
-    model_folder = get_model_version_by_name(model_name)
+
+def rapidocr_model_file(model_name: str) -> ModelFile:
     model_name = model_name.split("/")[-1]
-    model_url = f"https://huggingface.co/SWHL/RapidOCR/resolve/main/{model_folder}/{model_name}?download=true"
-    model_path = Path(__file__).parent / "models" / model_folder / model_name
-    model_path.parent.mkdir(parents=True, exist_ok=True)
-    if not model_path.exists():
-        response = requests.get(model_url, stream=True)
-        total_size = int(response.headers.get("content-length", 0))
-        block_size = 1024
-
-        with open(model_path, "wb") as file, tqdm(
-            desc=model_name,
-            total=total_size,
-            unit="iB",
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as bar:
-            for data in response.iter_content(block_size):
-                file.write(data)
-                bar.update(len(data))
-
-    return model_path
+    relative_path = f"{get_model_version_by_name(model_name)}/{model_name}"
+    return ModelFile(relative_path, MODEL_BASE_URL, MODEL_SHA256.get(relative_path))
+
+
+def _local_model_path(model_name: str) -> Optional[Path]:
+    if Path(model_name).is_file():
+        return Path(model_name)
+    legacy_path = LEGACY_MODEL_DIR / rapidocr_model_file(model_name).relative_path
+    return legacy_path if legacy_path.is_file() else None
+
+
+def fetch_models(model_names: list[str], model_store: Optional[ModelStore] = None) -> list[Path]:
+    """
+    Returns the paths of the given models, which are either existing files
+    or model names fetched through the model store, concurrently.
+    """
+    paths = {name: _local_model_path(name) for name in model_names}
+    missing = [name for name, path in paths.items() if path is None]
+    if missing:
+        store = model_store or get_model_store()
+        paths.update(zip(missing, store.fetch(rapidocr_model_file(name) for name in missing)))
+    return [paths[name] for name in model_names]
+
+
+def try_download_model(model_name: str, model_store: Optional[ModelStore] = None) -> Path:
+    return fetch_models([model_name], model_store)[0]
+
+
+GRAPH_OPTIMIZATION = Literal["disable", "basic", "extended", "all"]
+
+# Typical (height, width) of inputs: a detection-sized square and a full HD
+# screenshot, whose text lines fill several recognition batches
+WARMUP_SHAPES = ((736, 736), (1080, 1920))
+
+
+def _session_options(graph_optimization: GRAPH_OPTIMIZATION):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    # The same settings RapidOCR uses for its own sessions
+    options.log_severity_level = 4
+    options.enable_cpu_mem_arena = False
+    options.graph_optimization_level = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[graph_optimization]
+    return options
+
+
+def optimized_model(
+    model_path: Union[str, PathLike], cache_dir: Union[str, PathLike], graph_optimization: GRAPH_OPTIMIZATION = "all"
+) -> Path:
+    """
+    Returns the path of a model's graph optimized for CPU inference, saved in
+    onnxruntime's ORT format under `cache_dir` the first time. Loading it
+    skips the optimization passes onnxruntime otherwise runs on every start.
+
+    The optimizations depend on the model file, the onnxruntime version, the
+    optimization level and the CPU architecture, which are all part of the
+    cached file's name, so a change to any of them creates a new file.
+    """
+    import onnxruntime as ort
+
+    model_path = Path(model_path)
+    stat = model_path.stat()
+    key = "|".join(
+        str(part)
+        for part in (
+            model_path.resolve(),
+            stat.st_size,
+            stat.st_mtime_ns,
+            ort.__version__,
+            graph_optimization,
+            platform.machine(),
+        )
+    )
+    cached = Path(cache_dir) / f"{model_path.stem}-{hashlib.sha256(key.encode()).hexdigest()[:16]}.ort"
+    if not cached.is_file():
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name, so concurrent starts never load a
+        # partly written file
+        partial = cached.with_name(f"{cached.name}.{os.getpid()}.part")
+        options = _session_options(graph_optimization)
+        options.optimized_model_filepath = str(partial)
+        options.add_session_config_entry("session.save_model_format", "ORT")
+        ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+        os.replace(partial, cached)
+    return cached
+
+
+def _default_cls_model_path() -> Path:
+    from rapidocr_onnxruntime.main import DEFAULT_CFG_PATH
+    from rapidocr_onnxruntime.utils import read_yaml, update_model_path
+
+    return Path(update_model_path(read_yaml(DEFAULT_CFG_PATH))["Cls"]["model_path"])
+
+
+PRECISION = Literal["fp32", "int8"]
+
+# Page sizes, as (height, width), of the synthetic calibration images. The
+# detection model sees them at their size, as RapidOCR scales images up to
+# a short side of 736 pixels, and calibration keeps every activation of an
+# input in memory, so larger pages add little but cost much.
+CALIBRATION_SHAPES = ((736, 736), (736, 1024), (1024, 736), (736, 1280))
+
+CALIBRATION_WORDS = (
+    "invoice total amount due date page table figure result receipt order number customer "
+    "address street city quantity price 2024 15.99 42 No. Ref: ID-7731 TOTAL Subtotal"
+).split()
+
+
+def calibration_images(count: int = 8, seed: int = 0) -> list[np.ndarray]:
+    """
+    Renders pages of random text lines with OpenCV's fonts, varying their
+    size, scale, color and background, as inputs for calibrating
+    quantized models. The pages are reproducible for a given seed.
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    fonts = [cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX, cv2.FONT_HERSHEY_COMPLEX, cv2.FONT_HERSHEY_TRIPLEX]
+    images = []
+    for index in range(count):
+        height, width = CALIBRATION_SHAPES[index % len(CALIBRATION_SHAPES)]
+        img = np.full((height, width, 3), int(rng.integers(190, 256)), dtype=np.uint8)
+        y = 0
+        while True:
+            scale = float(rng.uniform(0.4, 2.0))
+            y += int(30 * scale) + int(rng.integers(8, 40))
+            if y >= height - 8:
+                break
+            line = " ".join(rng.choice(CALIBRATION_WORDS, size=int(rng.integers(1, 9))))
+            color = tuple(int(value) for value in rng.integers(0, 110, 3))
+            origin = (int(rng.integers(4, max(width // 3, 5))), y)
+            thickness = max(round(scale * rng.uniform(1.0, 2.0)), 1)
+            cv2.putText(img, line, origin, fonts[int(rng.integers(len(fonts)))], scale, color, thickness, cv2.LINE_AA)
+        images.append(img)
+    return images
+
+
+def _record_model_inputs(engine, images: list[np.ndarray]) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    Runs a RapidOCR instance on the images and returns the tensors its
+    detection and recognition models received.
+    """
+    det_inputs, rec_inputs = [], []
+    det_session, rec_session = engine.text_det.infer, engine.text_rec.session
+
+    def record(session, inputs):
+        def call(input_content):
+            inputs.append(input_content)
+            return session(input_content)
+
+        return call
+
+    engine.text_det.infer = record(det_session, det_inputs)
+    engine.text_rec.session = record(rec_session, rec_inputs)
+    try:
+        for img in images:
+            engine(img)
+    finally:
+        engine.text_det.infer, engine.text_rec.session = det_session, rec_session
+    return det_inputs, rec_inputs
+
+
+def quantize_model(
+    model_path: Union[str, PathLike],
+    output_path: Union[str, PathLike],
+    calibration: Optional[list[np.ndarray]] = None,
+) -> Path:
+    """
+    Quantizes an ONNX model to INT8 with onnxruntime's quantization tools.
+
+    The model is first pre-processed with `quant_pre_process`, which also
+    turns the Constant nodes the PP-OCR exports hold their weights in into
+    initializers, the only weights the quantizer sees, and converted to
+    opset 13 if older. With `calibration`
+    input tensors, Conv and MatMul nodes are then quantized statically, in
+    QDQ format with per-channel weights, from the activation ranges observed
+    on them. Otherwise the weights of MatMul and Gemm nodes are quantized
+    dynamically, with activation ranges computed at run time.
+
+    Args:
+        model_path (str | PathLike): The FP32 model.
+        output_path (str | PathLike): Where the quantized model is written.
+        calibration (list[np.ndarray]): Inputs of the model's first input,
+            for static quantization.
+
+    Returns:
+        Path: `output_path`.
+    """
+    try:
+        import onnx
+        import onnx.version_converter
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError as e:
+        raise ImportError(
+            "INT8 quantization needs the onnx package; install it with `pip install my_little_ocr[quantization]`"
+        ) from e
+
+    model_path, output_path = Path(model_path), Path(output_path)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        prepared = Path(temp_dir) / model_path.name
+        # Symbolic shape inference would need sympy, and the models' shapes
+        # are dynamic anyway
+        quant_pre_process(str(model_path), str(prepared), skip_symbolic_shape=True)
+        model = onnx.load(str(prepared))
+        opset = next(opset.version for opset in model.opset_import if opset.domain in ("", "ai.onnx"))
+        if opset < 13:
+            # Per-channel QDQ needs the axis of DequantizeLinear, from opset 13
+            onnx.save(onnx.version_converter.convert_version(model, 13), str(prepared))
+        _quantize_prepared(prepared, output_path, calibration)
+
+    # RapidOCR reads the character list of recognition models from their
+    # metadata, which must survive quantization
+    source, quantized = onnx.load(str(model_path)), onnx.load(str(output_path))
+    existing = {prop.key for prop in quantized.metadata_props}
+    missing = [prop for prop in source.metadata_props if prop.key not in existing]
+    if missing:
+        quantized.metadata_props.extend(missing)
+        onnx.save(quantized, str(output_path))
+    return output_path
+
+
+def _quantize_prepared(model_path: Path, output_path: Path, calibration: Optional[list[np.ndarray]]):
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+
+    if calibration:
+        import onnxruntime as ort
+
+        input_name = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+        class TensorReader(CalibrationDataReader):
+            def __init__(self):
+                self.feeds = iter([{input_name: tensor} for tensor in calibration])
+
+            def get_next(self):
+                return next(self.feeds, None)
+
+        quantize_static(
+            model_path,
+            output_path,
+            TensorReader(),
+            quant_format=QuantFormat.QDQ,
+            op_types_to_quantize=["Conv", "MatMul"],
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    else:
+        quantize_dynamic(model_path, output_path, op_types_to_quantize=["MatMul", "Gemm"], weight_type=QuantType.QInt8)
+
+
+def quantized_model_path(model_path: Union[str, PathLike], cache_dir: Optional[Union[str, PathLike]] = None) -> Path:
+    """
+    Returns where the INT8 copy of a model is cached: next to the model, or
+    in `cache_dir`, named after the checksum of the model file, so that a
+    changed model is quantized again.
+    """
+    model_path = Path(model_path)
+    directory = Path(cache_dir) if cache_dir is not None else model_path.parent
+    return directory / f"{model_path.stem}.int8-{file_sha256(model_path)[:16]}.onnx"
+
+
+def quantized_models(
+    det_model_path: Union[str, PathLike],
+    rec_model_path: Union[str, PathLike],
+    model_store: Optional[ModelStore] = None,
+    calibration_count: int = 8,
+) -> tuple[Path, Path]:
+    """
+    Returns the paths of INT8 copies of a detection and a recognition model,
+    quantizing them the first time.
+
+    Both are quantized statically, calibrated on the inputs they receive
+    while the FP32 models OCR `calibration_images`. Copies are cached next to
+    the models, or under "quantized" in the model store if that directory is
+    read-only.
+    """
+    paths = [Path(det_model_path), Path(rec_model_path)]
+    outputs = []
+    for path in paths:
+        output = quantized_model_path(path)
+        if not output.is_file() and not os.access(path.parent, os.W_OK):
+            output = quantized_model_path(path, (model_store or get_model_store()).cache_dir / "quantized")
+        outputs.append(output)
+    if all(output.is_file() for output in outputs):
+        return outputs[0], outputs[1]
+
+    from rapidocr_onnxruntime import RapidOCR
+
+    logger.warning(
+        "Quantizing %s and %s to INT8, which takes about a minute and is done once; "
+        "run `python -m my_little_ocr.model_store --int8` to do it ahead of time",
+        paths[0].name,
+        paths[1].name,
+    )
+    start = time.perf_counter()
+    fp32_engine = RapidOCR(det_model_path=str(paths[0]), rec_model_path=str(paths[1]))
+    calibration = _record_model_inputs(fp32_engine, calibration_images(calibration_count))
+    for path, output, inputs in zip(paths, outputs, calibration):
+        if output.is_file():
+            continue
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name, so concurrent starts never load a
+        # partly written file
+        partial = output.with_name(f"{output.stem}.{os.getpid()}.part.onnx")
+        try:
+            quantize_model(path, partial, inputs)
+            os.replace(partial, output)
+        finally:
+            partial.unlink(missing_ok=True)
+        logger.info("Wrote %s after %.1fs", output, time.perf_counter() - start)
+    return outputs[0], outputs[1]
+
+
+# Options `ocr` and the batched methods take per call. RapidOCR's own call
+# keywords (box_thresh, unclip_ratio, text_score) would change the engine for
+# every later call, so detection thresholds are constructor arguments instead
+OCR_OPTIONS = ("use_cls", "text_score")
+
+# The members of RapidOCR that batched inference, regions and the separate
+# stages run the pipeline through. They are not public API, so they are
+# checked for once, and the engine falls back to whole RapidOCR calls
+PIPELINE_MEMBERS = (
+    "load_img", "maybe_add_letterbox", "auto_text_det", "get_crop_img_list", "sorted_boxes",
+    "use_cls", "text_score", "text_cls", "text_rec", "text_det.infer", "text_det.preprocess_op",
+    "text_det.postprocess_op", "text_det.filter_tag_det_res",
+)
+
+
+def _exposes_pipeline(engine) -> bool:
+    for member in PIPELINE_MEMBERS:
+        owner = engine
+        for name in member.split("."):
+            if not hasattr(owner, name):
+                return False
+            owner = getattr(owner, name)
+    return True
 
 
 class RapidOCREngine(BaseOCREngine):
+    ocr_engine_name = "rapidocr"
+    # Text crops are resized to a height of 48 pixels for recognition, and
+    # grayscale input is converted back to BGR by RapidOCR itself
+    preferred_max_side = 4096
+    accepts_grayscale = True
+
     def __init__(
         self,
-        det_model: DETECTION_MODELS = "ch_PP-OCRv4_det_infer.onnx",
-        rec_model: RECOGNITION_MODELS = "ch_PP-OCRv4_rec_infer.onnx",
+        det_model: DETECTION_MODELS = DEFAULT_DET_MODEL,
+        rec_model: RECOGNITION_MODELS = DEFAULT_REC_MODEL,
+        model_store: Optional[ModelStore] = None,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        graph_optimization: GRAPH_OPTIMIZATION = "all",
+        optimized_model_cache: Union[bool, str, PathLike] = False,
+        warmup: bool = False,
+        precision: PRECISION = "fp32",
         **kwargs,
     ):
+        """
+        Args:
+            det_model, rec_model: Model names, fetched through `model_store`,
+                or paths to model files.
+            intra_op_threads (int): Threads each model call may use; by default
+                the engine's share of the thread budget, or without one, one
+                per physical core as onnxruntime chooses.
+            inter_op_threads (int): Threads for running independent graph
+                nodes in parallel.
+            graph_optimization (str): The onnxruntime graph optimization level:
+                "disable", "basic", "extended" or "all".
+            optimized_model_cache (bool | str | PathLike): A directory where the
+                optimized graphs are saved and loaded from on later starts,
+                skipping the optimization passes; True uses "optimized" in the
+                model store.
+            warmup (bool): Whether to run `warmup` once the engine is loaded.
+            precision (str): "fp32" for the models as published, or "int8"
+                for copies quantized locally (see `quantized_models`) the
+                first time, which are faster on CPUs. Needs the onnx package
+                (the "quantization" extra).
+            **kwargs: Passed to `rapidocr_onnxruntime.RapidOCR`, e.g.
+                `text_score`, `det_box_thresh` or `det_unclip_ratio`.
+        """
+        # onnxruntime is only loaded once an engine is created
+        from rapidocr_onnxruntime import RapidOCR
+
+        if precision not in ("fp32", "int8"):
+            raise ValueError("precision must be 'fp32' or 'int8'")
+        gpu = any(value for key, value in kwargs.items() if key.endswith(("use_cuda", "use_dml")))
+        if precision == "int8" and gpu:
+            raise ValueError("int8 precision only supports CPU inference")
+        self.det_model, self.rec_model = det_model, rec_model
+        self.precision = precision
+        self.engine_kwargs = dict(kwargs)
+        det_model_path, rec_model_path = fetch_models([det_model, rec_model], model_store)
+        if precision == "int8":
+            det_model_path, rec_model_path = quantized_models(det_model_path, rec_model_path, model_store)
+        model_paths = {"det_model_path": det_model_path, "rec_model_path": rec_model_path}
+        if kwargs.get("cls_model_path"):
+            model_paths["cls_model_path"] = Path(kwargs.pop("cls_model_path"))
+        if optimized_model_cache:
+            if gpu:
+                raise ValueError("optimized_model_cache only supports CPU inference")
+            if optimized_model_cache is True:
+                optimized_model_cache = (model_store or get_model_store()).cache_dir / "optimized"
+            model_paths.setdefault("cls_model_path", _default_cls_model_path())
+            model_paths = {
+                key: optimized_model(path, optimized_model_cache, graph_optimization)
+                for key, path in model_paths.items()
+            }
+        # RapidOCR ignores thread counts of -1
         self.engine = RapidOCR(
-            det_model_path=try_download_model(det_model),
-            rec_model_path=try_download_model(rec_model),
+            intra_op_num_threads=intra_op_threads or engine_threads() or -1,
+            inter_op_num_threads=inter_op_threads or -1,
+            **model_paths,
             **kwargs,
         )
+        self.pipeline = _exposes_pipeline(self.engine)
+        if not self.pipeline:
+            import rapidocr_onnxruntime
+
+            logger.warning(
+                "rapidocr_onnxruntime %s does not expose the pipeline stages this engine was written "
+                "against; ocr_batch and regions run one RapidOCR call per image, and detect and "
+                "recognize are unavailable",
+                getattr(rapidocr_onnxruntime, "__version__", "(unknown version)"),
+            )
+        if graph_optimization != "all" and not optimized_model_cache:
+            self._set_graph_optimization(graph_optimization)
+        if warmup:
+            self.warmup()
+
+    def _set_graph_optimization(self, graph_optimization: GRAPH_OPTIMIZATION):
+        # RapidOCR always enables all optimizations, so its sessions are
+        # recreated with the same model, threads and execution providers
+        import onnxruntime as ort
+
+        try:
+            wrappers = [self.engine.text_det.infer, self.engine.text_cls.infer, self.engine.text_rec.session]
+            model_paths = [wrapper.session._model_path for wrapper in wrappers]
+        except AttributeError as e:
+            raise RuntimeError(
+                "This rapidocr_onnxruntime version does not expose its sessions; "
+                "use optimized_model_cache to pick the graph optimization level instead"
+            ) from e
+        for wrapper, model_path in zip(wrappers, model_paths):
+            session = wrapper.session
+            options = _session_options(graph_optimization)
+            session_options = session.get_session_options()
+            options.intra_op_num_threads = session_options.intra_op_num_threads
+            options.inter_op_num_threads = session_options.inter_op_num_threads
+            wrapper.session = ort.InferenceSession(
+                model_path,
+                sess_options=options,
+                providers=list(zip(session.get_providers(), session.get_provider_options().values())),
+            )
+
+    def warmup(self, shapes: Iterable[tuple[int, int]] = WARMUP_SHAPES):
+        """
+        Runs the models on synthetic text images of the given (height, width)
+        shapes, so that onnxruntime allocates its buffers and picks its
+        kernels before the first real image.
+        """
+        for height, width in shapes:
+            # The uninstrumented call, so warm-up is not recorded in metrics
+            self.engine(synthetic_text_image(height, width))
+
+    def get_config_key(self) -> dict:
+        # Performance options do not change results
+        return {
+            "det_model": str(self.det_model),
+            "rec_model": str(self.rec_model),
+            # Quantized models give slightly different results
+            **({"precision": self.precision} if self.precision != "fp32" else {}),
+            **self.engine_kwargs,
+        }
+
+    def _ocr_options(self, kwargs: dict) -> dict:
+        """
+        Validates the per-call options: `use_cls` (whether to run the
+        orientation classifier) and `text_score` (the minimum recognition
+        score of returned lines), defaulting to the engine's settings.
+        """
+        unknown = sorted(set(kwargs) - set(OCR_OPTIONS))
+        if unknown:
+            raise TypeError(
+                f"RapidOCREngine does not take {', '.join(unknown)} per call; it takes {', '.join(OCR_OPTIONS)}. "
+                "Pass other RapidOCR settings, such as det_box_thresh, to the constructor"
+            )
+        return {
+            "use_cls": kwargs.get("use_cls", self.engine.use_cls),
+            "text_score": kwargs.get("text_score", self.engine.text_score),
+        }
+
+    def ocr(self, image: ImageLike, **kwargs):
+        """
+        Args:
+            image (ImageLike): The image to perform OCR on.
+            **kwargs: `use_cls` and `text_score`, see `_ocr_options`.
+        """
+        options = self._ocr_options(kwargs)
+        if kwargs and self.pipeline:
+            return self._ocr_chunk([image], **options)[0]
+        with stage("decode"):
+            img = convert_imagelike_to_type(image, type="numpy")
+        _result, elapse = self.engine(img, use_cls=options["use_cls"])
+        # RapidOCR measures its own stages
+        for stage_name, seconds in zip(("detection", "classification", "recognition"), elapse or ()):
+            record_stage(stage_name, seconds)
+        # Without the pipeline stages, a text_score lower than the engine's
+        # cannot bring back the lines RapidOCR already dropped
+        _result = [line for line in _result or [] if float(line[2]) >= options["text_score"]]
+        with stage("postprocess"):
+            return OCRResult.from_columns(
+                texts=[line[1] for line in _result],
+                boxes=[line[0] for line in _result],
+                confidences=[line[2] for line in _result],
+            )
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        """
+        Runs detection image by image, then classifies and recognizes the
+        text crops of up to `batch_size` images together, so recognition
+        batches (`rec_batch_num`) are filled across image boundaries.
+        `kwargs` are the options of `ocr`.
+        """
+        options = self._ocr_options(kwargs)
+        if not self.pipeline:
+            return [self.ocr(image, **kwargs) for image in images]
+        results = []
+        for chunk in batched(images, batch_size):
+            results.extend(self._ocr_chunk(chunk, **options))
+        return results
+
+    def _require_pipeline(self, method: str):
+        if not self.pipeline:
+            raise NotImplementedError(
+                f"{method} needs the pipeline stages of rapidocr_onnxruntime 1.3, which this version does not expose"
+            )
+
+    def detect_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8
+    ) -> list[np.ndarray]:
+        self._require_pipeline("detect")
+        # The detection model runs one image at a time
+        return [self._detect_and_crop(image, crop=False)[0] for image in images]
+
+    def recognize_batch(
+        self,
+        images: Iterable[ImageLike],
+        boxes: Optional[Iterable] = None,
+        batch_size: int = 8,
+        **kwargs,
+    ) -> list[OCRResult]:
+        """
+        Classifies and recognizes the given boxes of up to `batch_size`
+        images together, or the images themselves as line crops when `boxes`
+        is None. `kwargs` are the options of `ocr`; `text_score` does not
+        apply, as every box is returned.
+        """
+        use_cls = self._ocr_options(kwargs)["use_cls"]
+        self._require_pipeline("recognize")
+        images = list(images)
+        boxes_per_image = [None] * len(images) if boxes is None else list(boxes)
+        if len(boxes_per_image) != len(images):
+            raise ValueError("boxes must hold one list of boxes per image")
+        results = []
+        for chunk in batched(list(zip(images, boxes_per_image)), batch_size):
+            chunk_boxes, all_crops = [], []
+            for image, image_boxes in chunk:
+                with stage("decode"):
+                    img = self.engine.load_img(convert_imagelike_to_type(image, type="numpy"))
+                if image_boxes is None:
+                    height, width = img.shape[:2]
+                    chunk_boxes.append(np.array([[[0, 0], [width, 0], [width, height], [0, height]]], dtype=np.float32))
+                    all_crops.append(img)
+                else:
+                    image_boxes = np.asarray(image_boxes, dtype=np.float32).reshape(-1, 4, 2)
+                    chunk_boxes.append(image_boxes)
+                    all_crops.extend(self.engine.get_crop_img_list(img, list(image_boxes)))
+            rec_res = self._recognize_crops(all_crops, use_cls)
+            with stage("postprocess"):
+                start = 0
+                for image_boxes in chunk_boxes:
+                    lines = rec_res[start : start + len(image_boxes)]
+                    start += len(image_boxes)
+                    # One item per box, however unsure the recognizer is
+                    results.append(
+                        OCRResult.from_columns(
+                            texts=[text for text, _ in lines],
+                            boxes=image_boxes,
+                            confidences=[score for _, score in lines],
+                            default_confidence_threshold=0.0,
+                        )
+                    )
+        return results
+
+    def _ocr_region_views(self, views: list[np.ndarray], image_shape: tuple, **kwargs) -> list[OCRResult]:
+        # RapidOCR enlarges small images until their short side reaches
+        # `limit_side_len`, which would blow thin regions up many times over;
+        # they are detected at the scale the whole image would get instead
+        options = self._ocr_options(kwargs)
+        if not self.pipeline:
+            return super()._ocr_region_views(views, image_shape, **kwargs)
+        return self._ocr_chunk(views, det_scale=self._detection_scale(image_shape[:2]), **options)
+
+    def _detection_scale(self, shape: tuple[int, int]) -> float:
+        preprocess = self.engine.text_det.preprocess_op
+        if preprocess.limit_type == "max":
+            return min(preprocess.limit_side_len / max(shape), 1.0)
+        return max(preprocess.limit_side_len / min(shape), 1.0)
+
+    def _detect_at_scale(self, img: np.ndarray, scale: float) -> tuple[Optional[np.ndarray], float]:
+        # TextDetector.__call__, with a given scale instead of one derived
+        # from the image size
+        import cv2
+
+        start = time.perf_counter()
+        detector = self.engine.text_det
+        height, width = img.shape[:2]
+        size = (max(round(width * scale / 32), 1) * 32, max(round(height * scale / 32), 1) * 32)
+        resized = cv2.resize(img, size)
+        tensor = detector.preprocess_op.permute(detector.preprocess_op.normalize(resized))
+        preds = detector.infer(tensor[np.newaxis].astype(np.float32))[0]
+        dt_boxes, _ = detector.postprocess_op(preds, (height, width))
+        dt_boxes = detector.filter_tag_det_res(dt_boxes, (height, width))
+        if len(dt_boxes) < 1:
+            return None, 0.0
+        return self.engine.sorted_boxes(dt_boxes), time.perf_counter() - start
+
+    def _detect_and_crop(
+        self, image: ImageLike, crop: bool = True, det_scale: Optional[float] = None
+    ) -> tuple[np.ndarray, list[np.ndarray]]:
+        with stage("decode"):
+            img = self.engine.load_img(convert_imagelike_to_type(image, type="numpy"))
+        img, padding_h = self.engine.maybe_add_letterbox(img)
+        if det_scale is None:
+            dt_boxes, det_elapse = self.engine.auto_text_det(img)
+        else:
+            dt_boxes, det_elapse = self._detect_at_scale(img, det_scale)
+        record_stage("detection", det_elapse)
+        if dt_boxes is None:
+            return np.zeros((0, 4, 2), dtype=np.int32), []
+        crops = self.engine.get_crop_img_list(img, dt_boxes) if crop else []
+        for box in dt_boxes:
+            box[:, 1] -= padding_h
+        return np.rint(np.asarray(dt_boxes)).astype(np.int32).reshape(-1, 4, 2), crops
+
+    def _recognize_crops(self, crops: list[np.ndarray], use_cls: bool) -> list[tuple[str, float]]:
+        if not crops:
+            return []
+        if use_cls:
+            crops, _, cls_elapse = self.engine.text_cls(crops)
+            record_stage("classification", cls_elapse)
+        rec_res, rec_elapse = self.engine.text_rec(crops)
+        record_stage("recognition", rec_elapse)
+        return rec_res
+
+    def _ocr_chunk(
+        self, images: list[ImageLike], *, use_cls: bool, text_score: float, det_scale: Optional[float] = None
+    ) -> list[OCRResult]:
+        boxes_per_image, all_crops = [], []
+        for image in images:
+            dt_boxes, crops = self._detect_and_crop(image, det_scale=det_scale)
+            boxes_per_image.append(dt_boxes)
+            all_crops.extend(crops)
+
+        rec_res = self._recognize_crops(all_crops, use_cls)
 
-    def ocr(self, image: ImageLike):
-        img = convert_imagelike_to_type(image, type="numpy")
-        _result, elapse = self.engine(img)
-        result = []
-        for line in _result:
-            result.append(OCRItem(text=line[1], confidence=line[2], box=line[0]))
-        return OCRResult(ocr_items=result)
+        with stage("postprocess"):
+            results, start = [], 0
+            for dt_boxes in boxes_per_image:
+                lines = [
+                    (box, text, score)
+                    for box, (text, score) in zip(dt_boxes, rec_res[start : start + len(dt_boxes)])
+                    if float(score) >= text_score
+                ]
+                start += len(dt_boxes)
+                results.append(
+                    OCRResult.from_columns(
+                        texts=[text for _, text, _ in lines],
+                        boxes=[box for box, _, _ in lines],
+                        confidences=[score for _, _, score in lines],
+                    )
+                )
+        return results
 
 from my_little_ocr.base_engine.engine_config import EngineConfig, register_engine
 
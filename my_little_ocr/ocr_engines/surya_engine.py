@@ -1,21 +1,18 @@
-from PIL import Image
-from surya.ocr import run_ocr, TextLine, OCRResult as SuryaOCRResult
-from surya.model.detection.model import (
-    load_model as load_det_model,
-    load_processor as load_det_processor,
-)
-from surya.model.recognition.model import load_model as load_rec_model
-from surya.model.recognition.processor import load_processor as load_rec_processor
-
 from iso639 import Lang
 from my_little_ocr.base_engine.base_ocr_engine import (
     BaseOCREngine,
-    OCRItem,
     ImageLike,
     OCRResult,
+    batched,
     convert_imagelike_to_type,
 )
-from typing import Literal, Optional, List
+from my_little_ocr.base_engine.metrics import stage
+from typing import TYPE_CHECKING, Iterable, Literal, Optional, List
+import numpy as np
+
+# surya pulls in torch, so it is only imported once an engine is created
+if TYPE_CHECKING:
+    from surya.ocr import OCRResult as SuryaOCRResult
 
 # fmt: off
 SURYA_LANGS = [
@@ -45,35 +42,129 @@ class SuryaEngine(BaseOCREngine):
     ocr_engine_name = "surya"
 
     def __init__(self, default_langs: list[str] = ["en", "zh", "_math"], **kwargs):
+        from surya.model.detection.model import (
+            load_model as load_det_model,
+            load_processor as load_det_processor,
+        )
+        from surya.model.recognition.model import load_model as load_rec_model
+        from surya.model.recognition.processor import load_processor as load_rec_processor
+
         self.default_langs = convert_langs_to_surya_langs(default_langs)
         self.det_processor, self.det_model = load_det_processor(), load_det_model()
         self.rec_model, self.rec_processor = load_rec_model(), load_rec_processor()
 
-    def ocr(self, img: ImageLike, langs: Optional[list[str]] = None) -> list[OCRItem]:
-        img = convert_imagelike_to_type(img, type="pil")
-        if langs is None:
-            langs = self.default_langs
-        else:
-            langs = convert_langs_to_surya_langs(langs)
-        predictions: SuryaOCRResult = run_ocr(
-            [img],
-            [langs],
-            self.det_model,
-            self.det_processor,
-            self.rec_model,
-            self.rec_processor,
-        )
-        result = []
-        assert len(predictions) > 0, "No predictions found"
-        text_lines: List[TextLine] = predictions[0].text_lines
-        for line in text_lines:
-            result.append(
-                OCRItem(
-                    text=line.text, box=line.polygon, confidence=line.confidence
+    def get_config_key(self) -> dict:
+        return {"langs": sorted(self.default_langs)}
+
+    def ocr(self, img: ImageLike, langs: Optional[list[str]] = None) -> OCRResult:
+        return self.ocr_batch([img], langs=langs)[0]
+
+    def _langs(self, langs: Optional[list[str]]) -> list[str]:
+        return self.default_langs if langs is None else convert_langs_to_surya_langs(langs)
+
+    def ocr_batch(
+        self,
+        images: Iterable[ImageLike],
+        batch_size: int = 8,
+        langs: Optional[list[str]] = None,
+    ) -> list[OCRResult]:
+        from surya.ocr import run_ocr
+
+        langs = self._langs(langs)
+        results = []
+        for chunk in batched(images, batch_size):
+            with stage("decode"):
+                pil_images = [convert_imagelike_to_type(img, type="pil") for img in chunk]
+            # run_ocr runs detection and recognition in one call
+            with stage("inference"):
+                predictions: List["SuryaOCRResult"] = run_ocr(
+                    pil_images,
+                    [langs] * len(pil_images),
+                    self.det_model,
+                    self.det_processor,
+                    self.rec_model,
+                    self.rec_processor,
+                )
+            assert len(predictions) == len(pil_images), "Missing predictions"
+            with stage("postprocess"):
+                results.extend(self._to_ocr_result(prediction) for prediction in predictions)
+        return results
+
+    def detect_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8
+    ) -> list[np.ndarray]:
+        from surya.detection import batch_text_detection
+
+        results = []
+        for chunk in batched(images, batch_size):
+            with stage("decode"):
+                pil_images = [convert_imagelike_to_type(img, type="pil") for img in chunk]
+            with stage("detection"):
+                predictions = batch_text_detection(pil_images, self.det_model, self.det_processor)
+            with stage("postprocess"):
+                for prediction in predictions:
+                    polygons = [box.polygon for box in prediction.bboxes]
+                    results.append(np.rint(np.asarray(polygons, dtype=np.float64)).astype(np.int32).reshape(-1, 4, 2))
+        return results
+
+    def recognize_batch(
+        self,
+        images: Iterable[ImageLike],
+        boxes: Optional[Iterable] = None,
+        batch_size: int = 8,
+        langs: Optional[list[str]] = None,
+    ) -> list[OCRResult]:
+        """
+        Recognizes the given boxes, or the images themselves as line crops
+        when `boxes` is None. The lines of up to `batch_size` images share
+        the recognition model's batches.
+        """
+        from surya.ocr import run_recognition
+
+        langs = self._langs(langs)
+        images = list(images)
+        boxes = [None] * len(images) if boxes is None else list(boxes)
+        if len(boxes) != len(images):
+            raise ValueError("boxes must hold one list of boxes per image")
+        results = []
+        for chunk in batched(list(zip(images, boxes)), batch_size):
+            with stage("decode"):
+                pil_images = [convert_imagelike_to_type(img, type="pil") for img, _ in chunk]
+            polygons = [
+                [[[0, 0], [img.width, 0], [img.width, img.height], [0, img.height]]]
+                if image_boxes is None
+                else np.asarray(image_boxes).reshape(-1, 4, 2).tolist()
+                for img, (_, image_boxes) in zip(pil_images, chunk)
+            ]
+            with stage("recognition"):
+                predictions: List["SuryaOCRResult"] = run_recognition(
+                    pil_images,
+                    [langs] * len(pil_images),
+                    self.rec_model,
+                    self.rec_processor,
+                    polygons=polygons,
                 )
-            )
-        return OCRResult(ocr_items=result)
+            with stage("postprocess"):
+                for prediction, image_polygons in zip(predictions, polygons):
+                    # One item per box, however unsure the recognizer is
+                    results.append(
+                        OCRResult.from_columns(
+                            texts=[line.text for line in prediction.text_lines],
+                            boxes=image_polygons,
+                            confidences=[line.confidence for line in prediction.text_lines],
+                            default_confidence_threshold=0.0,
+                        )
+                    )
+        return results
 
+    @staticmethod
+    def _to_ocr_result(prediction: "SuryaOCRResult") -> OCRResult:
+        text_lines = prediction.text_lines
+        return OCRResult.from_columns(
+            texts=[line.text for line in text_lines],
+            boxes=[line.polygon for line in text_lines],
+            confidences=[line.confidence for line in text_lines],
+        )
 
 from my_little_ocr.base_engine.engine_config import EngineConfig, register_engine
 
@@ -1,7 +1,9 @@
+import functools
 import os
 import platform
 import subprocess
 from pathlib import Path
+from typing import Optional
 import urllib.request
 
 def get_tesseract_command():
@@ -13,14 +15,24 @@ def get_tesseract_command():
         return "tesseract"
 
 
-def check_tesseract_installed(tesseract_command: str) -> bool:
+@functools.lru_cache(maxsize=None)
+def get_tesseract_version(tesseract_command: str) -> Optional[str]:
+    """
+    Returns the first line of `tesseract --version`, or None if tesseract
+    cannot be run. The result is cached, so the check spawns one process per
+    command and interpreter rather than one per engine.
+    """
     try:
         result = subprocess.run([str(tesseract_command), "--version"], check=True, capture_output=True, text=True)
-        print("Tesseract installed successfully:\n", result.stdout)
-    except subprocess.CalledProcessError:
-        print("Tesseract installation failed.")
-        return False
-    except Exception as e:
-        print(f"Error checking Tesseract installation: {e}")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    # Old versions print the version to stderr
+    output = (result.stdout or result.stderr).strip()
+    return output.splitlines()[0] if output else ""
+
+
+def check_tesseract_installed(tesseract_command: str) -> bool:
+    if get_tesseract_version(str(tesseract_command)) is None:
+        print(f"Error checking Tesseract installation: could not run {tesseract_command}")
         return False
     return True
@@ -1,7 +1,17 @@
-from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult, OCRItem, ImageLike, convert_imagelike_to_type
-from PIL import Image
-import pytesseract
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult, ImageLike, batched
+from my_little_ocr.base_engine.img_utils import encode_image, get_temp_dir, imagelike_as_filepath
+from my_little_ocr.base_engine.metrics import stage
+from my_little_ocr.base_engine.threads import engine_threads
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from os import PathLike
+from typing import Iterable, Optional
+import contextvars
 import numpy as np
+import os
+import shlex
+import subprocess
+import tempfile
 from iso639 import Lang
 from .install import get_tesseract_command, check_tesseract_installed
 
@@ -30,41 +40,181 @@ def convert_langs_to_tesseract_langs(langs: list[str]) -> list[str]:
     return result
 
 
+def split_tesseract_tsv(tsv: str, num_pages: int) -> list[str]:
+    """
+    Splits the TSV output of a multi-image run into one TSV per image, using
+    the page number column.
+    """
+    lines = tsv.splitlines()
+    if not lines:
+        return [""] * num_pages
+    pages = [[lines[0]] for _ in range(num_pages)]
+    for line in lines[1:]:
+        fields = line.split("\t", 2)
+        if len(fields) < 2 or not fields[1].isdigit():
+            continue
+        page = int(fields[1]) - 1
+        if 0 <= page < num_pages:
+            pages[page].append(line)
+    return ["\n".join(page) for page in pages]
+
+
+def parse_tesseract_tsv(tsv: str) -> OCRResult:
+    """
+    Converts the TSV output of tesseract into an OCR result, one item per word.
+    """
+    texts, rects, confs = [], [], []
+    for line in tsv.splitlines()[1:]:
+        fields = line.split("\t")
+        if len(fields) < 11:
+            continue
+        conf = float(fields[10])
+        if conf < 0:
+            continue
+        rects.append(fields[6:10])
+        confs.append(conf)
+        texts.append(fields[11] if len(fields) > 11 else "")
+    left, top, width, height = np.array(rects, dtype=np.int32).reshape(-1, 4).T
+    right, bottom = left + width, top + height
+    boxes = np.stack(
+        [np.stack([left, top], 1), np.stack([right, top], 1),
+         np.stack([right, bottom], 1), np.stack([left, bottom], 1)],
+        axis=1,
+    )
+    return OCRResult.from_columns(
+        texts=texts, boxes=boxes, confidences=np.array(confs, dtype=np.float32) / 100
+    )
+
+
 class TesseractEngine(BaseOCREngine):
-    def __init__(self, tesseract_command: str = None, default_langs: list[str] = ["eng", "chi_sim"]):
+    """
+    Runs the tesseract command line program.
+
+    `ocr` starts one tesseract process per image. `ocr_batch` passes up to
+    `batch_size` images to a single process through a list file, so that
+    process start and model loading are paid once per batch, and runs up to
+    `jobs` processes at once. Each process may use `omp_threads` OpenMP
+    threads, so with the defaults (one process per CPU, or per thread of the
+    engine's share of the thread budget, one thread each) parallel calls do
+    not oversubscribe the cores.
+    """
+
+    ocr_engine_name = "tesseract"
+    # Every call runs its own tesseract process
+    max_concurrency = os.cpu_count() or 1
+    # Tesseract binarizes its input, but needs full resolution for small text
+    accepts_grayscale = True
+
+    def __init__(
+        self,
+        tesseract_command: str = None,
+        default_langs: list[str] = ["eng", "chi_sim"],
+        jobs: Optional[int] = None,
+        omp_threads: int = 1,
+    ):
         self.tesseract_command = tesseract_command or get_tesseract_command()
         check_tesseract_installed(self.tesseract_command)
-        pytesseract.pytesseract.tesseract_cmd = self.tesseract_command
         self.default_langs = default_langs
-        
-    def ocr(self, img: ImageLike, langs: list[str] = None, commands: list[str] = None) -> OCRResult:
-        pil_img = convert_imagelike_to_type(img, type="filepath")
-        langs = langs or self.default_langs
-        commands = commands or []
-        langs = convert_langs_to_tesseract_langs(langs)
-        commands.append(f"-l {'+'.join(langs)}")
-        text = pytesseract.image_to_data(pil_img, output_type=pytesseract.Output.DICT, config=" ".join(commands))
-        left_list, top_list, height_list, width_list, conf_list,text_list = text['left'], text['top'], text['height'], text['width'], text['conf'],text['text']
-        result = []
-        for left, top, height, width, conf,text in zip(left_list, top_list, height_list, width_list, conf_list,text_list):
-            if conf <0:
-                continue
-            confidence = conf / 100
-            ocr_item = OCRItem(
-                text=text,
-                confidence=confidence,
-                box=[[left, top], [left + width, top], [left + width, top + height], [left, top + height]]
+        self.jobs = self.max_concurrency = jobs or engine_threads() or os.cpu_count() or 1
+        self.omp_threads = omp_threads
+        self.env = {**os.environ, "OMP_THREAD_LIMIT": str(omp_threads)}
+
+    def get_config_key(self) -> dict:
+        return {"langs": sorted(convert_langs_to_tesseract_langs(self.default_langs))}
+
+    def _build_command(self, input_name: str, langs: list[str], commands: list[str]) -> list[str]:
+        langs = convert_langs_to_tesseract_langs(langs or self.default_langs)
+        return [
+            str(self.tesseract_command),
+            input_name,
+            "stdout",
+            "-l",
+            "+".join(langs),
+            *shlex.split(" ".join(commands or [])),
+            "tsv",
+        ]
+
+    def _run_tesseract(self, args: list[str], input: bytes = None) -> str:
+        # Starting the process is timed on its own, as it can dominate for
+        # small images
+        with stage("spawn"):
+            process = subprocess.Popen(
+                args,
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=self.env,
+            )
+        with stage("inference"):
+            stdout, stderr = process.communicate(input)
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"tesseract exited with code {process.returncode}: "
+                f"{stderr.decode(errors='replace').strip()}"
             )
-            result.append(ocr_item)
-        return OCRResult(ocr_items=result)
+        return stdout.decode("utf-8", errors="replace")
+
+    def ocr(self, img: ImageLike, langs: list[str] = None, commands: list[str] = None) -> OCRResult:
+        return self._ocr_one(img, langs, commands)
+
+    def _ocr_one(self, img: ImageLike, langs: list[str], commands: list[str]) -> OCRResult:
+        # Files are read by tesseract itself; everything else is piped through
+        # stdin, passing already-encoded bytes along untouched
+        if isinstance(img, (str, PathLike)):
+            args, data = self._build_command(str(img), langs, commands), None
+        else:
+            with stage("decode"):
+                args, data = self._build_command("stdin", langs, commands), encode_image(img)[0]
+        tsv = self._run_tesseract(args, input=data)
+        with stage("postprocess"):
+            return parse_tesseract_tsv(tsv)
+
+    def ocr_batch(
+        self,
+        images: Iterable[ImageLike],
+        batch_size: int = 8,
+        langs: list[str] = None,
+        commands: list[str] = None,
+    ) -> list[OCRResult]:
+        """
+        Recognizes up to `batch_size` images per tesseract process, running
+        up to `jobs` processes in parallel. Multi-page images are not
+        supported here, as every page would be counted as a separate image.
+        """
+        chunks = list(batched(images, batch_size))
+        if len(chunks) <= 1 or self.jobs == 1:
+            chunk_results = [self._ocr_list(chunk, langs, commands) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.jobs, len(chunks))) as executor:
+                # Each task runs in a copy of the context, so its stages are
+                # still timed as part of this call
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self._ocr_list, chunk, langs, commands)
+                    for chunk in chunks
+                ]
+                chunk_results = [future.result() for future in futures]
+        return [result for results in chunk_results for result in results]
 
+    def _ocr_list(self, images: list[ImageLike], langs: list[str], commands: list[str]) -> list[OCRResult]:
+        if len(images) == 1:
+            return [self._ocr_one(images[0], langs, commands)]
+        with ExitStack() as stack:
+            with stage("decode"):
+                paths = [stack.enter_context(imagelike_as_filepath(img)) for img in images]
+                fd, list_path = tempfile.mkstemp(suffix=".txt", dir=get_temp_dir())
+                stack.callback(os.remove, list_path)
+                with os.fdopen(fd, "w", encoding="utf-8") as list_file:
+                    list_file.write("\n".join(os.path.abspath(path) for path in paths) + "\n")
+            tsv = self._run_tesseract(self._build_command(list_path, langs, commands))
+        with stage("postprocess"):
+            return [parse_tesseract_tsv(page) for page in split_tesseract_tsv(tsv, len(images))]
 
 from my_little_ocr.base_engine.engine_config import EngineConfig, register_engine
 
 engine_config = EngineConfig(
     engine_name="tesseract",
     engine_class=TesseractEngine,
-    project_url="https://github.com/madmaze/pytesseract"
+    project_url="https://github.com/tesseract-ocr/tesseract"
 )
 
 register_engine(engine_config)  
@@ -1,19 +1,26 @@
-from .wechat_ocr_modified_lib import OcrManager
 from pydantic import BaseModel, Field, field_validator
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 from my_little_ocr.base_engine.base_ocr_engine import (
     BaseOCREngine,
-    OCRItem,
-    convert_imagelike_to_type,
     ImageLike,
     OCRResult,
+    record_ocr_call,
 )
+from my_little_ocr.base_engine.img_utils import conversion_cache, imagelike_as_filepath
+from my_little_ocr.base_engine.metrics import stage
 from threading import Lock
 from concurrent.futures import Future
+from contextlib import ExitStack
 from pathlib import Path
+import asyncio
+import contextvars
+import itertools
+import logging
 
-from .install import install
-install()
+if TYPE_CHECKING:
+    from .wechat_ocr_modified_lib import OcrManager
+
+logger = logging.getLogger(__name__)
 
 class WechatOCRSettings(BaseModel):
     dir: str = Field(..., description="The directory of the WeChat OCR binary")
@@ -26,6 +33,9 @@ class WechatOCRSettings(BaseModel):
 
 class WechatOCREngine(BaseOCREngine):
     ocr_engine_name = "WeChat OCR"
+    # Matches the number of task ids the WeChat OCR service hands out
+    max_concurrency = 32
+    timeout: float = 10
 
     def __init__(
         self,
@@ -36,15 +46,16 @@ class WechatOCREngine(BaseOCREngine):
     ):
         self.ocr_settings = WechatOCRSettings(dir=dir, exe_path=exe_path, **kwargs)
 
-        self.ocr_manager: OcrManager = None
-        self._future_results: dict[str, Future] = {}
+        self.ocr_manager: "OcrManager" = None
+        self._future_results: dict[str, dict[int, Future]] = {}
+        self._tokens = itertools.count()
         self._lock = Lock()
 
         self.init_wechat_ocr()
 
     def _wrapper_callback(self, img_path: str, wechat_ocr_results: dict):
         ocr_result = wechat_ocr_results["ocrResult"]
-        ocr_item_list = []
+        texts, boxes, confidences = [], [], []
         for item_dict in ocr_result:
             location = item_dict["location"]  # dict
             left, top, right, bottom = (
@@ -53,18 +64,28 @@ class WechatOCREngine(BaseOCREngine):
                 location["right"],
                 location["bottom"],
             )
-            position = [[left, top], [right, top], [right, bottom], [left, bottom]]
-            score = item_dict.get("score")
-            ocr_item = OCRItem(
-                text=item_dict["text"], box=position, confidence=score
-            )
-            ocr_item_list.append(ocr_item)
+            texts.append(item_dict["text"])
+            boxes.append([[left, top], [right, top], [right, bottom], [left, bottom]])
+            confidences.append(item_dict.get("score"))
+        result = OCRResult.from_columns(texts=texts, boxes=boxes, confidences=confidences)
 
-        future = self._future_results.get(str(img_path))
-        if future:
-            future.set_result(ocr_item_list)
+        future = None
+        with self._lock:
+            # The oldest call still waiting; cancelled ones are skipped
+            for candidate in self._future_results.get(str(img_path), {}).values():
+                if not (candidate.running() or candidate.done()) and candidate.set_running_or_notify_cancel():
+                    future = candidate
+                    break
+        if future is not None:
+            future.set_result(result)
 
     def init_wechat_ocr(self):
+        # Fetching the binary and loading the WeChat libraries is deferred
+        # until an engine is actually created
+        from .install import install
+        from .wechat_ocr_modified_lib import OcrManager
+
+        install()
         self.ocr_manager: OcrManager = OcrManager(self.ocr_settings.dir)
         self.ocr_manager.SetExePath(self.ocr_settings.exe_path)
         self.ocr_manager.SetUsrLibDir(self.ocr_settings.dir)
@@ -74,20 +95,74 @@ class WechatOCREngine(BaseOCREngine):
     def ocr_image_using_callback(self, img_path: str):
         self.ocr_manager.DoOCRTask(img_path)
 
-    def ocr(self, img: ImageLike) -> OCRResult:
-        img_path = convert_imagelike_to_type(img, "filepath")
+    def _submit_ocr_task(self, img_path: str) -> tuple[str, int, Future]:
+        # Results only carry the image path, so calls OCRing the same file at
+        # once each get a token and are answered in submission order
         img_path = str(Path(img_path).resolve())
         future = Future()
         with self._lock:
-            self._future_results[img_path] = future
-
-        print(f"OCR method img_path: {img_path}")  # Debug statement
+            token = next(self._tokens)
+            self._future_results.setdefault(img_path, {})[token] = future
 
-        self.ocr_image_using_callback(img_path)
+        logger.debug("Submitting WeChat OCR task for %s", img_path)
 
-        result = future.result(timeout=10)
+        try:
+            self.ocr_image_using_callback(img_path)
+        except BaseException:
+            self._release_ocr_task(img_path, token)
+            raise
+        return img_path, token, future
 
+    def _release_ocr_task(self, img_path: str, token: int):
         with self._lock:
-            del self._future_results[img_path]
+            futures = self._future_results.get(img_path)
+            if futures is not None:
+                futures.pop(token, None)
+                if not futures:
+                    del self._future_results[img_path]
 
-        return OCRResult(ocr_items=result)
\ No newline at end of file
+    def ocr(self, img: ImageLike) -> OCRResult:
+        # WeChat OCR only reads files; images are written as fast-compressed
+        # PNG, a format it is known to accept
+        with ExitStack() as stack:
+            with stage("decode"):
+                img_path = stack.enter_context(imagelike_as_filepath(img, ".png"))
+            img_path, token, future = self._submit_ocr_task(img_path)
+            try:
+                with stage("inference"):
+                    result = future.result(timeout=self.timeout)
+            finally:
+                self._release_ocr_task(img_path, token)
+
+        return result
+
+    def _write_and_submit(self, img: ImageLike) -> tuple[ExitStack, str, int, Future]:
+        stack = ExitStack()
+        try:
+            with stage("decode"):
+                img_path = stack.enter_context(imagelike_as_filepath(img, ".png"))
+            return (stack, *self._submit_ocr_task(img_path))
+        except BaseException:
+            stack.close()
+            raise
+
+    async def _aocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        if kwargs:
+            # e.g. regions, which OCR several crops through `ocr`
+            return await super()._aocr(img, **kwargs)
+        # Only writing the image and submitting it run on the executor; the
+        # result is awaited through the callback future instead of blocking
+        # a worker thread. The call is recorded like `ocr`, and the executor
+        # runs in a copy of this context so its stages are timed too.
+        with conversion_cache(), record_ocr_call(self, "ocr") as call:
+            stack, img_path, token, future = await self._run_in_executor(
+                contextvars.copy_context().run, self._write_and_submit, img
+            )
+            with stack:
+                try:
+                    with stage("inference"):
+                        call.result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+                finally:
+                    self._release_ocr_task(img_path, token)
+
+        return call.result
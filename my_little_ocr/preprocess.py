@@ -0,0 +1,172 @@
+import time
+from io import BytesIO
+from os import PathLike
+from typing import Iterable, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike, convert_imagelike_to_type, is_buffer, read_image_file
+
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _encoded_size(img: Union[str, bytes, memoryview, PathLike]) -> Optional[tuple[int, int]]:
+    # Only the header is read; the size is reported as displayed, i.e. after
+    # the EXIF rotation OpenCV applies when decoding
+    try:
+        with Image.open(BytesIO(img) if is_buffer(img) else img) as pil_img:
+            width, height = pil_img.size
+            if pil_img.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            return width, height
+    except Exception:
+        return None
+
+
+def _reduced_flag(grayscale: bool, factor: int) -> int:
+    import cv2
+
+    if factor == 1:
+        return cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    prefix = "IMREAD_REDUCED_GRAYSCALE_" if grayscale else "IMREAD_REDUCED_COLOR_"
+    return getattr(cv2, f"{prefix}{factor}")
+
+
+def load_image(
+    img: ImageLike, max_side: Optional[int] = None, grayscale: bool = False
+) -> tuple[np.ndarray, tuple[float, float]]:
+    """
+    Decodes an image into an OpenCV array no larger than `max_side` pixels
+    per side, and optionally in grayscale.
+
+    Files and encoded bytes are decoded at reduced resolution when possible
+    (1/2, 1/4 or 1/8, which JPEG decoding does at a fraction of the cost of a
+    full decode), then resized to the target with area interpolation.
+
+    Args:
+        img (ImageLike): The image.
+        max_side (int): The maximum width and height. If None, the image keeps
+            its size.
+        grayscale (bool): Decode as a single-channel image.
+
+    Returns:
+        tuple[np.ndarray, tuple[float, float]]: The image and the horizontal
+        and vertical factors mapping its coordinates back to the original.
+    """
+    import cv2
+
+    if isinstance(img, (str, PathLike)) or is_buffer(img):
+        factor = 1
+        size = _encoded_size(img) if max_side else None
+        if size is not None:
+            # The largest reduction that still leaves the image at least as
+            # large as the target
+            while factor < 8 and max(size) / (factor * 2) >= max_side:
+                factor *= 2
+        flag = _reduced_flag(grayscale, factor)
+        if is_buffer(img):
+            array = cv2.imdecode(np.frombuffer(img, np.uint8), flag)
+        else:
+            array = read_image_file(img, flag)
+        if array is None:
+            raise ValueError(f"Could not decode image: {'<bytes>' if is_buffer(img) else img}")
+        original_width = size[0] if size is not None else array.shape[1] * factor
+        original_height = size[1] if size is not None else array.shape[0] * factor
+    else:
+        array = convert_imagelike_to_type(img, "numpy")
+        original_height, original_width = array.shape[:2]
+        if grayscale and array.ndim == 3:
+            array = cv2.cvtColor(array, cv2.COLOR_BGRA2GRAY if array.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+
+    height, width = array.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        width, height = max(round(width * scale), 1), max(round(height * scale), 1)
+        array = cv2.resize(array, (width, height), interpolation=cv2.INTER_AREA)
+    return array, (original_width / width, original_height / height)
+
+
+def rescale_result(result: OCRResult, factors: tuple[float, float]) -> OCRResult:
+    """
+    Maps the boxes of a result obtained on a resized image back to the
+    original image's coordinates.
+    """
+    if factors == (1.0, 1.0) or not len(result):
+        return result
+    boxes = np.rint(result.boxes * np.array(factors)).astype(np.int32)
+    return OCRResult._construct(
+        texts=result.texts,
+        boxes=boxes,
+        confidences=result.confidences,
+        default_confidence_threshold=result.default_confidence_threshold,
+        timings=result.timings,
+        **result._item_columns(),
+    )
+
+
+class PreprocessingEngine(BaseOCREngine):
+    """
+    Wraps an engine so that images are normalized before recognition: large
+    images are downscaled, already while decoding when possible, to the size
+    the engine would resize them to anyway, and converted to grayscale if the
+    engine accepts it. Boxes are mapped back to the original coordinates.
+
+    Args:
+        engine (BaseOCREngine): The engine to wrap.
+        max_side (int): The maximum side of the images passed to the engine.
+            Defaults to the engine's `preferred_max_side`; 0 disables
+            downscaling.
+        grayscale (bool): Pass grayscale images. Defaults to the engine's
+            `accepts_grayscale`.
+    """
+
+    record_metrics = False
+
+    def __init__(
+        self,
+        engine: BaseOCREngine,
+        max_side: Optional[int] = None,
+        grayscale: Optional[bool] = None,
+    ):
+        self.engine = engine
+        self.max_side = engine.preferred_max_side if max_side is None else (max_side or None)
+        self.grayscale = engine.accepts_grayscale if grayscale is None else grayscale
+        if self.grayscale and not engine.accepts_grayscale:
+            raise ValueError(f"{engine.ocr_engine_name} does not accept grayscale images")
+        self.ocr_engine_name = engine.ocr_engine_name
+        self.max_concurrency = engine.max_concurrency
+
+    def get_config_key(self) -> dict:
+        return {**self.engine.get_config_key(), "max_side": self.max_side, "grayscale": self.grayscale}
+
+    def _load(self, img: ImageLike) -> tuple[np.ndarray, tuple[float, float], float]:
+        start = time.perf_counter()
+        array, factors = load_image(img, self.max_side, self.grayscale)
+        return array, factors, time.perf_counter() - start
+
+    @staticmethod
+    def _finish(result: OCRResult, factors: tuple[float, float], seconds: float) -> OCRResult:
+        result = rescale_result(result, factors)
+        if result.timings is not None:
+            # The engine's timings do not include the decoding done here
+            timings = {"preprocess": seconds, **result.timings}
+            timings["total"] = timings.get("total", 0.0) + seconds
+            result.timings = timings
+        return result
+
+    def ocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        array, factors, seconds = self._load(img)
+        return self._finish(self.engine.ocr(array, **kwargs), factors, seconds)
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        loaded = [self._load(img) for img in images]
+        results = self.engine.ocr_batch([array for array, _, _ in loaded], batch_size, **kwargs)
+        return [
+            self._finish(result, factors, seconds)
+            for result, (_, factors, seconds) in zip(results, loaded)
+        ]
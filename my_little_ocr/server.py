@@ -0,0 +1,523 @@
+import argparse
+import asyncio
+import json
+import sys
+from contextlib import suppress
+from typing import Optional, Union
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.metrics import get_metrics_registry
+from my_little_ocr.base_engine.threads import ThreadBudget, get_thread_budget, set_thread_budget
+
+STATUS_REASONS = {
+    100: "Continue",
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+class HTTPError(Exception):
+    """
+    Raised by request handlers to answer with an error status. `close` is
+    set when the request body was not read, which leaves the connection
+    unusable for further requests.
+    """
+
+    def __init__(
+        self,
+        status: int,
+        message: str,
+        headers: Optional[dict[str, str]] = None,
+        close: bool = False,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+        self.close = close
+
+
+class Request:
+    """
+    The head of an HTTP request, and its body once read.
+    """
+
+    def __init__(self, method: str, target: str, version: str, headers: dict[str, str]):
+        self.method = method
+        url = urlsplit(target)
+        self.path = url.path.rstrip("/") or "/"
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body: bytes = b""
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    @property
+    def wants_ndjson(self) -> bool:
+        return self.query.get("stream") in ("1", "true") or NDJSON_CONTENT_TYPE in self.headers.get("accept", "")
+
+
+def decode_image(data) -> np.ndarray:
+    """
+    Decodes an encoded image held in memory (bytes or a memoryview over the
+    request body) into an OpenCV array, without copies or temporary files.
+    """
+    import cv2
+
+    array = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if array is None:
+        raise HTTPError(400, "Could not decode image")
+    return array
+
+
+def split_multipart(body: bytes, content_type: str) -> list[memoryview]:
+    """
+    Returns the payloads of a multipart/form-data body as views into it, in
+    order.
+    """
+    boundary = None
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary":
+            boundary = value.strip('"')
+    if not boundary:
+        raise HTTPError(400, "Missing multipart boundary")
+
+    view = memoryview(body)
+    delimiter = b"--" + boundary.encode("latin-1")
+    parts = []
+    position = body.find(delimiter)
+    while position != -1:
+        start = position + len(delimiter)
+        if body.startswith(b"--", start):
+            break
+        headers_end = body.find(b"\r\n\r\n", start)
+        end = body.find(b"\r\n" + delimiter, headers_end)
+        if headers_end == -1 or end == -1:
+            raise HTTPError(400, "Malformed multipart body")
+        parts.append(view[headers_end + 4 : end])
+        position = end + 2
+    return parts
+
+
+class _EngineSlot:
+    """
+    Admission control for one engine: at most `max_concurrency` images are
+    recognized and `max_queue` wait at once; beyond that, requests are
+    rejected immediately instead of queueing without bound.
+    """
+
+    def __init__(self, name: str, engine: BaseOCREngine, max_queue: int):
+        self.name = name
+        self.engine = engine
+        self.max_queue = max_queue
+        self.pending = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.engine.max_concurrency + self.max_queue
+
+    def check(self, count: int = 1):
+        if count > self.capacity:
+            raise HTTPError(413, f"At most {self.capacity} images can be sent at once to {self.name}")
+        if self.pending + count > self.capacity:
+            get_metrics_registry().inc("rejected_total", count, engine=self.name)
+            raise HTTPError(503, f"{self.name} is at capacity", {"Retry-After": "1"})
+
+    def admit(self, count: int = 1):
+        self.check(count)
+        self.pending += count
+
+    def release(self, count: int = 1):
+        self.pending -= count
+
+
+class OCRServer:
+    """
+    Asynchronous HTTP server exposing already loaded engines.
+
+    Endpoints:
+        POST /ocr: The body is one encoded image, raw or as the first part of
+            a multipart/form-data body. Answers with the `OCRResult` as JSON.
+        POST /ocr/batch: The body is multipart/form-data with one image per
+            part. Answers with `{"results": [...]}`, or, with `?stream=1` or
+            `Accept: application/x-ndjson`, streams one line per image as
+            soon as it is done. Each entry is `{"index": ..., "result": ...}`
+            or `{"index": ..., "error": ...}`.
+        GET /health: The engines and how busy they are.
+        GET /metrics: The metrics registry in the Prometheus text format.
+
+    The engine is chosen with `?engine=name` and defaults to the first one.
+    Images are decoded in memory in a worker thread and recognized through
+    `aocr`, so each engine runs at most `max_concurrency` calls at once.
+
+    Args:
+        engines: An engine, or engines by name.
+        max_queue (int): The number of images that may wait for each engine
+            beyond those running. Requests that would exceed it get a 503.
+        max_body_size (int): The largest accepted request body, in bytes.
+        header_timeout (float): Seconds allowed to send the request head;
+            idle keep-alive connections are closed after this long too.
+    """
+
+    def __init__(
+        self,
+        engines: Union[BaseOCREngine, dict[str, BaseOCREngine]],
+        max_queue: int = 16,
+        max_body_size: int = 64 << 20,
+        header_timeout: float = 30.0,
+    ):
+        if isinstance(engines, BaseOCREngine):
+            engines = {engines.ocr_engine_name: engines}
+        if not engines:
+            raise ValueError("At least one engine is required")
+        self.slots = {name: _EngineSlot(name, engine, max_queue) for name, engine in engines.items()}
+        self.default_engine = next(iter(self.slots))
+        self.max_body_size = max_body_size
+        self.header_timeout = header_timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> int:
+        """
+        Starts listening and returns the bound port, which is useful with
+        `port=0`.
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8000):
+        if self._server is None:
+            await self.start(host, port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_head(reader), self.header_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive=False)
+                    break
+                keep_alive = request.keep_alive
+                try:
+                    await self._dispatch(request, reader, writer)
+                except HTTPError as e:
+                    keep_alive = keep_alive and not e.close
+                    await self._send_error(writer, e, keep_alive)
+                except ConnectionError:
+                    break
+                except Exception as e:
+                    await self._send_error(writer, HTTPError(500, f"{type(e).__name__}: {e}"), keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Request:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request head too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return Request(method, target, version, headers)
+
+    async def _read_body(self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if "chunked" in request.headers.get("transfer-encoding", "").lower():
+            length = None
+        elif "content-length" in request.headers:
+            try:
+                length = int(request.headers["content-length"])
+            except ValueError:
+                length = -1
+            if length < 0:
+                raise HTTPError(400, "Invalid Content-Length", close=True)
+            if length > self.max_body_size:
+                raise HTTPError(413, "Request body too large", close=True)
+        else:
+            raise HTTPError(411, "Content-Length required", close=True)
+
+        if request.headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+
+        if length is not None:
+            request.body = await reader.readexactly(length)
+            return
+        body = bytearray()
+        while True:
+            try:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            except ValueError:
+                size = -1
+            if size < 0:
+                raise HTTPError(400, "Invalid chunk size", close=True)
+            if size == 0:
+                await reader.readuntil(b"\r\n")
+                break
+            if len(body) + size > self.max_body_size:
+                raise HTTPError(413, "Request body too large", close=True)
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+        request.body = bytes(body)
+
+    def _get_slot(self, request: Request) -> _EngineSlot:
+        name = request.query.get("engine", self.default_engine)
+        slot = self.slots.get(name)
+        if slot is None:
+            raise HTTPError(404, f"Unknown engine: {name}")
+        return slot
+
+    async def _dispatch(self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        routes = {
+            "/ocr": ("POST", self._handle_ocr),
+            "/ocr/batch": ("POST", self._handle_batch),
+            "/health": ("GET", self._handle_health),
+            "/metrics": ("GET", self._handle_metrics),
+        }
+        if request.path not in routes:
+            raise HTTPError(404, f"Not found: {request.path}", close=True)
+        method, handler = routes[request.path]
+        if request.method != method:
+            raise HTTPError(405, f"Use {method} for {request.path}", {"Allow": method}, close=True)
+        if method == "POST":
+            # Reject right away, before receiving a body that cannot be served
+            try:
+                self._get_slot(request).check()
+            except HTTPError as e:
+                e.close = True
+                raise
+            await self._read_body(request, reader, writer)
+        await handler(request, writer)
+
+    async def _recognize(self, slot: _EngineSlot, data) -> OCRResult:
+        loop = asyncio.get_running_loop()
+        array = await loop.run_in_executor(None, decode_image, data)
+        return await slot.engine.aocr(array)
+
+    async def _handle_ocr(self, request: Request, writer: asyncio.StreamWriter):
+        slot = self._get_slot(request)
+        data = request.body
+        if request.headers.get("content-type", "").startswith("multipart/"):
+            parts = split_multipart(request.body, request.headers["content-type"])
+            if not parts:
+                raise HTTPError(400, "No image in the request")
+            data = parts[0]
+        if not len(data):
+            raise HTTPError(400, "No image in the request")
+        slot.admit()
+        try:
+            result = await self._recognize(slot, data)
+        finally:
+            slot.release()
+        await self._send_json(writer, 200, result.model_dump(mode="json"), request.keep_alive)
+
+    async def _handle_batch(self, request: Request, writer: asyncio.StreamWriter):
+        slot = self._get_slot(request)
+        content_type = request.headers.get("content-type", "")
+        if not content_type.startswith("multipart/"):
+            raise HTTPError(400, "Send the images as multipart/form-data")
+        parts = split_multipart(request.body, content_type)
+        slot.admit(len(parts))
+
+        async def run(index: int, data) -> dict:
+            try:
+                result = await self._recognize(slot, data)
+                return {"index": index, "result": result.model_dump(mode="json")}
+            except HTTPError as e:
+                return {"index": index, "error": e.message}
+            except Exception as e:
+                return {"index": index, "error": f"{type(e).__name__}: {e}"}
+            finally:
+                slot.release()
+
+        tasks = [asyncio.ensure_future(run(index, data)) for index, data in enumerate(parts)]
+        try:
+            if not request.wants_ndjson:
+                entries = await asyncio.gather(*tasks)
+                await self._send_json(writer, 200, {"results": entries}, request.keep_alive)
+                return
+            self._write_head(writer, 200, NDJSON_CONTENT_TYPE, None, request.keep_alive)
+            for task in asyncio.as_completed(tasks):
+                line = json.dumps(await task, ensure_ascii=False).encode() + b"\n"
+                writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            # If the client went away, its images that have not started are dropped
+            for task in tasks:
+                task.cancel()
+
+    async def _handle_health(self, request: Request, writer: asyncio.StreamWriter):
+        engines = {
+            name: {
+                "pending": slot.pending,
+                "max_concurrency": slot.engine.max_concurrency,
+                "max_queue": slot.max_queue,
+            }
+            for name, slot in self.slots.items()
+        }
+        await self._send_json(writer, 200, {"status": "ok", "engines": engines}, request.keep_alive)
+
+    async def _handle_metrics(self, request: Request, writer: asyncio.StreamWriter):
+        body = get_metrics_registry().to_prometheus().encode()
+        self._write_head(writer, 200, "text/plain; version=0.0.4", len(body), request.keep_alive)
+        writer.write(body)
+        await writer.drain()
+
+    @staticmethod
+    def _write_head(
+        writer: asyncio.StreamWriter,
+        status: int,
+        content_type: str,
+        length: Optional[int],
+        keep_alive: bool,
+        headers: Optional[dict[str, str]] = None,
+    ):
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            # Without a length, the body is sent in chunks as it is produced
+            f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *(f"{name}: {value}" for name, value in (headers or {}).items()),
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_json(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        data,
+        keep_alive: bool,
+        headers: Optional[dict[str, str]] = None,
+    ):
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self._write_head(writer, status, "application/json", len(body), keep_alive, headers)
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_error(self, writer: asyncio.StreamWriter, error: HTTPError, keep_alive: bool):
+        with suppress(ConnectionError):
+            await self._send_json(writer, error.status, {"error": error.message}, keep_alive, error.headers)
+
+
+def serve(
+    engines: list[str],
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    warmup: bool = True,
+    max_concurrency: Optional[int] = None,
+    threads: Optional[int] = None,
+    processes: Optional[int] = None,
+    **server_kwargs,
+):
+    """
+    Loads the named engines once, warms them up, and serves them until
+    interrupted. With `threads` or `processes` (the servers sharing this
+    machine), or a thread budget from the environment, the engines split the
+    budget between them.
+    """
+    from my_little_ocr.ocr_engines import get_engine_instance
+
+    budget = get_thread_budget()
+    if threads or processes or budget is not None:
+        budget = budget or ThreadBudget()
+        set_thread_budget(
+            ThreadBudget(
+                threads=threads or budget.threads,
+                engines=len(engines),
+                processes=processes or budget.processes,
+            )
+        )
+
+    instances = {}
+    for name in engines:
+        instance = get_engine_instance(name)
+        if max_concurrency:
+            instance.max_concurrency = max_concurrency
+        if warmup:
+            instance.warmup()
+        instances[name] = instance
+    server = OCRServer(instances, **server_kwargs)
+    print(f"Serving {', '.join(instances)} on http://{host}:{port}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for instance in instances.values():
+            instance.close()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m my_little_ocr.server",
+        description="Serve OCR engines over HTTP.",
+    )
+    parser.add_argument("--engines", nargs="+", required=True, help="Engines to load; the first is the default")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-concurrency", type=int, help="Images recognized at once per engine")
+    parser.add_argument("--max-queue", type=int, default=16, help="Images waiting per engine before rejecting")
+    parser.add_argument("--max-body-size", type=int, default=64 << 20, help="Largest request body, in bytes")
+    parser.add_argument("--no-warmup", action="store_true", help="Do not run a first OCR call at startup")
+    parser.add_argument("--threads", type=int, help="CPU threads shared by the engines")
+    parser.add_argument("--processes", type=int, help="Servers sharing this machine's CPUs")
+    args = parser.parse_args(argv)
+
+    serve(
+        args.engines,
+        host=args.host,
+        port=args.port,
+        warmup=not args.no_warmup,
+        max_concurrency=args.max_concurrency,
+        threads=args.threads,
+        processes=args.processes,
+        max_queue=args.max_queue,
+        max_body_size=args.max_body_size,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+import json
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from os import PathLike
+from pathlib import Path
+from typing import Iterable, Iterator, Literal, Optional, Union
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike, convert_imagelike_to_type
+from my_little_ocr.engine_pool import EnginePool
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+InputId = Union[str, int]
+
+
+def iter_image_paths(
+    root: Union[str, PathLike], extensions: Iterable[str] = IMAGE_EXTENSIONS
+) -> Iterator[str]:
+    """
+    Lazily yields the image files under `root`, recursively and in a stable
+    (sorted) order, so that huge trees are never listed in memory at once.
+    """
+    extensions = {extension.lower() for extension in extensions}
+    with os.scandir(root) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_image_paths(entry.path, extensions)
+        elif os.path.splitext(entry.name)[1].lower() in extensions:
+            yield entry.path
+
+
+def _with_ids(inputs) -> Iterator[tuple[InputId, ImageLike]]:
+    # Paths are their own ids; other images are numbered, unless given as
+    # (input_id, image) pairs
+    if isinstance(inputs, (str, PathLike)):
+        inputs = iter_image_paths(inputs)
+    for index, item in enumerate(inputs):
+        if isinstance(item, tuple):
+            yield item
+        elif isinstance(item, (str, PathLike)):
+            yield str(item), item
+        else:
+            yield index, item
+
+
+def _load(img: ImageLike, decode: Optional[str]):
+    if decode == "numpy":
+        array = convert_imagelike_to_type(img, "numpy")
+        if array is None:
+            raise ValueError(f"Could not decode image: {img}")
+        return array
+    if decode == "bytes" and isinstance(img, (str, PathLike)):
+        return Path(img).read_bytes()
+    return img
+
+
+def _chain(future: Future, submit) -> Future:
+    """
+    Returns a future for `submit(future.result())`, started as soon as
+    `future` completes, without blocking any thread while waiting.
+    """
+    chained: Future = Future()
+
+    def on_loaded(loaded: Future):
+        if chained.cancelled():
+            return
+        try:
+            inner = submit(loaded.result())
+        except BaseException as e:
+            inner = Future()
+            inner.set_exception(e)
+        inner.add_done_callback(lambda done: _copy_outcome(done, chained))
+
+    future.add_done_callback(on_loaded)
+    return chained
+
+
+def _copy_outcome(source: Future, target: Future):
+    try:
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+    except InvalidStateError:
+        # The stream was closed and the target cancelled in the meantime
+        pass
+
+
+def ocr_stream(
+    inputs: Union[str, PathLike, Iterable],
+    engine: Union[BaseOCREngine, EnginePool],
+    prefetch: int = 8,
+    ordered: bool = True,
+    decode: Optional[Literal["numpy", "bytes"]] = "numpy",
+    decode_workers: int = 2,
+    workers: Optional[int] = None,
+    errors: Literal["raise", "yield"] = "raise",
+    **kwargs,
+) -> Iterator[tuple[InputId, Union[OCRResult, BaseException]]]:
+    """
+    OCRs a stream of images, reading and decoding upcoming images in
+    background threads while the engine works on the current ones.
+
+    At most `prefetch` images are loaded or in recognition at any time, and
+    inputs are only pulled as results are consumed, so memory stays flat
+    however long the input is.
+
+    Args:
+        inputs: A directory, which is walked recursively, or an iterable of
+            images or `(input_id, image)` pairs. Paths are identified by
+            themselves and other images by their position.
+        engine (BaseOCREngine | EnginePool): The engine, or a pool of engine
+            processes.
+        prefetch (int): The maximum number of images in flight.
+        ordered (bool): Yield results in input order. If False, results are
+            yielded as soon as they are ready.
+        decode (str): "numpy" decodes images in the background; "bytes" only
+            reads files, for engines that take encoded images; None passes
+            inputs through unchanged.
+        decode_workers (int): The number of threads reading and decoding.
+        workers (int): The number of images recognized at once. Defaults to
+            the engine's `max_concurrency`; ignored for an `EnginePool`.
+        errors (str): "raise" stops at the first failing image; "yield"
+            yields `(input_id, exception)` for it and continues.
+        **kwargs: Extra arguments forwarded to the engine's `ocr`.
+
+    Yields:
+        tuple[InputId, OCRResult]: The input id and its result.
+    """
+    if prefetch < 1:
+        raise ValueError("prefetch must be at least 1")
+    decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="ocr_stream-decode")
+    if isinstance(engine, EnginePool):
+        infer_pool = None
+        submit = lambda img: engine.submit(img, **kwargs)
+    else:
+        infer_pool = ThreadPoolExecutor(
+            max_workers=workers or engine.max_concurrency, thread_name_prefix="ocr_stream-ocr"
+        )
+        submit = lambda img: infer_pool.submit(engine.ocr, img, **kwargs)
+
+    items = _with_ids(inputs)
+    pending: deque[tuple[InputId, Future]] = deque()
+    done_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    def fill():
+        while len(pending) < prefetch:
+            try:
+                input_id, img = next(items)
+            except StopIteration:
+                return
+            future = _chain(decode_pool.submit(_load, img, decode), submit)
+            if not ordered:
+                future.add_done_callback(lambda f, i=input_id: done_queue.put((i, f)))
+            pending.append((input_id, future))
+
+    try:
+        fill()
+        while pending:
+            if ordered:
+                input_id, future = pending.popleft()
+            else:
+                input_id, future = done_queue.get()
+                pending.remove((input_id, future))
+            try:
+                result = future.result()
+            except Exception as e:
+                if errors == "raise":
+                    raise
+                result = e
+            fill()
+            yield input_id, result
+    finally:
+        for _, future in pending:
+            future.cancel()
+        decode_pool.shutdown(wait=False, cancel_futures=True)
+        if infer_pool is not None:
+            infer_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class JSONLSink:
+    """
+    Appends OCR results to a JSON Lines file, one object per input, flushed
+    as they arrive. The file doubles as the checkpoint of a job: after an
+    interruption, `completed_ids` tells which inputs are already done.
+
+    Each line is `{"id": ..., "result": {...}}`, where the result is the
+    serialized `OCRResult`, or `{"id": ..., "error": "..."}` for failures.
+
+    Args:
+        path (str | PathLike): The output file.
+        resume (bool): Keep existing lines. If False, the file is truncated.
+        fsync (bool): Force every line to disk, trading speed for durability.
+    """
+
+    def __init__(self, path: Union[str, PathLike], resume: bool = True, fsync: bool = False):
+        self.path = Path(path)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._completed: set = set()
+        if resume and self.path.exists():
+            self._completed = self._recover()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+    def _recover(self) -> set:
+        completed, valid_size = set(), 0
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if not line.endswith(b"\n"):
+                    # Only the last line can lack its newline: a write cut
+                    # short by a crash, dropped below
+                    break
+                valid_size += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(
+                        f"{self.path}, line {number}: not a JSON record; refusing to resume "
+                        "and overwrite the results after it"
+                    ) from e
+                if "result" in record:
+                    completed.add(record["id"])
+        if valid_size != self.path.stat().st_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_size)
+        return completed
+
+    def completed_ids(self) -> set:
+        """
+        Returns the ids of the inputs already written with a result.
+        """
+        return set(self._completed)
+
+    def write(self, input_id: InputId, result: Union[OCRResult, BaseException]):
+        if isinstance(result, BaseException):
+            record = {"id": input_id, "error": f"{type(result).__name__}: {result}"}
+        else:
+            record = {"id": input_id, "result": result.model_dump(mode="json")}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            if "result" in record:
+                self._completed.add(input_id)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "JSONLSink":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_jsonl(path: Union[str, PathLike]) -> Iterator[tuple[InputId, Union[OCRResult, str]]]:
+    """
+    Reads back a file written by `JSONLSink`, yielding each input id with its
+    `OCRResult`, or with the error message for failed inputs.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "result" in record:
+                yield record["id"], OCRResult.model_validate(record["result"])
+            else:
+                yield record["id"], record["error"]
+
+
+def ocr_to_jsonl(
+    inputs: Union[str, PathLike, Iterable],
+    engine: Union[BaseOCREngine, EnginePool],
+    path: Union[str, PathLike],
+    resume: bool = True,
+    **stream_kwargs,
+) -> int:
+    """
+    Runs `ocr_stream` over the inputs and appends the results to a JSON Lines
+    file. With `resume`, inputs that already have a result in the file are
+    skipped, so an interrupted job continues where it stopped; failed
+    inputs are retried.
+
+    Returns:
+        int: The number of inputs processed in this run.
+    """
+    stream_kwargs.setdefault("errors", "yield")
+    count = 0
+    with JSONLSink(path, resume=resume) as sink:
+        completed = sink.completed_ids()
+        remaining = (
+            (input_id, img) for input_id, img in _with_ids(inputs) if input_id not in completed
+        )
+        for input_id, result in ocr_stream(remaining, engine, **stream_kwargs):
+            sink.write(input_id, result)
+            count += 1
+    return count
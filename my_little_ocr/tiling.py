@@ -0,0 +1,319 @@
+import difflib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import ImageLike, convert_imagelike_to_type
+from my_little_ocr.engine_pool import EnginePool
+
+
+def _tile_starts(length: int, tile_size: int, step: int) -> list[int]:
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size, step))
+    # The last tile ends exactly at the border
+    starts.append(length - tile_size)
+    return starts
+
+
+def tile_grid(
+    height: int, width: int, tile_size: int, overlap: int
+) -> list[tuple[int, int, int, int]]:
+    """
+    Splits an image into tiles of at most `tile_size` pixels per side, with
+    neighbouring tiles sharing `overlap` pixels or more.
+
+    Returns:
+        list[tuple[int, int, int, int]]: The tiles as (top, left, bottom, right).
+    """
+    if overlap >= tile_size:
+        raise ValueError("overlap must be smaller than tile_size")
+    step = tile_size - overlap
+    return [
+        (top, left, min(top + tile_size, height), min(left + tile_size, width))
+        for top in _tile_starts(height, tile_size, step)
+        for left in _tile_starts(width, tile_size, step)
+    ]
+
+
+def _rects(boxes: np.ndarray) -> np.ndarray:
+    # Axis-aligned bounding rectangles as (x0, y0, x1, y1)
+    return np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1).astype(np.float64)
+
+
+def _pairwise_overlap(rects: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the IoU and the containment (intersection over the smaller area)
+    of every pair of rectangles.
+    """
+    x0 = np.maximum(rects[:, None, 0], rects[None, :, 0])
+    y0 = np.maximum(rects[:, None, 1], rects[None, :, 1])
+    x1 = np.minimum(rects[:, None, 2], rects[None, :, 2])
+    y1 = np.minimum(rects[:, None, 3], rects[None, :, 3])
+    intersection = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    areas = np.maximum((rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1]), 1)
+    union = areas[:, None] + areas[None, :] - intersection
+    smaller = np.minimum(areas[:, None], areas[None, :])
+    return intersection / union, intersection / smaller
+
+
+def _in_shared_area(
+    rects: np.ndarray, tile_index: np.ndarray, grid: list[tuple[int, int, int, int]]
+) -> np.ndarray:
+    """
+    Returns which rectangles reach into a tile other than their own.
+    """
+    tiles = np.array(grid, dtype=np.float64)
+    reaches = (
+        (rects[:, None, 0] < tiles[None, :, 3])
+        & (rects[:, None, 2] > tiles[None, :, 1])
+        & (rects[:, None, 1] < tiles[None, :, 2])
+        & (rects[:, None, 3] > tiles[None, :, 0])
+    )
+    reaches[np.arange(len(rects)), tile_index] = False
+    return reaches.any(axis=1)
+
+
+class TiledOCREngine(BaseOCREngine):
+    """
+    Wraps an engine so that large images are recognized tile by tile.
+
+    The image is split into overlapping tiles, which are recognized
+    concurrently. Their boxes are shifted back into page coordinates, and
+    items found twice in the overlap bands are merged, keeping the copy
+    farthest from a tile cut. Images no larger than a tile are passed to the
+    engine unchanged.
+
+    The overlap should exceed the height of the tallest text line, so that
+    every line lies entirely within at least one tile.
+
+    Args:
+        engine (BaseOCREngine | EnginePool): The engine recognizing the tiles.
+            With an `EnginePool`, tiles are spread over its worker processes.
+        tile_size (int): The maximum side of a tile, in pixels.
+        overlap (int): The number of pixels neighbouring tiles share.
+        max_workers (int): The number of tiles recognized at once. Defaults to
+            the engine's `max_concurrency`; with a single worker, tiles go
+            through the engine's `ocr_batch` instead.
+        iou_threshold (float): Items from different tiles whose boxes overlap
+            by at least this IoU are considered the same.
+        containment_threshold (float): Items whose smaller box lies at least
+            this much inside the other are also considered the same, which
+            catches text cut by a tile border.
+    """
+
+    record_metrics = False
+
+    def __init__(
+        self,
+        engine: Union[BaseOCREngine, EnginePool],
+        tile_size: int = 1280,
+        overlap: int = 192,
+        max_workers: Optional[int] = None,
+        iou_threshold: float = 0.5,
+        containment_threshold: float = 0.9,
+    ):
+        if overlap >= tile_size:
+            raise ValueError("overlap must be smaller than tile_size")
+        self.engine = engine
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+        self.containment_threshold = containment_threshold
+        if isinstance(engine, EnginePool):
+            self.ocr_engine_name = str(engine.engine_name)
+            self.max_workers = max_workers or engine.num_workers
+        else:
+            self.ocr_engine_name = engine.ocr_engine_name
+            self.max_workers = max_workers or engine.max_concurrency
+            self.max_concurrency = engine.max_concurrency
+
+    def get_config_key(self) -> dict:
+        config = {} if isinstance(self.engine, EnginePool) else self.engine.get_config_key()
+        return {**config, "tile_size": self.tile_size, "overlap": self.overlap}
+
+    def _ocr_tiles(self, tiles: list[np.ndarray], **kwargs) -> list[OCRResult]:
+        if isinstance(self.engine, EnginePool):
+            return list(self.engine.map(tiles, **kwargs))
+        if self.max_workers <= 1:
+            return self.engine.ocr_batch(tiles, **kwargs)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda tile: self.engine.ocr(tile, **kwargs), tiles))
+
+    def ocr(self, img: ImageLike, **kwargs) -> OCRResult:
+        array = convert_imagelike_to_type(img, "numpy")
+        height, width = array.shape[:2]
+        if height <= self.tile_size and width <= self.tile_size:
+            if isinstance(self.engine, EnginePool):
+                return self.engine.submit(array, **kwargs).result()
+            return self.engine.ocr(array, **kwargs)
+
+        grid = tile_grid(height, width, self.tile_size, self.overlap)
+        # Tiles are views into the page, not copies
+        tile_results = self._ocr_tiles(
+            [array[top:bottom, left:right] for top, left, bottom, right in grid], **kwargs
+        )
+        return self._merge(tile_results, grid, height, width)
+
+    def ocr_batch(
+        self, images: Iterable[ImageLike], batch_size: int = 8, **kwargs
+    ) -> list[OCRResult]:
+        return [self.ocr(img, **kwargs) for img in images]
+
+    def _merge(
+        self,
+        tile_results: list[OCRResult],
+        grid: list[tuple[int, int, int, int]],
+        height: int,
+        width: int,
+    ) -> OCRResult:
+        shifted = []
+        tile_index, margins = [], []
+        for index, (result, (top, left, bottom, right)) in enumerate(zip(tile_results, grid)):
+            boxes = result.boxes + np.array([left, top], dtype=np.int32)
+            shifted.append(
+                OCRResult._construct(
+                    texts=result.texts,
+                    boxes=boxes,
+                    confidences=result.confidences,
+                    default_confidence_threshold=result.default_confidence_threshold,
+                    **result._item_columns(),
+                )
+            )
+            rects = _rects(boxes)
+            # Distance of each item from the tile borders that cut the page;
+            # the page's own borders do not count
+            no_cut = np.full(len(rects), np.inf)
+            distances = np.stack(
+                [
+                    rects[:, 0] - left if left > 0 else no_cut,
+                    rects[:, 1] - top if top > 0 else no_cut,
+                    right - rects[:, 2] if right < width else no_cut,
+                    bottom - rects[:, 3] if bottom < height else no_cut,
+                ],
+                axis=1,
+            )
+            margins.append(distances.min(axis=1))
+            tile_index.append(np.full(len(result), index))
+
+        merged = OCRResult.concatenate(shifted)
+        if not len(merged):
+            return merged
+        tile_index = np.concatenate(tile_index)
+        margins = np.concatenate(margins)
+
+        # Duplicates can only lie where tiles overlap
+        shared = _in_shared_area(_rects(merged.boxes), tile_index, grid)
+        candidates = np.flatnonzero(shared)
+        keep = np.ones(len(merged), dtype=bool)
+        if len(candidates) > 1:
+            iou, containment = _pairwise_overlap(_rects(merged.boxes[candidates]))
+            same_tile = tile_index[candidates][:, None] == tile_index[candidates][None, :]
+            duplicate = (
+                (iou >= self.iou_threshold) | (containment >= self.containment_threshold)
+            ) & ~same_tile
+            # Prefer the largest copy, as the others are cut-off fragments of
+            # it, then the one farthest from a cut, then the most confident
+            rects = _rects(merged.boxes[candidates])
+            areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
+            confidences = np.nan_to_num(merged.confidences[candidates], nan=0.0)
+            order = np.lexsort((-confidences, -margins[candidates], -areas))
+            suppressed = np.zeros(len(candidates), dtype=bool)
+            for position in order:
+                if not suppressed[position]:
+                    suppressed |= duplicate[position]
+            keep[candidates[suppressed]] = False
+        return self._stitch_lines(merged.take(keep), tile_index[keep], shared[keep]).sort_by_position()
+
+    def _stitch_lines(
+        self, result: OCRResult, tile_index: np.ndarray, shared: np.ndarray
+    ) -> OCRResult:
+        """
+        Joins the pieces of lines too long to fit in one tile, which remain
+        as separate items that overlap horizontally across a cut.
+        """
+        candidates = np.flatnonzero(shared)
+        if len(candidates) < 2:
+            return result
+        rects = _rects(result.boxes[candidates])
+        heights = rects[:, 3] - rects[:, 1]
+        y_overlap = np.minimum(rects[:, None, 3], rects[None, :, 3]) - np.maximum(rects[:, None, 1], rects[None, :, 1])
+        x_overlap = np.minimum(rects[:, None, 2], rects[None, :, 2]) - np.maximum(rects[:, None, 0], rects[None, :, 0])
+        same_line = (
+            (y_overlap >= 0.5 * np.minimum(heights[:, None], heights[None, :]))
+            & (x_overlap > 0)
+            & (tile_index[candidates][:, None] != tile_index[candidates][None, :])
+        )
+        if not same_line.any():
+            return result
+
+        # Connected pieces, found by propagating the smallest index through the graph
+        group = np.arange(len(candidates))
+        while True:
+            linked = np.where(same_line, group[None, :], len(candidates)).min(axis=1)
+            updated = np.minimum(group, linked)
+            if np.array_equal(updated, group):
+                break
+            group = updated
+
+        keep = np.ones(len(result), dtype=bool)
+        texts, boxes, confidences = [], [], []
+        # Merged lines take the other columns, such as `engines`, from their first piece
+        columns = {column: [] for column in result._item_columns()}
+        for root in np.unique(group):
+            members = np.flatnonzero(group == root)
+            if len(members) < 2:
+                continue
+            members = members[np.argsort(rects[members, 0])]
+            text = result.texts[candidates[members[0]]]
+            for previous, member in zip(members, members[1:]):
+                text = _join_overlapping_text(
+                    text,
+                    result.texts[candidates[member]],
+                    rects[previous],
+                    rects[member],
+                )
+            x0, y0 = rects[members, 0].min(), rects[members, 1].min()
+            x1, y1 = rects[members, 2].max(), rects[members, 3].max()
+            texts.append(text)
+            boxes.append([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])
+            confidences.append(np.min(result.confidences[candidates[members]]))
+            for column, values in result._item_columns().items():
+                columns[column].append(values[candidates[members[0]]])
+            keep[candidates[members]] = False
+
+        return OCRResult.concatenate(
+            [
+                result.take(keep),
+                OCRResult._construct(
+                    texts=texts,
+                    boxes=np.rint(boxes).astype(np.int32),
+                    confidences=np.array(confidences, dtype=np.float32),
+                    default_confidence_threshold=result.default_confidence_threshold,
+                    **columns,
+                ),
+            ]
+        )
+
+
+def _join_overlapping_text(
+    left: str, right: str, left_rect: np.ndarray, right_rect: np.ndarray
+) -> str:
+    """
+    Joins two pieces of a line that share the text in their overlap. The
+    shared part is located by the longest common substring near the end of
+    `left` and the start of `right`, which also drops characters mangled by
+    the cut on either side.
+    """
+    overlap = min(left_rect[2], right_rect[2]) - max(left_rect[0], right_rect[0])
+    # Characters of each piece estimated to fall in the overlap, with some slack
+    left_slack = int(np.ceil(overlap * len(left) / max(left_rect[2] - left_rect[0], 1))) + 2
+    right_slack = int(np.ceil(overlap * len(right) / max(right_rect[2] - right_rect[0], 1))) + 2
+    match = difflib.SequenceMatcher(None, left, right, autojunk=False).find_longest_match(
+        max(len(left) - left_slack, 0), len(left), 0, min(right_slack, len(right))
+    )
+    if match.size >= min(3, len(left), len(right)) and match.size > 0:
+        return left[: match.a] + right[match.b :]
+    return f"{left} {right}"
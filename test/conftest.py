@@ -0,0 +1,103 @@
+from typing import Callable, Optional
+
+import numpy as np
+import pytest
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.base_engine.img_utils import convert_imagelike_to_type
+
+
+def make_result(
+    texts: list[str], rects: Optional[list] = None, confidences: Optional[list] = None, **columns
+) -> OCRResult:
+    """
+    Builds a result from its texts and (left, top, right, bottom) rectangles.
+    Confidences default to 0.9, above the default threshold.
+    """
+    texts = list(texts)
+    boxes = None
+    if rects is not None:
+        boxes = np.array(
+            [[[left, top], [right, top], [right, bottom], [left, bottom]] for left, top, right, bottom in rects],
+            np.int32,
+        ).reshape(-1, 4, 2)
+    if confidences is None:
+        confidences = [0.9] * len(texts)
+    return OCRResult.from_columns(texts=texts, boxes=boxes, confidences=confidences, **columns)
+
+
+def read_size(img) -> OCRResult:
+    """
+    Reads an image as its size, "<width>x<height>", in one item covering it.
+    """
+    height, width = img.shape[:2]
+    return make_result([f"{width}x{height}"], [(0, 0, width, height)])
+
+
+def read_rectangles(words: Optional[dict] = None) -> Callable:
+    """
+    Reads rectangles filled with a value as "word<value>". When the full
+    rectangles of the words are given, words cut by the image border come out
+    as "?", like text mangled by a tile cut.
+    """
+
+    def read(img) -> OCRResult:
+        texts, rects = [], []
+        for value in np.unique(img[..., 0]):
+            if value == 0:
+                continue
+            ys, xs = np.nonzero(img[..., 0] == value)
+            rect = (xs.min(), ys.min(), xs.max() + 1, ys.max() + 1)
+            whole = True
+            if words is not None:
+                left, top, right, bottom = words[value]
+                whole = (rect[2] - rect[0], rect[3] - rect[1]) == (right - left, bottom - top)
+            texts.append(f"word{value}" if whole else "?")
+            rects.append(rect)
+        return make_result(texts, rects)
+
+    return read
+
+
+class FakeEngine(BaseOCREngine):
+    """
+    Answers with `read(img)` on the decoded image, by default its size, and
+    records the shape of every image and the size of every batch it was given.
+    """
+
+    read_size = staticmethod(read_size)
+
+    def __init__(self, read: Optional[Callable] = None, name: str = "fake", accepts_grayscale: bool = False):
+        self.read = read or read_size
+        self.ocr_engine_name = name
+        self.accepts_grayscale = accepts_grayscale
+        self.shapes = []
+        self.batches = []
+
+    def ocr(self, img) -> OCRResult:
+        img = convert_imagelike_to_type(img, "numpy")
+        self.shapes.append(img.shape[:2])
+        return self.read(img)
+
+    def ocr_batch(self, images, batch_size: int = 8, **kwargs) -> list[OCRResult]:
+        images = list(images)
+        self.batches.append(len(images))
+        return super().ocr_batch(images, batch_size, **kwargs)
+
+
+@pytest.fixture(name="make_result")
+def make_result_fixture() -> Callable:
+    return make_result
+
+
+@pytest.fixture
+def fake_engine() -> type[FakeEngine]:
+    return FakeEngine
+
+
+@pytest.fixture
+def rectangle_engine() -> Callable:
+    """
+    Builds engines reading the rectangles of `read_rectangles`.
+    """
+    return lambda words=None: FakeEngine(read_rectangles(words), name="rectangles")
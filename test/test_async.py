@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from my_little_ocr.base_engine.metrics import get_metrics_registry
+from my_little_ocr.ocr_engines.wechat_ocr_engine.wechat_ocr_engine import WechatOCREngine
+
+
+def image(width: int) -> np.ndarray:
+    return np.zeros((2, width, 3), np.uint8)
+
+
+def test_aocr_runs_at_most_max_concurrency_calls(fake_engine):
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def read(img):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return fake_engine.read_size(img)
+
+    engine = fake_engine(read)
+    engine.max_concurrency = 2
+
+    async def main():
+        return await asyncio.gather(*(engine.aocr(image(width)) for width in range(1, 7)))
+
+    try:
+        results = asyncio.run(main())
+        assert [result.texts for result in results] == [[f"{width}x2"] for width in range(1, 7)]
+        assert peak == 2
+        # Semaphores belong to one event loop; a new loop gets its own
+        assert asyncio.run(engine.aocr(image(3))).texts == ["3x2"]
+    finally:
+        engine.close()
+
+
+def test_aocr_batch_takes_one_slot(fake_engine):
+    engine = fake_engine()
+    try:
+        results = asyncio.run(engine.aocr_batch(image(width) for width in (3, 1, 2)))
+        assert [result.texts for result in results] == [["3x2"], ["1x2"], ["2x2"]]
+        assert engine.batches == [3]
+    finally:
+        engine.close()
+
+
+def test_cancelled_aocr_does_not_run(fake_engine):
+    gate = threading.Event()
+
+    def read(img):
+        gate.wait(10)
+        return fake_engine.read_size(img)
+
+    engine = fake_engine(read)
+
+    async def main():
+        running = asyncio.create_task(engine.aocr(image(1)))
+        waiting = asyncio.create_task(engine.aocr(image(2)))
+        while not engine.shapes:
+            await asyncio.sleep(0.01)
+        waiting.cancel()
+        gate.set()
+        first = await running
+        # The slot of the cancelled call is free again
+        third = await engine.aocr(image(3))
+        return first, waiting.cancelled(), third
+
+    try:
+        first, cancelled, third = asyncio.run(main())
+    finally:
+        gate.set()
+        engine.close()
+    assert cancelled
+    assert (first.texts, third.texts) == (["1x2"], ["3x2"])
+    assert engine.shapes == [(2, 1), (2, 3)]
+
+
+def calls(engine: str, method: str) -> float:
+    return sum(
+        counter["value"]
+        for counter in get_metrics_registry().snapshot()["counters"]
+        if counter["name"] == "calls_total" and counter["labels"] == {"engine": engine, "method": method}
+    )
+
+
+def test_wechat_aocr_is_recorded_like_ocr(monkeypatch):
+    class OcrManager:
+        """
+        Answers each task from another thread, like the WeChat OCR service.
+        """
+
+        def DoOCRTask(self, img_path):
+            answer = {"ocrResult": [{"text": "hi", "location": dict(left=1, top=2, right=5, bottom=4), "score": 0.9}]}
+            threading.Timer(0.01, engine._wrapper_callback, (img_path, answer)).start()
+
+    # The WeChat OCR binary only runs on Windows
+    monkeypatch.setattr(WechatOCREngine, "init_wechat_ocr", lambda self: setattr(self, "ocr_manager", OcrManager()))
+    engine = WechatOCREngine()
+    before = calls(engine.ocr_engine_name, "ocr")
+    try:
+        result = asyncio.run(engine.aocr(np.zeros((8, 8, 3), np.uint8)))
+    finally:
+        engine.close()
+    assert result.texts == ["hi"]
+    assert {"decode", "inference", "total"} <= set(result.timings)
+    assert calls(engine.ocr_engine_name, "ocr") == before + 1
+    assert engine._future_results == {}
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+
+def test_engines_without_separate_stages_refuse(fake_engine):
+    with pytest.raises(NotImplementedError):
+        fake_engine().detect(np.zeros((4, 4, 3), np.uint8))
+    with pytest.raises(NotImplementedError):
+        fake_engine().recognize(np.zeros((4, 4, 3), np.uint8))
+
+
+def test_regions_are_ocred_in_place(rectangle_engine):
+    img = np.zeros((100, 200, 3), np.uint8)
+    img[10:20, 10:50] = 1
+    img[60:70, 120:180] = 2
+    engine = rectangle_engine()
+    regions = [(100, 50, 250, 90), (0, 0, 60, 30), (300, 0, 400, 10), (-10, -10, 70, 25)]
+    result = engine.ocr(img, regions=regions)
+
+    # In the order of the regions, in full-image coordinates; regions outside
+    # the image are skipped and the others clipped to it
+    assert result.texts == ["word2", "word1", "word1"]
+    assert result.regions == [0, 1, 3]
+    assert result.boxes[0].tolist() == [[120, 60], [180, 60], [180, 70], [120, 70]]
+    assert result.boxes[1].tolist() == result.boxes[2].tolist() == [[10, 10], [50, 10], [50, 20], [10, 20]]
+    assert engine.shapes == [(40, 100), (30, 60), (25, 70)]
+    assert engine.batches == [3]
+    assert result.timings is not None
+
+    empty = engine.ocr(img, regions=[])
+    assert (empty.texts, empty.regions) == ([], [])
+    with pytest.raises(TypeError):
+        engine.ocr(img, "positional", regions=regions)
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from my_little_ocr.batching import MicroBatchingEngine
+
+
+def images(count: int) -> list[np.ndarray]:
+    return [np.zeros((10, width, 3), np.uint8) for width in range(1, count + 1)]
+
+
+def test_concurrent_calls_share_batches(fake_engine):
+    engine = fake_engine()
+    batching = MicroBatchingEngine(engine, max_batch_size=4, max_latency_ms=200)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(batching.ocr, images(8)))
+    finally:
+        batching.close()
+    assert [result.texts for result in results] == [[f"{width}x10"] for width in range(1, 9)]
+    assert max(engine.batches) > 1
+    assert sum(engine.batches) == 8
+    assert batching.stats()["images"] == 8
+
+
+def test_missing_batch_results_fail_every_request(fake_engine):
+    # A faulty backend that leaves the first result of each batch out
+    engine = fake_engine()
+    ocr_batch = engine.ocr_batch
+    engine.ocr_batch = lambda images, *args, **kwargs: ocr_batch(images, *args, **kwargs)[1:]
+    batching = MicroBatchingEngine(engine, max_batch_size=4, max_latency_ms=200)
+    try:
+        futures = [batching.submit(img) for img in images(4)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="returned 3 results for 4 images"):
+                future.result(timeout=10)
+    finally:
+        batching.close()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from my_little_ocr.cache import CachedOCREngine, OCRCache
+
+
+def image(value: int) -> np.ndarray:
+    return np.full((4, 4, 3), value, np.uint8)
+
+
+@pytest.fixture
+def engine(fake_engine, make_result):
+    """
+    Reads images as the sum of their pixels.
+    """
+    return fake_engine(lambda img: make_result([str(int(img.sum()))], [(0, 0, 4, 4)], [0.5]), name="counting")
+
+
+def test_memory_hits_and_misses(engine):
+    cached = CachedOCREngine(engine)
+    assert cached.ocr(image(1)).texts == ["48"]
+    assert cached.ocr(image(1)).texts == ["48"]
+    results = cached.ocr_batch([image(1), image(2), image(2)])
+    assert [result.texts for result in results] == [["48"], ["96"], ["96"]]
+    # image(2) is OCRed twice, as both copies miss within the same batch
+    assert len(engine.shapes) == 3
+    assert (cached.cache.stats.memory_hits, cached.cache.stats.misses) == (2, 3)
+
+
+def test_disk_round_trip(tmp_path, engine):
+    first = CachedOCREngine(engine, directory=tmp_path)
+    expected = first.ocr(image(3))
+
+    # A new cache over the same directory answers from disk
+    second = CachedOCREngine(engine, directory=tmp_path)
+    result = second.ocr(image(3))
+    assert len(engine.shapes) == 1
+    assert second.cache.stats.disk_hits == 1
+    assert result == expected
+    assert result.timings is None
+
+
+def test_disk_store_is_trimmed(tmp_path, engine):
+    cache = OCRCache(max_items=1, directory=tmp_path)
+    keys = [cache.make_key(engine, image(value)) for value in range(3)]
+    for key in keys:
+        cache.put(key, engine.ocr(image(0)))
+    size = sum(path.stat().st_size for path in tmp_path.glob("*/*.json")) // 3
+
+    trimmed = OCRCache(max_items=1, directory=tmp_path, max_disk_bytes=2 * size)
+    assert trimmed.stats.disk_evictions == 1
+    assert trimmed.get(keys[0]) is None
+    assert trimmed.get(keys[2]) is not None
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.cascade import CascadeEngine, crop_box
+
+RECTS = [(0, 0, 40, 10), (0, 20, 60, 30), (0, 40, 80, 50)]
+BOXES = [[[left, top], [right, top], [right, bottom], [left, bottom]] for left, top, right, bottom in RECTS]
+
+
+class BoxEngine(BaseOCREngine):
+    """
+    Recognizes given boxes directly, reading each as its width.
+    """
+
+    ocr_engine_name = "boxes"
+
+    def ocr(self, img) -> OCRResult:
+        raise AssertionError("crops are not OCRed when the boxes can be recognized")
+
+    def recognize_batch(self, images, boxes=None, batch_size: int = 8, **kwargs) -> list[OCRResult]:
+        return [
+            OCRResult.from_columns(
+                texts=[f"box{int(np.ptp(box[:, 0]))}" for box in image_boxes],
+                boxes=image_boxes,
+                confidences=[0.98] * len(image_boxes),
+            )
+            for image_boxes in boxes
+        ]
+
+
+def page() -> np.ndarray:
+    return np.zeros((60, 100, 3), np.uint8)
+
+
+@pytest.fixture
+def fast(fake_engine, make_result):
+    """
+    Finds the same three items on every image, the last two unsure.
+    """
+    return fake_engine(lambda img: make_result(["sure", "unsure", "blank"], RECTS, [0.95, 0.5, 0.3]), name="fast")
+
+
+@pytest.fixture
+def accurate(fake_engine, make_result):
+    """
+    Reads crops as their width, except crops wider than 80 pixels, where it
+    finds nothing.
+    """
+
+    def read(img):
+        height, width = img.shape[:2]
+        if width > 80:
+            return make_result([])
+        return make_result([f"w{width}"], [(0, 0, width, height)], [0.99])
+
+    return fake_engine(read, name="crops")
+
+
+def test_crop_box_pads_and_clips():
+    img = page()
+    crop = crop_box(img, np.array(BOXES[1]), padding=0.5)
+    # 5 pixels on every side, clipped at the left border
+    assert crop.shape[:2] == (20, 65)
+    assert np.shares_memory(crop, img)
+
+
+def test_unsure_items_are_read_from_crops(fast, accurate):
+    results = CascadeEngine(fast, accurate, threshold=0.9, padding=0.5).ocr_batch([page(), page()])
+    # Both unsure items of both images are read in one pass
+    assert accurate.shapes == [(20, 65), (20, 85)] * 2
+    for result in results:
+        assert result.texts == ["sure", "w65", "blank"]
+        assert result.engines == ["fast", "crops", "fast"]
+        np.testing.assert_allclose(result.confidences, [0.95, 0.99, 0.3], rtol=1e-6)
+        assert result.boxes.tolist() == BOXES
+
+
+def test_unsure_items_are_recognized_in_their_boxes(fast):
+    result = CascadeEngine(fast, BoxEngine(), threshold=0.9).ocr(page())
+    assert result.texts == ["sure", "box60", "box80"]
+    assert result.engines == ["fast", "boxes", "boxes"]
@@ -0,0 +1,43 @@
+import time
+
+import numpy as np
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.engine_pool import EnginePool
+
+
+class SleepEngine(BaseOCREngine):
+    """
+    Sleeps for as many tenths of a second as the image is wide, then returns
+    the width as text.
+    """
+
+    ocr_engine_name = "sleep"
+
+    def ocr(self, img) -> OCRResult:
+        width = img.shape[1]
+        time.sleep(width / 10)
+        return OCRResult.from_columns(
+            texts=[str(width)], boxes=[[[0, 0], [width, 0], [width, 1], [0, 1]]], confidences=[1.0]
+        )
+
+
+def image(width: int) -> np.ndarray:
+    return np.zeros((1, width, 3), np.uint8)
+
+
+def test_map_keeps_order():
+    with EnginePool(SleepEngine, workers=2, threads=0) as pool:
+        assert [result.texts for result in pool.map([image(3), image(1), image(2)])] == [["3"], ["1"], ["2"]]
+
+
+def test_cancelled_task_does_not_stop_the_pool():
+    with EnginePool(SleepEngine, workers=1, threads=0) as pool:
+        running = pool.submit(image(5))
+        queued = pool.submit(image(1))
+        assert queued.cancel()
+        assert running.result(timeout=20).texts == ["5"]
+        # The worker still runs and answers the cancelled task; later tasks
+        # must keep resolving
+        assert pool.submit(image(2)).result(timeout=20).texts == ["2"]
+        assert queued.cancelled()
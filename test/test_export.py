@@ -0,0 +1,54 @@
+import math
+
+import numpy as np
+import pytest
+
+from my_little_ocr.export import decode_ndjson, encode_ndjson, read_results, write_results
+
+
+@pytest.fixture
+def results(make_result) -> list:
+    rects = [(0, 0, 10, 5), (-3, 7, 40, 20)]
+    return [
+        ("a.png", make_result(["one", "two"], rects, [0.95, math.nan])),
+        ("b.png", make_result([])),
+        ("c.png", make_result(["x", "ü"], rects, [0.5, 0.75], engines=["fast", "slow"], regions=[0, 1])),
+    ]
+
+
+def test_ndjson_line_round_trip_with_nan_confidences(results):
+    doc_id, result = results[0]
+    line = encode_ndjson(doc_id, result)
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    assert b"null" in line and b"NaN" not in line
+    decoded_id, decoded = decode_ndjson(line)
+    assert decoded_id == doc_id
+    assert decoded == result
+    assert np.isnan(decoded.confidences[1])
+
+
+@pytest.mark.parametrize(
+    "suffix, module",
+    [(".ndjson", None), (".msgpack", "msgpack"), (".parquet", "pyarrow"), (".arrow", "pyarrow")],
+)
+def test_file_round_trip(tmp_path, results, suffix, module):
+    if module is not None:
+        pytest.importorskip(module)
+    path = tmp_path / f"results{suffix}"
+    assert write_results(results, path) == 3
+    assert list(read_results(path)) == results
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_arrow_ids_of_mixed_types(tmp_path, make_result, suffix):
+    pytest.importorskip("pyarrow")
+    pairs = [(7, make_result(["a"])), ("b.png", make_result(["b"])), (np.int64(9), make_result([]))]
+    with pytest.raises(ValueError, match="id_type='str'"):
+        write_results(pairs, tmp_path / f"inferred{suffix}")
+
+    path = tmp_path / f"results{suffix}"
+    assert write_results(pairs, path, id_type="str") == 3
+    assert [doc_id for doc_id, _ in read_results(path)] == ["7", "b.png", "9"]
+    path = tmp_path / f"ints{suffix}"
+    write_results(pairs[::2], path)
+    assert [doc_id for doc_id, _ in read_results(path)] == [7, 9]
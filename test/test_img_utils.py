@@ -0,0 +1,105 @@
+import mmap
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from my_little_ocr.base_engine import img_utils
+from my_little_ocr.base_engine.img_utils import convert_imagelike_to_type, imagelike_as_filepath
+
+
+def test_temp_files_are_removed_after_the_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(img_utils, "get_temp_dir", lambda: str(tmp_path))
+    img = np.zeros((4, 6, 3), np.uint8)
+    with imagelike_as_filepath(img) as path:
+        assert path.endswith(".bmp") and os.path.dirname(path) == str(tmp_path)
+        assert cv2.imread(path).shape == (4, 6, 3)
+    assert not os.path.exists(path)
+
+    # Also when the block raises, or has removed the file itself
+    with pytest.raises(RuntimeError):
+        with imagelike_as_filepath(img) as path:
+            raise RuntimeError
+    assert not os.path.exists(path)
+    with imagelike_as_filepath(img) as path:
+        os.remove(path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_encoded_images_and_paths_are_not_rewritten(tmp_path, monkeypatch):
+    monkeypatch.setattr(img_utils, "get_temp_dir", lambda: str(tmp_path / "temp"))
+    (tmp_path / "temp").mkdir()
+    png = cv2.imencode(".png", np.zeros((4, 6, 3), np.uint8))[1].tobytes()
+    for data in (png, bytearray(png), memoryview(png)):
+        with imagelike_as_filepath(data) as path:
+            assert path.endswith(".png")
+            with open(path, "rb") as f:
+                assert f.read() == png
+
+    source = tmp_path / "page.png"
+    source.write_bytes(png)
+    with imagelike_as_filepath(source) as path:
+        assert path == str(source)
+    assert source.exists()
+    assert list((tmp_path / "temp").iterdir()) == []
+
+
+def test_filepath_conversion_is_deprecated_and_cleaned_up_at_exit(tmp_path):
+    path = tmp_path / "page.png"
+    assert convert_imagelike_to_type(path, "filepath") == str(path)
+
+    with pytest.warns(DeprecationWarning, match="imagelike_as_filepath"):
+        temp_path = convert_imagelike_to_type(np.zeros((4, 4, 3), np.uint8), "filepath")
+    assert temp_path.endswith(".png") and os.path.isfile(temp_path)
+    # What the exit handler does
+    img_utils._temp_files.close()
+    assert not os.path.exists(temp_path)
+
+
+def test_raw_images_are_views_of_their_buffer():
+    pixels = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    # Rows padded to 16 bytes, after an 8-byte header
+    buffer = bytearray(8 + 16 * 2)
+    for row in range(2):
+        buffer[8 + 16 * row : 8 + 16 * row + 9] = pixels[row].tobytes()
+    raw = img_utils.RawImage(buffer, width=3, height=2, stride=16, offset=8)
+
+    array = convert_imagelike_to_type(raw, "numpy")
+    np.testing.assert_array_equal(array, pixels)
+    assert np.shares_memory(array, np.frombuffer(buffer, np.uint8))
+    rgb = img_utils.RawImage(buffer, width=3, height=2, stride=16, offset=8, order="rgb")
+    np.testing.assert_array_equal(convert_imagelike_to_type(rgb, "numpy"), pixels[:, :, ::-1])
+    # PIL images are RGB, so RGB pixels are taken as they are
+    np.testing.assert_array_equal(np.asarray(convert_imagelike_to_type(rgb, "pil")), pixels)
+    np.testing.assert_array_equal(np.asarray(convert_imagelike_to_type(raw, "pil")), pixels[:, :, ::-1])
+
+    gray = img_utils.RawImage(bytes(range(6)), width=3, height=2, channels=1)
+    assert convert_imagelike_to_type(gray, "numpy").tolist() == [[0, 1, 2], [3, 4, 5]]
+    with pytest.raises(ValueError, match="does not fit"):
+        img_utils.RawImage(bytes(17), width=3, height=2).to_numpy()
+    with pytest.raises(ValueError):
+        img_utils.RawImage(bytes(18), width=3, height=2, channels=2).to_numpy()
+
+
+def test_encoded_buffers_are_decoded(tmp_path):
+    img = np.random.default_rng(0).integers(0, 256, (5, 7, 3), np.uint8)
+    png = cv2.imencode(".png", img)[1].tobytes()
+    path = tmp_path / "page.png"
+    path.write_bytes(png)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for data in (png, bytearray(png), memoryview(png), mapped, path, str(path)):
+            np.testing.assert_array_equal(convert_imagelike_to_type(data, "numpy"), img)
+        np.testing.assert_array_equal(np.asarray(convert_imagelike_to_type(mapped, "pil")), img[:, :, ::-1])
+    assert convert_imagelike_to_type(memoryview(png), "bytes") == png
+    assert img_utils.read_image_file(tmp_path / "page.png").shape == (5, 7, 3)
+    (tmp_path / "empty.png").write_bytes(b"")
+    assert img_utils.read_image_file(tmp_path / "empty.png") is None
+
+
+def test_engines_accept_buffers(fake_engine):
+    img = np.zeros((5, 7, 3), np.uint8)
+    png = cv2.imencode(".png", img)[1].tobytes()
+    engine = fake_engine()
+    raw = img_utils.RawImage(bytearray(img.tobytes()), width=7, height=5)
+    assert [result.texts for result in engine.ocr_batch([png, memoryview(png), raw])] == [["7x5"]] * 3
@@ -0,0 +1,37 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules that must not be loaded just to import the package or list engines
+HEAVY_MODULES = [
+    "cv2", "numpy", "PIL", "pydantic", "torch", "onnxruntime", "git",
+    "easyocr", "surya", "rapidocr_onnxruntime", "wechat_ocr",
+]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import my_little_ocr
+engines = my_little_ocr.list_engines()
+available = [name for name, info in engines.items() if info.available]
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "engines": sorted(engines),
+    "modules": sorted({name.split(".")[0] for name in sys.modules}),
+    "elapsed": elapsed,
+}))
+"""
+
+
+def test_import_and_list_engines_stay_light():
+    completed = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    report = json.loads(completed.stdout)
+    assert {"tesseract", "easyocr", "wechat_ocr", "surya", "rapidocr"} <= set(report["engines"])
+    loaded = set(report["modules"]) & set(HEAVY_MODULES)
+    assert not loaded, f"importing my_little_ocr loaded {sorted(loaded)}"
+    assert report["elapsed"] < 1.0
@@ -0,0 +1,47 @@
+import numpy as np
+
+from my_little_ocr.incremental import IncrementalOCRSession, changed_blocks
+
+
+def frame(words: dict[int, tuple[int, int, int, int]]) -> np.ndarray:
+    img = np.zeros((256, 256, 3), np.uint8)
+    for value, (left, top, right, bottom) in words.items():
+        img[top:bottom, left:right] = value
+    return img
+
+
+WORDS = {1: (10, 10, 60, 20), 2: (100, 100, 150, 110), 3: (10, 200, 200, 210)}
+
+
+def test_changed_blocks():
+    previous = frame(WORDS)
+    current = previous.copy()
+    current[105, 120] = 9
+    blocks = changed_blocks(previous, current, block_size=32)
+    assert blocks.shape == (8, 8)
+    assert np.argwhere(blocks).tolist() == [[3, 3]]
+    assert not changed_blocks(previous, current, block_size=32, tolerance=10).any()
+
+
+def test_only_changed_parts_are_ocred(rectangle_engine):
+    engine = rectangle_engine()
+    session = IncrementalOCRSession(engine, block_size=32, padding=4)
+    assert session.ocr(frame(WORDS)).texts == ["word1", "word2", "word3"]
+
+    # The middle word changes; only the area around it is OCRed again
+    engine.shapes.clear()
+    result = session.ocr(frame({**WORDS, 2: (0, 0, 0, 0), 5: (100, 100, 150, 110)}))
+    assert result.texts == ["word1", "word5", "word3"]
+    assert result.boxes[1].tolist() == [[100, 100], [150, 100], [150, 110], [100, 110]]
+    assert result.regions is None
+    # The two changed blocks, x 96-160 and y 96-128, with 4 pixels of padding
+    assert engine.shapes == [(40, 72)]
+
+    assert session.ocr(frame({**WORDS, 2: (0, 0, 0, 0), 5: (100, 100, 150, 110)})).texts == result.texts
+    assert engine.shapes == [(40, 72)]
+
+    # Most of the frame changes, so it is OCRed in full
+    session.ocr(np.full((256, 256, 3), 7, np.uint8))
+    assert engine.shapes[-1] == (256, 256)
+    stats = session.stats()
+    assert (stats["full_frames"], stats["incremental_frames"], stats["unchanged_frames"]) == (2, 1, 1)
@@ -0,0 +1,14 @@
+from my_little_ocr.base_engine.metrics import MetricsRegistry
+
+
+def test_prometheus_keeps_large_counters_exact():
+    registry = MetricsRegistry()
+    registry.inc("images_total", 1234567, engine="fake")
+    registry.inc("images_total", 1, engine="fake")
+    registry.observe("call_seconds", 0.1, engine="fake", method="ocr")
+    registry.observe("call_seconds", 1e6 + 0.25, engine="fake", method="ocr")
+
+    lines = registry.to_prometheus().splitlines()
+    assert 'my_little_ocr_images_total{engine="fake"} 1234568' in lines
+    assert 'my_little_ocr_call_seconds_sum{engine="fake",method="ocr"} 1000000.35' in lines
+    assert 'my_little_ocr_call_seconds_count{engine="fake",method="ocr"} 2' in lines
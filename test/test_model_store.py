@@ -0,0 +1,106 @@
+import hashlib
+import http.server
+import os
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from my_little_ocr.model_store import ChecksumError, ModelFile, ModelStore
+
+FILES = {
+    "v1/det.onnx": os.urandom(300_000),
+    "v1/rec.onnx": os.urandom(200_000),
+}
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves FILES with support for range requests. The first response for
+    each path in `server.cut` is cut off halfway, like a dropped connection.
+    """
+
+    def do_GET(self):
+        data = FILES.get(self.path.lstrip("/"))
+        if data is None:
+            self.send_error(404)
+            return
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"].removeprefix("bytes=").split("-")[0])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        if self.path in self.server.cut:
+            self.server.cut.discard(self.path)
+            self.wfile.write(data[start : start + (len(data) - start) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def serve_files(cut=()):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.requests, server.cut = [], set(cut)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def model_file(relative_path: str, base_url: str, checksum: bool = True) -> ModelFile:
+    sha256 = hashlib.sha256(FILES[relative_path]).hexdigest() if checksum else None
+    return ModelFile(relative_path, base_url, sha256)
+
+
+def test_fetch_downloads_concurrently_and_verifies(tmp_path):
+    with serve_files() as (server, base_url):
+        store = ModelStore(cache_dir=tmp_path, offline=False, retries=0)
+        paths = store.fetch([model_file(name, base_url) for name in FILES])
+        assert [path.read_bytes() for path in paths] == list(FILES.values())
+        # Already stored files are not downloaded again
+        store.fetch([model_file(name, base_url) for name in FILES])
+    assert len(server.requests) == 2
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_interrupted_download_resumes_with_range(tmp_path):
+    with serve_files(cut={"/v1/det.onnx"}) as (server, base_url):
+        store = ModelStore(cache_dir=tmp_path, offline=False, retries=2)
+        path = store.get(model_file("v1/det.onnx", base_url))
+    assert path.read_bytes() == FILES["v1/det.onnx"]
+    assert server.requests[0] == ("/v1/det.onnx", None)
+    assert server.requests[1] == ("/v1/det.onnx", f"bytes={len(FILES['v1/det.onnx']) // 2}-")
+
+
+def test_checksum_mismatch_leaves_no_file(tmp_path):
+    with serve_files() as (_, base_url):
+        store = ModelStore(cache_dir=tmp_path, offline=False, retries=0)
+        with pytest.raises(ChecksumError):
+            store.get(ModelFile("v1/rec.onnx", base_url, "0" * 64))
+    assert not (tmp_path / "v1" / "rec.onnx").exists()
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_offline_and_mirror_directory(tmp_path):
+    model = model_file("v1/rec.onnx", "http://127.0.0.1:9")
+    with pytest.raises(FileNotFoundError):
+        ModelStore(cache_dir=tmp_path / "store", offline=True).get(model)
+
+    mirror = tmp_path / "mirror"
+    (mirror / "v1").mkdir(parents=True)
+    (mirror / "v1" / "rec.onnx").write_bytes(FILES["v1/rec.onnx"])
+    store = ModelStore(cache_dir=tmp_path / "store", mirror=str(mirror), offline=False)
+    assert store.get(model).read_bytes() == FILES["v1/rec.onnx"]
+    assert ModelStore(cache_dir=tmp_path / "store", offline=True).get(model) == store.get(model)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from my_little_ocr.base_engine.base_ocr_engine import OCRItem, OCRResult
+
+
+def test_from_columns():
+    result = OCRResult.from_columns(
+        texts=["a", "b"], boxes=[[[0.4, 0.6], [10.5, 0], [10, 5], [0, 5]], [[1, 1], [2, 1], [2, 2], [1, 2]]]
+    )
+    assert result.boxes.dtype == np.int32 and result.boxes.shape == (2, 4, 2)
+    assert result.boxes[0].tolist() == [[0, 1], [10, 0], [10, 5], [0, 5]]
+    assert result.confidences.dtype == np.float32
+    assert np.isnan(result.confidences).all()
+
+    text_only = OCRResult.from_columns(texts=["a"])
+    assert text_only.boxes.tolist() == [[[0, 0]] * 4]
+    assert len(OCRResult.from_columns(texts=[])) == 0
+    with pytest.raises(ValueError):
+        OCRResult.from_columns(texts=["a", "b"], confidences=[0.9])
+    with pytest.raises(ValueError):
+        OCRResult.from_columns(texts=["a"], engines=["fast", "slow"])
+
+
+def test_ocr_items_are_built_on_access(make_result):
+    result = make_result(["a", "b"], [(0, 0, 4, 2), (0, 4, 4, 6)], [0.9, None], engines=["fast", "slow"])
+    assert result._ocr_items is None
+    assert result.to_list(text_only=True) == ["a", "b"]
+    assert result._ocr_items is None
+
+    items = result.ocr_items
+    assert result.ocr_items is items
+    assert items[1] == OCRItem(text="b", box=[[0, 4], [4, 4], [4, 6], [0, 6]], confidence=None, engine="slow")
+    assert result[0] is items[0]
+    # Results built from items store them as columns
+    assert OCRResult(ocr_items=items) == result
+
+
+def test_low_confidence_items_are_dropped_on_creation(make_result):
+    result = make_result(["sure", "unsure", "unknown", "edge"], confidences=[0.9, 0.1, None, 0.3], regions=[0, 1, 2, 3])
+    # Unknown (NaN) confidences are kept
+    assert result.texts == ["sure", "unknown", "edge"]
+    assert result.regions == [0, 2, 3]
+    assert np.isnan(result.confidences[1])
+
+    kept = make_result(["sure", "unsure"], confidences=[0.9, 0.1], default_confidence_threshold=0)
+    assert kept.texts == ["sure", "unsure"]
+    # Results built without validation are filtered too
+    constructed = OCRResult.model_construct(
+        texts=["sure", "unsure"], boxes=np.zeros((2, 4, 2), np.int32), confidences=np.array([0.9, 0.1], np.float32)
+    )
+    assert constructed.texts == ["sure"]
+    assert OCRResult.concatenate([kept, result]).texts == ["sure", "unsure", "sure", "unknown", "edge"]
+
+
+def test_take_and_sort(make_result):
+    result = make_result(
+        ["c", "a", "b", "d"],
+        [(50, 20, 60, 30), (0, 0, 10, 10), (30, 0, 40, 10), (0, 21, 10, 31)],
+        [0.5, 0.9, None, 0.7],
+        engines=["x", "y", "z", "w"],
+    )
+    assert result.take(slice(1, 3)).texts == ["a", "b"]
+    assert result.take([3, 0]).engines == ["w", "x"]
+    mask = result.take(np.array([True, False, False, True]))
+    assert mask.texts == ["c", "d"]
+    assert mask.boxes.tolist() == result.boxes[[0, 3]].tolist()
+    assert result[1:].texts == ["a", "b", "d"]
+
+    # Top to bottom, then left to right
+    ordered = result.sort_by_position()
+    assert ordered.texts == ["a", "b", "c", "d"]
+    assert ordered.engines == ["y", "z", "x", "w"]
+    np.testing.assert_array_equal(ordered.confidences, np.array([0.9, np.nan, 0.5, 0.7], np.float32))
+
+    assert result.sort_by_confidence().texts == ["a", "d", "c", "b"]
+    assert result.filter_by_confidence(0.6).texts == ["a", "d"]
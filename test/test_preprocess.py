@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+import pytest
+
+from my_little_ocr.preprocess import PreprocessingEngine, load_image
+
+
+def jpeg(width: int, height: int) -> bytes:
+    img = np.random.default_rng(0).integers(0, 256, (height, width, 3), np.uint8)
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+def test_load_image_reduces_while_decoding(tmp_path):
+    path = tmp_path / "page.jpg"
+    path.write_bytes(jpeg(1600, 1200))
+    for img in (path, path.read_bytes()):
+        array, factors = load_image(img, max_side=400, grayscale=True)
+        assert array.shape == (300, 400)
+        assert factors == (4.0, 4.0)
+
+    array, factors = load_image(np.zeros((100, 50, 3), np.uint8), max_side=40)
+    assert array.shape == (40, 20, 3)
+    assert factors == (2.5, 2.5)
+    with pytest.raises(ValueError):
+        load_image(b"not an image", max_side=40)
+
+
+def test_boxes_are_mapped_back(fake_engine, make_result):
+    def read_shape(img):
+        height, width = img.shape[:2]
+        return make_result([str(img.shape)], [(0, 0, width, height)])
+
+    engine = PreprocessingEngine(fake_engine(read_shape, accepts_grayscale=True), max_side=400)
+    result = engine.ocr(jpeg(1600, 1200))
+    assert result.texts == ["(300, 400)"]
+    assert result.boxes[0].tolist() == [[0, 0], [1600, 0], [1600, 1200], [0, 1200]]
+
+    # Small images are passed at their size
+    [result] = engine.ocr_batch([np.zeros((10, 20, 3), np.uint8)])
+    assert result.texts == ["(10, 20)"]
@@ -0,0 +1,105 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+from my_little_ocr.model_store import ModelStore
+from my_little_ocr.ocr_engines.rapidocr_engine import rapidocr_engine
+from my_little_ocr.ocr_engines.rapidocr_engine.rapidocr_engine import (
+    quantize_model,
+    quantized_model_path,
+    quantized_models,
+)
+
+
+def test_quantized_model_path_is_keyed_by_checksum(tmp_path):
+    model = tmp_path / "det.onnx"
+    model.write_bytes(b"first")
+    first = quantized_model_path(model)
+    assert first == tmp_path / f"det.int8-{hashlib.sha256(b'first').hexdigest()[:16]}.onnx"
+    assert quantized_model_path(model, tmp_path / "cache").parent == tmp_path / "cache"
+
+    # A changed model is quantized again
+    model.write_bytes(b"second")
+    assert quantized_model_path(model) != first
+
+
+def test_read_only_model_directory_falls_back_to_the_store(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    models.mkdir()
+    det, rec = models / "det.onnx", models / "rec.onnx"
+    det.write_bytes(b"det")
+    rec.write_bytes(b"rec")
+    store = ModelStore(cache_dir=tmp_path / "store", offline=True)
+    # Existing copies are returned without quantizing anything
+    expected = [quantized_model_path(path, store.cache_dir / "quantized") for path in (det, rec)]
+    for path in expected:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"int8")
+
+    # Tests usually run as root, for whom every directory is writable
+    monkeypatch.setattr(rapidocr_engine.os, "access", lambda path, mode: False)
+    assert list(quantized_models(det, rec, model_store=store)) == expected
+    monkeypatch.undo()
+
+    # Copies are kept next to models in a writable directory
+    next_to_models = [quantized_model_path(path) for path in (det, rec)]
+    for path in next_to_models:
+        path.write_bytes(b"int8")
+    assert list(quantized_models(det, rec, model_store=store)) == next_to_models
+
+
+def conv_matmul_model(path):
+    """
+    Saves a small opset 12 model whose weights are Constant nodes, as in the
+    PP-OCR exports, with a character list in its metadata.
+    """
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    weights = numpy_helper.from_array(rng.normal(size=(4, 3, 3, 3)).astype(np.float32), "conv_w")
+    projection = numpy_helper.from_array(rng.normal(size=(4 * 8 * 8, 5)).astype(np.float32), "proj_w")
+    graph = helper.make_graph(
+        [
+            helper.make_node("Constant", [], ["conv_w"], value=weights),
+            helper.make_node("Constant", [], ["proj_w"], value=projection),
+            helper.make_node("Conv", ["x", "conv_w"], ["conv"], pads=[1, 1, 1, 1]),
+            helper.make_node("Relu", ["conv"], ["relu"]),
+            helper.make_node("Flatten", ["relu"], ["flat"]),
+            helper.make_node("MatMul", ["flat", "proj_w"], ["y"]),
+        ],
+        "tiny",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["batch", 3, 8, 8])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["batch", 5])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 12)])
+    model.ir_version = 7
+    helper.set_model_props(model, {"character": "a\nb\nc"})
+    onnx.save(model, str(path))
+    return onnx
+
+
+@pytest.mark.parametrize("static", [True, False])
+def test_quantize_and_load(tmp_path, static):
+    onnx = conv_matmul_model(tmp_path / "model.onnx")
+    import onnxruntime as ort
+
+    rng = np.random.default_rng(1)
+    inputs = [rng.uniform(0, 1, size=(1, 3, 8, 8)).astype(np.float32) for _ in range(8)]
+    output = quantize_model(tmp_path / "model.onnx", tmp_path / "model.int8.onnx", inputs if static else None)
+
+    quantized = onnx.load(str(output))
+    assert {prop.key: prop.value for prop in quantized.metadata_props}["character"] == "a\nb\nc"
+    operators = {node.op_type for node in quantized.graph.node}
+    assert ("DequantizeLinear" in operators) if static else ("MatMulInteger" in operators or "DynamicQuantizeLinear" in operators)
+    if static:
+        # Per-channel QDQ needs opset 13
+        assert max(opset.version for opset in quantized.opset_import if opset.domain in ("", "ai.onnx")) >= 13
+
+    options = {"providers": ["CPUExecutionProvider"]}
+    reference = ort.InferenceSession(str(tmp_path / "model.onnx"), **options).run(None, {"x": inputs[0]})[0]
+    result = ort.InferenceSession(str(output), **options).run(None, {"x": inputs[0]})[0]
+    assert os.path.getsize(output) < os.path.getsize(tmp_path / "model.onnx")
+    np.testing.assert_allclose(result, reference, atol=0.1 * np.abs(reference).max())
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("rapidocr_onnxruntime")
+
+from my_little_ocr.base_engine.img_utils import synthetic_text_image
+from my_little_ocr.ocr_engines.rapidocr_engine.rapidocr_engine import RapidOCREngine
+
+
+@pytest.fixture(scope="module")
+def engine() -> RapidOCREngine:
+    # Small images are not enlarged for detection, to keep the tests fast
+    return RapidOCREngine(det_limit_type="max", det_limit_side_len=320)
+
+
+def pages() -> list:
+    # One, two and three lines of text
+    return [synthetic_text_image(64, 320), synthetic_text_image(160, 320), synthetic_text_image(256, 320)]
+
+
+def test_ocr_batch_matches_ocr_in_order(engine):
+    images = pages()
+    expected = [engine.ocr(img) for img in images]
+    assert 0 < len(expected[0]) < len(expected[1]) < len(expected[2])
+    results = engine.ocr_batch(images[::-1], batch_size=2)
+    assert [result.texts for result in results] == [result.texts for result in expected[::-1]]
+    for result, single in zip(results, expected[::-1]):
+        assert abs(result.boxes - single.boxes).max() <= 1
+        assert result.timings is not None
+
+
+def test_ocr_batch_runs_chunks_of_batch_size(engine, monkeypatch):
+    chunks = []
+    ocr_chunk = engine._ocr_chunk
+
+    def record(images, *args, **kwargs):
+        chunks.append(len(images))
+        return ocr_chunk(images, *args, **kwargs)
+
+    monkeypatch.setattr(engine, "_ocr_chunk", record)
+    assert len(engine.ocr_batch(pages() + pages()[:2], batch_size=2)) == 5
+    assert chunks == [2, 2, 1]
+    assert engine.ocr_batch([]) == []
+
+
+def test_detect_then_recognize_gives_one_item_per_box(engine):
+    img = synthetic_text_image(160, 320)
+    boxes = engine.detect(img)
+    assert boxes.dtype == np.int32 and boxes.shape == (len(engine.ocr(img)), 4, 2)
+    assert [len(found) for found in engine.detect_batch(pages())] == [len(engine.ocr(page)) for page in pages()]
+
+    # A blank box is returned too, whatever its confidence
+    blank = np.array([[[200, 140], [300, 140], [300, 155], [200, 155]]])
+    result = engine.recognize(img, np.concatenate([boxes, blank]))
+    assert len(result) == len(boxes) + 1
+    assert result.texts[:-1] == engine.ocr(img).texts
+    assert result.boxes.tolist() == [*boxes.tolist(), *blank.tolist()]
+
+    results = engine.recognize_batch([img, img], [boxes[:1], []])
+    assert [len(found) for found in results] == [1, 0]
+    with pytest.raises(ValueError):
+        engine.recognize_batch([img, img], [boxes])
+
+
+def test_recognize_reads_line_crops(engine):
+    line = synthetic_text_image(64, 320)[8:48]
+    [result] = engine.recognize_batch([line])
+    assert len(result) == 1
+    assert result.texts[0].startswith("Warm up")
+    assert result.boxes[0].tolist() == [[0, 0], [320, 0], [320, 40], [0, 40]]
+
+
+
+def test_regions_are_detected_at_the_scale_of_the_page(engine):
+    img = synthetic_text_image(256, 320)
+    lines = engine.ocr(img)
+    assert len(lines) == 3
+    # A band around the second line only
+    top, bottom = int(lines.boxes[1, :, 1].min()), int(lines.boxes[1, :, 1].max())
+    result = engine.ocr(img, regions=[(0, top - 24, 320, bottom + 24)])
+    assert result.texts == lines.texts[1:2]
+    assert result.regions == [0]
+    assert abs(result.boxes[0] - lines.boxes[1]).max() <= 3
+
+
+def test_per_call_options(engine):
+    img = synthetic_text_image(256, 320)
+    default = engine.ocr(img)
+    strict = engine.ocr(img, text_score=float(default.confidences.max()) + 1e-3)
+    assert len(strict) == 0
+    assert engine.ocr(img, use_cls=False).texts == default.texts
+    assert [result.texts for result in engine.ocr_batch([img, img], text_score=0.0)] == [default.texts] * 2
+    # RapidOCR's settings are left as they were
+    assert engine.engine.text_score == 0.5
+    with pytest.raises(TypeError, match="det_box_thresh"):
+        engine.ocr(img, box_thresh=0.3)
+    with pytest.raises(TypeError):
+        engine.ocr_batch([img], unclip_ratio=2.0)
+
+
+def test_falls_back_to_whole_calls_without_the_pipeline_stages(engine, monkeypatch):
+    images = pages()
+    expected = [engine.ocr(img).texts for img in images]
+    monkeypatch.setattr(engine, "pipeline", False)
+    monkeypatch.setattr(engine, "_ocr_chunk", None)
+    assert [result.texts for result in engine.ocr_batch(images, batch_size=2)] == expected
+    assert engine.ocr(images[2], regions=[(0, 0, 320, 256)]).texts == expected[2]
+    assert len(engine.ocr(images[2], text_score=1.0)) == 0
+    with pytest.raises(NotImplementedError):
+        engine.detect(images[0])
+    with pytest.raises(NotImplementedError):
+        engine.recognize(images[0])
@@ -0,0 +1,145 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import cv2
+import numpy as np
+
+from my_little_ocr.base_engine.base_ocr_engine import BaseOCREngine, OCRResult
+from my_little_ocr.server import OCRServer
+
+
+def encode(width: int, height: int) -> bytes:
+    return cv2.imencode(".png", np.zeros((height, width, 3), np.uint8))[1].tobytes()
+
+
+def multipart(images: list[bytes], boundary: str = "xYzBoundary") -> tuple[bytes, str]:
+    body = b"".join(
+        b"--%s\r\nContent-Disposition: form-data; name=\"image\"; filename=\"%d.png\"\r\n"
+        b"Content-Type: image/png\r\n\r\n%s\r\n" % (boundary.encode(), index, image)
+        for index, image in enumerate(images)
+    )
+    return body + b"--%s--\r\n" % boundary.encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def request(port: int, method: str, path: str, body: bytes = None, headers: dict = None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.getheaders(), response.read()
+    finally:
+        connection.close()
+
+
+def run_with_server(engine: BaseOCREngine, client, **server_kwargs):
+    async def main():
+        server = OCRServer(engine, **server_kwargs)
+        port = await server.start(port=0)
+        try:
+            return await asyncio.to_thread(client, port)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_ocr_single_image(fake_engine):
+    status, _, body = run_with_server(
+        fake_engine(), lambda port: request(port, "POST", "/ocr", encode(40, 20), {"Content-Type": "image/png"})
+    )
+    assert status == 200
+    result = OCRResult.model_validate(json.loads(body))
+    assert result.texts == ["40x20"]
+    assert result.boxes[0].tolist() == [[0, 0], [40, 0], [40, 20], [0, 20]]
+
+
+def test_ocr_batch_json_and_ndjson(fake_engine):
+    body, content_type = multipart([encode(10, 10), b"not an image", encode(30, 5)])
+
+    def client(port):
+        plain = request(port, "POST", "/ocr/batch", body, {"Content-Type": content_type})
+        streamed = request(port, "POST", "/ocr/batch?stream=1", body, {"Content-Type": content_type})
+        return plain, streamed
+
+    (status, _, plain), (stream_status, headers, streamed) = run_with_server(fake_engine(), client)
+    assert status == 200 and stream_status == 200
+    entries = json.loads(plain)["results"]
+    assert [entry["index"] for entry in entries] == [0, 1, 2]
+    assert entries[0]["result"]["texts"] == ["10x10"]
+    assert "error" in entries[1]
+    assert entries[2]["result"]["texts"] == ["30x5"]
+
+    assert dict(headers)["Content-Type"] == "application/x-ndjson"
+    lines = sorted((json.loads(line) for line in streamed.splitlines()), key=lambda entry: entry["index"])
+    assert [line.get("result", {}).get("texts") for line in lines] == [["10x10"], None, ["30x5"]]
+
+
+def test_rejects_when_queue_is_full(fake_engine):
+    gate = threading.Event()
+
+    def read(img):
+        gate.wait(10)
+        return fake_engine.read_size(img)
+
+    engine = fake_engine(read)
+    image = encode(8, 8)
+
+    async def main():
+        server = OCRServer(engine, max_queue=1)
+        port = await server.start(port=0)
+        try:
+            # One request runs and one waits; the third is over capacity
+            busy = [
+                asyncio.create_task(asyncio.to_thread(request, port, "POST", "/ocr", image))
+                for _ in range(2)
+            ]
+            while server.slots["fake"].pending < 2:
+                await asyncio.sleep(0.01)
+            rejected = await asyncio.to_thread(request, port, "POST", "/ocr", image)
+            gate.set()
+            return rejected, await asyncio.gather(*busy)
+        finally:
+            gate.set()
+            await server.stop()
+
+    (status, headers, _), accepted = asyncio.run(main())
+    assert status == 503
+    assert dict(headers)["Retry-After"] == "1"
+    assert [response[0] for response in accepted] == [200, 200]
+
+
+def test_errors(fake_engine):
+    def client(port):
+        return (
+            request(port, "POST", "/ocr", b"garbage")[0],
+            request(port, "POST", "/ocr?engine=missing", encode(4, 4))[0],
+            request(port, "GET", "/ocr")[0],
+            request(port, "GET", "/health"),
+        )
+
+    bad_image, unknown_engine, wrong_method, (health_status, _, health) = run_with_server(fake_engine(), client)
+    assert (bad_image, unknown_engine, wrong_method, health_status) == (400, 404, 405, 200)
+    assert json.loads(health)["engines"]["fake"]["pending"] == 0
+
+
+def test_malformed_body_framing(fake_engine):
+    def send_raw(port, head: bytes) -> bytes:
+        with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+            sock.sendall(head)
+            # The server answers and closes the connection, as the body was not read
+            response = b""
+            while chunk := sock.recv(65536):
+                response += chunk
+        return response
+
+    def client(port):
+        return (
+            send_raw(port, b"POST /ocr HTTP/1.1\r\nHost: x\r\nContent-Length: abc\r\n\r\nbody"),
+            send_raw(port, b"POST /ocr HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\nbody"),
+        )
+
+    for response in run_with_server(fake_engine(), client):
+        assert response.startswith(b"HTTP/1.1 400 ")
@@ -0,0 +1,89 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from my_little_ocr.base_engine.base_ocr_engine import OCRResult
+from my_little_ocr.stream import JSONLSink, iter_image_paths, ocr_stream, ocr_to_jsonl, read_jsonl
+
+
+def write_images(root, widths) -> dict[str, int]:
+    """
+    Writes one image per width, spread over two subdirectories, and returns
+    their widths by path, in the order the directory is walked.
+    """
+    paths = {}
+    for index, width in enumerate(widths):
+        path = root / f"dir{index % 2}" / f"{index}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(path), np.zeros((4, width, 3), np.uint8))
+        paths[str(path)] = width
+    return dict(sorted(paths.items()))
+
+
+def test_stream_keeps_order_and_yields_errors(tmp_path, fake_engine):
+    widths = write_images(tmp_path, [5, 6, 7, 8])
+    broken = str(tmp_path / "dir0" / "broken.png")
+    (tmp_path / "dir0" / "broken.png").write_bytes(b"not an image")
+    (tmp_path / "notes.txt").write_text("skipped")
+    assert list(iter_image_paths(tmp_path)) == sorted([*widths, broken])
+
+    results = list(ocr_stream(tmp_path, fake_engine(), prefetch=2, errors="yield"))
+    assert [input_id for input_id, _ in results] == sorted([*widths, broken])
+    results = dict(results)
+    assert isinstance(results.pop(broken), ValueError)
+    assert {path: result.texts for path, result in results.items()} == {
+        path: [f"{width}x4"] for path, width in widths.items()
+    }
+
+
+def test_jsonl_resume(tmp_path, fake_engine):
+    widths = write_images(tmp_path / "images", [5, 6, 7])
+    output = tmp_path / "out.jsonl"
+
+    def read(img):
+        if img.shape[1] == 6:
+            raise RuntimeError("cannot read 6")
+        return fake_engine.read_size(img)
+
+    assert ocr_to_jsonl(tmp_path / "images", fake_engine(read), output) == 3
+
+    # A line cut short by a crash is dropped on resume
+    with open(output, "a") as f:
+        f.write('{"id": "partial", "res')
+    engine = fake_engine()
+    assert ocr_to_jsonl(tmp_path / "images", engine, output) == 1
+    # Only the input that failed is OCRed again
+    assert engine.shapes == [(4, 6)]
+
+    records = [(widths[input_id], record) for input_id, record in read_jsonl(output)]
+    assert [(width, record if isinstance(record, str) else record.texts) for width, record in records] == [
+        (5, ["5x4"]),
+        (7, ["7x4"]),
+        (6, "RuntimeError: cannot read 6"),
+        (6, ["6x4"]),
+    ]
+
+
+def record(input_id: int) -> str:
+    result = OCRResult.from_columns(texts=[str(input_id)])
+    return json.dumps({"id": input_id, "result": result.model_dump(mode="json")}) + "\n"
+
+
+def test_sink_skips_blank_lines(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(record(1) + "\n  \n" + record(2) + record(3) + '{"id": 4, "res')
+    with JSONLSink(path) as sink:
+        assert sink.completed_ids() == {1, 2, 3}
+    # Only the cut-off last line is removed
+    assert path.read_text() == record(1) + "\n  \n" + record(2) + record(3)
+
+
+def test_sink_refuses_corrupt_lines(tmp_path):
+    path = tmp_path / "out.jsonl"
+    content = record(1) + "garbage\n" + record(2)
+    path.write_text(content)
+    with pytest.raises(ValueError, match="line 2"):
+        JSONLSink(path)
+    assert path.read_text() == content
@@ -0,0 +1,39 @@
+import numpy as np
+
+from my_little_ocr.ocr_engines.tesseract_engine.tesseract_engine import parse_tesseract_tsv, split_tesseract_tsv
+
+HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"
+
+# Output of one tesseract run over a list file of three images; the second
+# image has no text
+LIST_TSV = "\n".join(
+    [
+        HEADER,
+        "1\t1\t0\t0\t0\t0\t0\t0\t200\t50\t-1\t",
+        "5\t1\t1\t1\t1\t1\t10\t5\t40\t12\t96.5\tHello",
+        "5\t1\t1\t1\t1\t2\t60\t5\t50\t12\t91\tworld",
+        "1\t2\t0\t0\t0\t0\t0\t0\t200\t50\t-1\t",
+        "1\t3\t0\t0\t0\t0\t0\t0\t300\t80\t-1\t",
+        "4\t3\t1\t1\t1\t0\t20\t30\t80\t20\t-1\t",
+        "5\t3\t1\t1\t1\t1\t20\t30\t80\t20\t88.25\tagain",
+        "",
+    ]
+)
+
+
+def test_split_list_file_output_by_page():
+    pages = split_tesseract_tsv(LIST_TSV, 3)
+    assert len(pages) == 3
+    assert all(page.splitlines()[0] == HEADER for page in pages)
+    assert [len(page.splitlines()) for page in pages] == [4, 2, 4]
+    assert split_tesseract_tsv("", 2) == ["", ""]
+
+
+def test_parse_words():
+    first, second, third = (parse_tesseract_tsv(page) for page in split_tesseract_tsv(LIST_TSV, 3))
+    assert first.texts == ["Hello", "world"]
+    assert first.boxes[0].tolist() == [[10, 5], [50, 5], [50, 17], [10, 17]]
+    np.testing.assert_allclose(first.confidences, [0.965, 0.91], rtol=1e-6)
+    assert len(second) == 0
+    assert third.texts == ["again"]
+    assert third.boxes.shape == (1, 4, 2)
@@ -0,0 +1,65 @@
+import sys
+from types import SimpleNamespace
+
+import cv2
+import pytest
+
+from my_little_ocr.base_engine import threads
+from my_little_ocr.base_engine.threads import ThreadBudget, apply_thread_budget, set_thread_budget
+
+
+@pytest.fixture(autouse=True)
+def restore_budget(monkeypatch):
+    for name in (threads.THREADS_ENV, threads.ENGINES_ENV, threads.PROCESSES_ENV):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(threads, "_budget", None)
+    monkeypatch.setattr(threads, "_budget_loaded", False)
+    monkeypatch.setattr(threads, "available_cpus", lambda: 16)
+    cv2_threads = cv2.getNumThreads()
+    yield
+    cv2.setNumThreads(cv2_threads)
+
+
+def test_budget_from_env(monkeypatch):
+    assert ThreadBudget.from_env() is None
+    monkeypatch.setenv(threads.ENGINES_ENV, "3")
+    monkeypatch.setenv(threads.PROCESSES_ENV, "2")
+    monkeypatch.setenv(threads.THREADS_ENV, "")
+    budget = ThreadBudget.from_env()
+    assert budget == ThreadBudget(engines=3, processes=2)
+    # 16 CPUs for two processes, split between three engines
+    assert (budget.process_threads, budget.engine_threads) == (8, 2)
+
+    monkeypatch.setenv(threads.THREADS_ENV, "6")
+    assert threads.get_thread_budget() == ThreadBudget(threads=6, engines=3, processes=2)
+    assert threads.engine_threads() == 2
+    monkeypatch.setenv(threads.THREADS_ENV, "many")
+    with pytest.raises(ValueError):
+        ThreadBudget.from_env()
+
+
+def test_split_never_goes_below_one_thread():
+    budget = ThreadBudget(threads=8, engines=2)
+    assert budget.split(3) == ThreadBudget(threads=2, engines=2, processes=1)
+    assert budget.split(3).engine_threads == 1
+    assert budget.split(0) == budget
+    assert ThreadBudget(processes=4).split(2).process_threads == 2
+    assert ThreadBudget(threads=1, engines=4).split(8).engine_threads == 1
+
+
+def test_engines_apply_the_budget(monkeypatch, fake_engine):
+    torch = SimpleNamespace(threads=None)
+    torch.set_num_threads = lambda count: setattr(torch, "threads", count)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+
+    set_thread_budget(threads=6, engines=2)
+    fake_engine()
+    assert (cv2.getNumThreads(), torch.threads) == (3, 3)
+
+    with pytest.raises(TypeError):
+        set_thread_budget(ThreadBudget(), threads=2)
+    set_thread_budget(None)
+    cv2.setNumThreads(5)
+    apply_thread_budget()
+    # Without a budget, every library keeps its own setting
+    assert (cv2.getNumThreads(), torch.threads) == (5, 3)
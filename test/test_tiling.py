@@ -0,0 +1,43 @@
+import numpy as np
+
+from my_little_ocr.tiling import TiledOCREngine, tile_grid
+
+# Word id -> (left, top, right, bottom), drawn as rectangles filled with the id
+WORDS = {
+    1: (10, 10, 40, 20),
+    2: (70, 60, 100, 70),  # in the overlap band of the first two tile columns
+    3: (85, 85, 115, 95),  # in the band shared by four tiles
+    4: (200, 150, 230, 160),
+    5: (150, 270, 180, 280),
+}
+
+
+def page() -> np.ndarray:
+    img = np.zeros((300, 300, 3), np.uint8)
+    for word, (left, top, right, bottom) in WORDS.items():
+        img[top:bottom, left:right] = word
+    return img
+
+
+def test_tile_grid_covers_the_image():
+    grid = tile_grid(300, 250, 128, 48)
+    covered = np.zeros((300, 250), bool)
+    for top, left, bottom, right in grid:
+        assert bottom - top <= 128 and right - left <= 128
+        covered[top:bottom, left:right] = True
+    assert covered.all()
+    assert tile_grid(100, 100, 128, 48) == [(0, 0, 100, 100)]
+
+
+def test_items_in_overlaps_are_merged(rectangle_engine):
+    engine = TiledOCREngine(rectangle_engine(WORDS), tile_size=128, overlap=48, max_workers=1)
+    result = engine.ocr(page())
+    assert sorted(result.texts) == [f"word{word}" for word in WORDS]
+    for text, box in zip(result.texts, result.boxes):
+        left, top, right, bottom = WORDS[int(text.removeprefix("word"))]
+        assert box.tolist() == [[left, top], [right, top], [right, bottom], [left, bottom]]
+
+
+def test_small_images_are_not_tiled(rectangle_engine):
+    img = page()[:80, :120]
+    assert TiledOCREngine(rectangle_engine(WORDS), tile_size=128, overlap=48).ocr(img).texts == ["word1", "word2"]